@@ -0,0 +1,250 @@
+# Benchmarks of semicon hot paths, run with airspeed velocity (asv).
+#
+#     asv run                       # benchmark the latest commit
+#     asv continuous master HEAD    # compare two commits, report regressions
+#     asv compare v0.2.0 master     # compare stored results
+#
+# Results are stored as JSON files in ".asv/results". See asv.conf.json.
+#
+# Only modules of the first benchmarked release are imported at module
+# level. Newer parts of semicon are imported in setup() with _require, so
+# that their benchmarks are skipped for older commits instead of breaking
+# the import of the whole suite.
+
+import importlib
+import itertools
+
+import kwant
+import numpy as np
+import scipy.sparse.linalg as sla
+
+import semicon
+from semicon.misc import prettify, rotate, two_deg
+from semicon.models import ZincBlende
+
+bands = ("gamma_6c", "gamma_8v", "gamma_7v")
+band_combinations = [
+    c for n in range(1, len(bands) + 1) for c in itertools.combinations(bands, n)
+]
+
+# 45 degrees rotation around the z-axis
+R = np.array([[1, -1, 0], [1, 1, 0], [0, 0, np.sqrt(2)]]) / np.sqrt(2)
+
+
+def _require(module, name):
+    """Attribute of a semicon module, skips the benchmark if it is missing."""
+    try:
+        return getattr(importlib.import_module(module), name)
+    except (ImportError, AttributeError):
+        # asv skips benchmarks whose setup raises NotImplementedError
+        raise NotImplementedError("{}.{} is not available".format(module, name))
+
+
+def _two_deg_stack():
+    """Layers and widths of the InAs/GaSb heterostructure."""
+    model = ZincBlende(parameter_coords="z", default_databank="lawaetz")
+    stack = [
+        model.parameters("AlSb", valence_band_offset=0.18).renormalize(new_gamma_0=1),
+        model.parameters("InAs").renormalize(new_gamma_0=1),
+        model.parameters("GaSb", valence_band_offset=0.56).renormalize(new_gamma_0=1),
+        model.parameters("AlSb", valence_band_offset=0.18).renormalize(new_gamma_0=1),
+    ]
+    return model, stack, [5, 12.5, 5, 5]
+
+
+class Import:
+    timeout = 120
+
+    def timeraw_import_semicon(self):
+        return "import semicon"
+
+
+class ModelConstruction:
+    params = (band_combinations, [("foreman",), ("zeeman",), ("foreman", "zeeman")])
+    param_names = ["bands", "components"]
+    timeout = 120
+
+    def time_zincblende(self, bands, components):
+        ZincBlende(bands=bands, components=components)
+
+    def time_zincblende_parameter_coords(self, bands, components):
+        ZincBlende(bands=bands, components=components, parameter_coords="z")
+
+
+class Parameters:
+    params = ["winkler", "lawaetz"]
+    param_names = ["databank"]
+
+    def setup(self, databank):
+        self.model = ZincBlende(default_databank=databank)
+        self.parameters = self.model.parameters("InAs")
+
+    def time_parameters(self, databank):
+        self.model.parameters("InAs", valence_band_offset=0.1)
+
+    def time_renormalize(self, databank):
+        self.parameters.renormalize(new_gamma_0=1)
+
+
+class Symbolic:
+    timeout = 300
+
+    def setup(self):
+        self.model = ZincBlende()
+        # renamed from Model.spin_operators to Model.spin_matrices
+        self.spin_operators = getattr(
+            self.model, "spin_matrices", self.model.spin_operators
+        )
+        self.rotated = rotate(
+            self.model.hamiltonian, R, spin_operators=self.spin_operators
+        )
+
+    def time_rotate(self):
+        rotate(self.model.hamiltonian, R, spin_operators=self.spin_operators)
+
+    def time_prettify(self):
+        prettify(self.rotated, zero_atol=1e-8)
+
+
+class Discretization:
+    params = ["z", "xyz"]
+    param_names = ["coords"]
+    timeout = 300
+
+    def setup(self, coords):
+        self.model = ZincBlende(parameter_coords=coords)
+
+    def time_discretize_symbolic(self, coords):
+        kwant.continuum.discretize_symbolic(self.model.hamiltonian, coords=coords)
+
+    def time_discretize(self, coords):
+        kwant.continuum.discretize(
+            self.model.hamiltonian, coords=coords, grid_spacing=0.5
+        )
+
+
+class Peierls:
+    timeout = 300
+
+    def setup(self):
+        model = ZincBlende(parameter_coords="xyz")
+        self.tb, self.coords = kwant.continuum.discretize_symbolic(
+            model.hamiltonian, coords="xyz"
+        )
+
+    def time_apply(self):
+        semicon.peierls.apply(self.tb, self.coords, A="[-B_z * y, 0, 0]")
+
+
+class TwoDEG:
+    """Subband dispersion of the InAs/GaSb heterostructure (reference)."""
+
+    timeout = 300
+
+    def setup(self):
+        model, self.stack, self.widths = _two_deg_stack()
+        self.grid_spacing = 0.5
+        self.two_deg_params, _ = two_deg(
+            self.stack,
+            self.widths,
+            self.grid_spacing,
+            extra_constants=semicon.parameters.constants,
+        )
+
+        template = kwant.continuum.discretize(
+            model.hamiltonian, coords="z", grid_spacing=self.grid_spacing
+        )
+        width = sum(self.widths)
+
+        def shape(site):
+            return -self.grid_spacing / 2 < site.pos[0] < width
+
+        syst = kwant.Builder()
+        syst.fill(template, shape, (0,))
+        self.syst = syst.finalized()
+
+    def time_two_deg(self):
+        two_deg(
+            self.stack,
+            self.widths,
+            self.grid_spacing,
+            extra_constants=semicon.parameters.constants,
+        )
+
+    def time_subband_sweep(self):
+        for k in np.linspace(-0.45, 0.45, 11):
+            p = {"k_x": k, "k_y": 0, **self.two_deg_params}
+            ham = self.syst.hamiltonian_submatrix(params=p, sparse=True)
+            sla.eigsh(ham, k=20, sigma=0.52)
+
+
+class HeterostructureSubbands:
+    """The TwoDEG sweep with semicon.heterostructure.Heterostructure."""
+
+    timeout = 300
+
+    def setup(self):
+        self.Heterostructure = _require("semicon.heterostructure", "Heterostructure")
+        self.model, self.stack, self.widths = _two_deg_stack()
+        # Hamiltonians are not cached, so every call assembles them
+        self.heterostructure = self.Heterostructure(
+            self.model,
+            self.stack,
+            self.widths,
+            0.5,
+            extra_constants=semicon.parameters.constants,
+            cache_size=0,
+        )
+
+    def time_heterostructure(self):
+        self.Heterostructure(
+            self.model,
+            self.stack,
+            self.widths,
+            0.5,
+            extra_constants=semicon.parameters.constants,
+        )
+
+    def time_subband_sweep(self):
+        for k in np.linspace(-0.45, 0.45, 11):
+            ham = self.heterostructure.hamiltonian(k, 0)
+            sla.eigsh(ham, k=20, sigma=0.52)
+
+
+class BandTracking:
+    """Subbands of a 100 nm InAs slab (1600 orbitals) at 101 momenta."""
+
+    params = [4, 10]
+    param_names = ["n_bands"]
+    timeout = 300
+
+    def setup(self, n_bands):
+        self.track_bands = _require("semicon.sweep", "track_bands")
+        model = ZincBlende(default_databank="winkler")
+        parameters = model.parameters("InAs").renormalize(new_gamma_0=1)
+        template = kwant.continuum.discretize(model.hamiltonian, coords="z", grid=0.5)
+        syst = kwant.Builder()
+        syst.fill(template, lambda site: 0 <= site.pos[0] < 100, (0,))
+        syst = syst.finalized()
+        self.momenta = np.linspace(0, 0.3, 101)
+        self.hamiltonians = {
+            k: syst.hamiltonian_submatrix(
+                params={**parameters, "k_x": k, "k_y": 0}, sparse=True
+            )
+            for k in self.momenta
+        }
+        self.sigma = parameters["E_v"] + parameters["E_0"] + 0.05
+
+    def time_track_bands(self, n_bands):
+        self.track_bands(
+            self.hamiltonians.get,
+            self.momenta,
+            n_bands,
+            self.sigma,
+            return_vectors=False,
+        )
+
+    def time_eigsh(self, n_bands):
+        # cold shift-invert solutions with the same number of eigenpairs
+        for k in self.momenta:
+            sla.eigsh(self.hamiltonians[k], k=2 * n_bands, sigma=self.sigma)
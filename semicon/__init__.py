@@ -1,4 +1,25 @@
-from . import models, parameters, peierls
+from . import (
+    analysis,
+    dos,
+    evaluation,
+    folding,
+    heterostructure,
+    kgrid,
+    masses,
+    models,
+    numeric,
+    parameters,
+    peierls,
+    planewave,
+    poisson,
+    profiling,
+    renormalization,
+    rgf,
+    store,
+    superlattice,
+    sweep,
+    templates,
+)
 from ._version import __version__
 
 
@@ -13,4 +34,26 @@ def test(verbose=True):
 
 test.__test__ = False
 
-__all__ = ["parameters", "models", "peierls", "__version__"]
+__all__ = [
+    "analysis",
+    "dos",
+    "evaluation",
+    "folding",
+    "heterostructure",
+    "kgrid",
+    "masses",
+    "parameters",
+    "models",
+    "numeric",
+    "peierls",
+    "planewave",
+    "poisson",
+    "profiling",
+    "renormalization",
+    "rgf",
+    "store",
+    "superlattice",
+    "sweep",
+    "templates",
+    "__version__",
+]
@@ -0,0 +1,141 @@
+# Functions defined in this file analyse eigenvectors of discretized models.
+#
+# Eigenvectors of Kwant systems are stored site-major, i.e. all orbitals of
+# the first site come first. All functions below work on (site, orbital)
+# views of such arrays and process eigenvectors in chunks of columns to
+# keep memory usage of temporary arrays bounded.
+
+from collections import namedtuple
+
+import numpy as np
+
+BandCharacter = namedtuple("BandCharacter", ["weights", "spin", "density"])
+BandCharacter.__doc__ = """Band character of eigenvectors.
+
+Attributes
+----------
+weights : array of shape (..., n_bands, n_vectors)
+    Weight of each band of the model, bands ordered as in ``model.bands``.
+spin : array of shape (..., 3, n_vectors)
+    Expectation values of spin operators of the model.
+density : array of shape (..., n_sites, n_vectors) or None
+    Spatial density, summed over orbitals.
+"""
+
+
+def site_orbital_view(vectors, norbs):
+    """Reshape site-major eigenvectors into a (site, orbital) view.
+
+    Parameters
+    ----------
+    vectors : array of shape (..., n_sites * norbs, n_vectors)
+        Eigenvectors stored as columns, as returned by ``eigsh``.
+    norbs : int
+        Number of orbitals per site.
+
+    Returns
+    -------
+    view of shape (..., n_sites, norbs, n_vectors) sharing memory with input
+    """
+    vectors = np.asarray(vectors)
+    *batch, size, n_vectors = vectors.shape
+    if size % norbs:
+        raise ValueError(
+            "Size of vectors ({}) is not a multiple of number of "
+            "orbitals ({}).".format(size, norbs)
+        )
+
+    # Splitting a single axis is always possible without making a copy,
+    # regardless of the memory layout of the input array.
+    view = vectors.reshape(*batch, size // norbs, norbs, n_vectors)
+    return view
+
+
+def _chunks(n, chunk_size):
+    chunk_size = n if chunk_size is None else max(int(chunk_size), 1)
+    for start in range(0, n, chunk_size):
+        yield slice(start, min(start + chunk_size, n))
+
+
+def band_character(vectors, model, chunk_size=None, density=False):
+    """Calculate band weights, spin and density of site-major eigenvectors.
+
+    Parameters
+    ----------
+    vectors : array of shape (..., n_sites * norbs, n_vectors)
+        Normalized eigenvectors stored as columns.
+    model : BandModel
+        Model that was used to create the discretized system.
+    chunk_size : int or None
+        Number of eigenvectors processed at once. If None all eigenvectors
+        are processed together.
+    density : bool
+        If True calculate also spatial density of each eigenvector.
+
+    Returns
+    -------
+    BandCharacter
+    """
+    spin_operators = model.spin_matrices
+    norbs = spin_operators.shape[-1]
+    view = site_orbital_view(vectors, norbs)
+    *batch, n_sites, _, n_vectors = view.shape
+    indices = [model.band_indices[band] for band in model.bands]
+
+    weights = np.empty((*batch, len(indices), n_vectors))
+    spin = np.empty((*batch, 3, n_vectors))
+    densities = np.empty((*batch, n_sites, n_vectors)) if density else None
+
+    for chunk in _chunks(n_vectors, chunk_size):
+        v = view[..., chunk]
+        squared = np.abs(v) ** 2
+
+        orbital_weights = squared.sum(axis=-3)
+        for i, index in enumerate(indices):
+            weights[..., i, chunk] = orbital_weights[..., index, :].sum(axis=-2)
+
+        spin[..., chunk] = np.einsum(
+            "...san,pab,...sbn->...pn", v.conj(), spin_operators, v, optimize=True
+        ).real
+
+        if density:
+            densities[..., chunk] = squared.sum(axis=-2)
+
+    return BandCharacter(weights=weights, spin=spin, density=densities)
+
+
+def stream_band_character(results, model, chunk_size=None, density=False):
+    """Calculate band character for a stream of eigenvectors.
+
+    Parameters
+    ----------
+    results : iterable
+        Iterable of eigenvector arrays or of (energies, eigenvectors) pairs,
+        for example as they are produced during a parameter sweep.
+    model, chunk_size, density
+        See `band_character`.
+
+    Yields
+    ------
+    BandCharacter for each item of ``results``.
+    """
+    for item in results:
+        if isinstance(item, tuple):
+            _, item = item
+        yield band_character(item, model, chunk_size=chunk_size, density=density)
+
+
+def dominant_bands(character, model):
+    """Name of the band with the largest weight for each eigenvector.
+
+    Parameters
+    ----------
+    character : BandCharacter
+    model : BandModel
+
+    Returns
+    -------
+    array of band names of shape (..., n_vectors)
+    """
+    bands = np.array([str(band) for band in model.bands])
+    return bands[np.argmax(character.weights, axis=-2)]
@@ -0,0 +1,342 @@
+# Density of states, carrier densities and Fermi levels.
+#
+# Band energies are given for a grid of momenta, e.g. from `sweep.track_bands`
+# or from diagonalization of a batched Hamiltonian, as an array of shape
+# (n_points, n_bands) or (grid shape) + (n_bands,). Two methods are
+# available:
+#
+# * smearing: every eigenvalue contributes a Gaussian (or derivative of the
+#   Fermi function) of finite width. Points can carry weights, so
+#   irreducible points of a `kgrid.KGrid` can be used directly.
+# * linear (triangle / tetrahedron) method: bands are interpolated linearly
+#   inside triangles (2D) or tetrahedra (3D) of a regular grid and the
+#   contribution of each simplex is integrated analytically. Reduced grids
+#   must be expanded first with `KGrid.expand`.
+#
+# The density of states is given in units of 1 / (eV nm^d) for grids of
+# momenta in 1 / nm; all bands are counted, so spin degeneracy is included
+# as long as both spin bands are present in the energies.
+
+import itertools
+import math
+from collections import namedtuple
+
+import numpy as np
+from scipy.constants import physical_constants as phys_const
+from scipy.special import erf, expit
+
+from . import profiling
+
+try:
+    from scipy.integrate import trapezoid
+except ImportError:  # scipy < 1.6
+    from scipy.integrate import trapz as trapezoid
+
+k_B = phys_const["Boltzmann constant in eV/K"][0]
+
+DensityOfStates = namedtuple("DensityOfStates", ["energies", "dos", "integrated"])
+DensityOfStates.__doc__ = """Density of states on an energy grid.
+
+Attributes
+----------
+energies : array of shape (n_energies,)
+dos : array of shape (n_energies,)
+    Density of states in 1 / (eV nm^d).
+integrated : array of shape (n_energies,)
+    Density of states below each energy in 1 / nm^d.
+"""
+
+# maximal number of (energy, simplex) pairs processed at once
+_CHUNK_SIZE = 2**22
+
+
+def k_measure(axes):
+    """Volume of k-space per point of a uniform grid, divided by (2 pi)^d.
+
+    Multiplying the number of states per grid point by this measure gives
+    density of states per unit length, area or volume.
+    """
+    spacings = [np.ptp(a) / (len(a) - 1) for a in axes]
+    return np.prod(spacings) / (2 * np.pi) ** len(axes)
+
+
+def _flatten_bands(energies):
+    energies = np.asarray(energies, dtype=float)
+    return energies.reshape(-1, energies.shape[-1])
+
+
+@profiling.register("dos.smearing_dos")
+def smearing_dos(
+    energies, energy_grid, width, weights=None, measure=1, method="gaussian"
+):
+    """Density of states with broadened eigenvalues.
+
+    Parameters
+    ----------
+    energies : array of shape (..., n_bands)
+        Band energies at all (or irreducible) points of a grid.
+    energy_grid : array of shape (n_energies,)
+    width : float
+        Broadening in eV.
+    weights : array or None
+        Weights of points, e.g. ``KGrid.weights``. Defaults to 1.
+    measure : float
+        Weight of a single point, e.g. `k_measure` of the grid. By default
+        the density of states is given per grid point.
+    method : "gaussian" or "fermi"
+        Gaussian broadening, or broadening by the derivative of the Fermi
+        function with ``k_B T = width``.
+
+    Returns
+    -------
+    DensityOfStates
+    """
+    energies = _flatten_bands(energies)
+    energy_grid = np.asarray(energy_grid, dtype=float)
+    if weights is None:
+        weights = np.ones(len(energies))
+    weights = np.asarray(weights, dtype=float)
+    if weights.shape != (len(energies),):
+        raise ValueError("Weights must be given for every point of the grid.")
+
+    if method == "gaussian":
+
+        def peak(x):
+            return np.exp(-(x**2) / 2) / np.sqrt(2 * np.pi)
+
+        def step(x):
+            return (1 + erf(x / np.sqrt(2))) / 2
+
+    elif method == "fermi":
+
+        def peak(x):
+            return expit(x) * expit(-x)
+
+        step = expit
+    else:
+        raise ValueError("Method must be either 'gaussian' or 'fermi'.")
+
+    # eigenvalues with the same weight are collected in a single array
+    weights = np.repeat(weights * measure, energies.shape[1])
+    energies = energies.ravel()
+
+    dos = np.empty(len(energy_grid))
+    integrated = np.empty(len(energy_grid))
+    chunk = max(1, _CHUNK_SIZE // max(1, len(energies)))
+    for start in range(0, len(energy_grid), chunk):
+        x = (energy_grid[start : start + chunk, None] - energies) / width
+        dos[start : start + chunk] = peak(x) @ weights / width
+        integrated[start : start + chunk] = step(x) @ weights
+
+    return DensityOfStates(energy_grid, dos, integrated)
+
+
+def _simplices(shape):
+    """Corners of Kuhn simplices of a regular grid.
+
+    Returns
+    -------
+    corners : array of shape (n_simplices, d + 1)
+        Flat indices into the grid.
+    cells : array of shape (n_simplices,)
+        Flat index of the cell (in the grid of cells) of each simplex.
+    """
+    d = len(shape)
+    cell_shape = tuple(s - 1 for s in shape)
+    origins = np.stack(
+        np.meshgrid(*[np.arange(s) for s in cell_shape], indexing="ij"), axis=-1
+    ).reshape(-1, d)
+
+    corners = []
+    # every cell is split into d! simplices along its main diagonal
+    for permutation in itertools.permutations(range(d)):
+        offsets = np.zeros((d + 1, d), dtype=int)
+        for i, axis in enumerate(permutation):
+            offsets[i + 1 :, axis] += 1
+        vertices = origins[:, None, :] + offsets
+        corners.append(np.ravel_multi_index(tuple(np.moveaxis(vertices, -1, 0)), shape))
+    cells = np.tile(np.arange(len(origins)), len(corners))
+    return np.concatenate(corners), cells
+
+
+def _triangle(E, e):
+    """Fraction below E and its derivative for linear triangles."""
+    e1, e2, e3 = np.moveaxis(e, -1, 0)
+    e21, e31, e32 = e2 - e1, e3 - e1, e3 - e2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lower = (E >= e1) & (E < e2)
+        upper = (E >= e2) & (E < e3)
+        fraction = np.where(
+            lower,
+            (E - e1) ** 2 / (e21 * e31),
+            np.where(upper, 1 - (e3 - E) ** 2 / (e31 * e32), 0.0),
+        )
+        derivative = np.where(
+            lower,
+            2 * (E - e1) / (e21 * e31),
+            np.where(upper, 2 * (e3 - E) / (e31 * e32), 0.0),
+        )
+    fraction = np.where(E >= e3, 1.0, fraction)
+    return fraction, derivative
+
+
+def _tetrahedron(E, e):
+    """Fraction below E and its derivative for linear tetrahedra."""
+    e1, e2, e3, e4 = np.moveaxis(e, -1, 0)
+    e21, e31, e41 = e2 - e1, e3 - e1, e4 - e1
+    e32, e42, e43 = e3 - e2, e4 - e2, e4 - e3
+    with np.errstate(divide="ignore", invalid="ignore"):
+        first = (E >= e1) & (E < e2)
+        second = (E >= e2) & (E < e3)
+        third = (E >= e3) & (E < e4)
+
+        x = E - e2
+        c = (e31 + e42) / (e32 * e42)
+        fraction = np.select(
+            [first, second, third],
+            [
+                (E - e1) ** 3 / (e21 * e31 * e41),
+                (e21**2 + 3 * e21 * x + 3 * x**2 - c * x**3) / (e31 * e41),
+                1 - (e4 - E) ** 3 / (e41 * e42 * e43),
+            ],
+        )
+        derivative = np.select(
+            [first, second, third],
+            [
+                3 * (E - e1) ** 2 / (e21 * e31 * e41),
+                (3 * e21 + 6 * x - 3 * c * x**2) / (e31 * e41),
+                3 * (e4 - E) ** 2 / (e41 * e42 * e43),
+            ],
+        )
+    fraction = np.where(E >= e4, 1.0, fraction)
+    return fraction, derivative
+
+
+@profiling.register("dos.linear_dos")
+def linear_dos(energies, axes, energy_grid):
+    """Density of states with the linear triangle / tetrahedron method.
+
+    Parameters
+    ----------
+    energies : array of shape ``grid_shape + (n_bands,)`` or (n_points, n_bands)
+        Band energies on the full grid spanned by ``axes`` (in "ij" order).
+    axes : sequence of 2 or 3 1D arrays
+        Momenta along each direction, need not be uniform.
+    energy_grid : array of shape (n_energies,)
+
+    Returns
+    -------
+    DensityOfStates
+        States of the region of k-space covered by the grid.
+    """
+    axes = [np.asarray(a, dtype=float) for a in axes]
+    shape = tuple(len(a) for a in axes)
+    if len(axes) == 2:
+        simplex = _triangle
+    elif len(axes) == 3:
+        simplex = _tetrahedron
+    else:
+        raise ValueError("Only 2 and 3 dimensional grids are supported.")
+    if min(shape) < 2:
+        raise ValueError("At least two points along each axis are required.")
+
+    energies = _flatten_bands(energies)
+    if len(energies) != np.prod(shape):
+        raise ValueError(
+            "Energies of {} points do not match grid of shape {}.".format(
+                len(energies), shape
+            )
+        )
+    energy_grid = np.asarray(energy_grid, dtype=float)
+
+    corners, cells = _simplices(shape)
+    # volume of each simplex divided by (2 pi)^d
+    cell_volumes = np.prod(
+        np.meshgrid(*[np.diff(a) for a in axes], indexing="ij"), axis=0
+    ).ravel()
+    volumes = np.abs(cell_volumes[cells]) / math.factorial(len(axes))
+    volumes /= (2 * np.pi) ** len(axes)
+
+    # sorted corner energies of shape (n_simplices * n_bands, d + 1)
+    e = np.sort(np.moveaxis(energies[corners], 1, 2), axis=-1)
+    e = e.reshape(-1, len(axes) + 1)
+    volumes = np.repeat(volumes, energies.shape[1])
+
+    dos = np.empty(len(energy_grid))
+    integrated = np.empty(len(energy_grid))
+    chunk = max(1, _CHUNK_SIZE // len(e))
+    for start in range(0, len(energy_grid), chunk):
+        E = energy_grid[start : start + chunk, None]
+        fraction, derivative = simplex(E, e)
+        dos[start : start + chunk] = derivative @ volumes
+        integrated[start : start + chunk] = fraction @ volumes
+
+    return DensityOfStates(energy_grid, dos, integrated)
+
+
+def carrier_density(dos, fermi_level, temperature=0):
+    """Density of occupied states.
+
+    Parameters
+    ----------
+    dos : DensityOfStates
+    fermi_level : float or array
+    temperature : float
+        Temperature in Kelvin.
+
+    Returns
+    -------
+    float or array of the same shape as ``fermi_level``
+    """
+    fermi_level = np.asarray(fermi_level, dtype=float)
+    if temperature == 0:
+        return np.interp(fermi_level, dos.energies, dos.integrated)
+
+    kT = k_B * temperature
+    x = (dos.energies - fermi_level[..., None]) / kT
+    occupation = expit(-x)
+    # Integration by parts, n = N f | + int N (-df/dE) dE, is more accurate
+    # than integration of the (possibly discontinuous) density of states.
+    # States below the energy grid are occupied.
+    N = dos.integrated
+    return (
+        N[0] * (1 - occupation[..., 0])
+        + N[-1] * occupation[..., -1]
+        + trapezoid(N * expit(x) * occupation / kT, dos.energies, axis=-1)
+    )
+
+
+@profiling.register("dos.fermi_level")
+def fermi_level(dos, density, temperature=0, tol=1e-9):
+    """Fermi level of a given carrier density by bisection.
+
+    Parameters
+    ----------
+    dos : DensityOfStates
+        Precomputed density of states; energy grid must cover all
+        occupied states and the Fermi level.
+    density : float or array
+        Density of carriers (states below the Fermi level) in 1 / nm^d.
+        Arrays are solved together.
+    temperature : float
+        Temperature in Kelvin.
+    tol : float
+        Tolerance of the Fermi level in eV.
+
+    Returns
+    -------
+    float or array of the same shape as ``density``
+    """
+    density = np.asarray(density, dtype=float)
+    lower = np.full(density.shape, dos.energies[0])
+    upper = np.full(density.shape, dos.energies[-1])
+    bounds = carrier_density(dos, np.stack([lower, upper]), temperature)
+    if np.any(density < bounds[0]) or np.any(density > bounds[1]):
+        raise ValueError("Density is outside of the range of the energy grid.")
+
+    for _ in range(int(np.ceil(np.log2((upper - lower).max() / tol))) + 1):
+        middle = (lower + upper) / 2
+        below = carrier_density(dos, middle, temperature) < density
+        lower = np.where(below, middle, lower)
+        upper = np.where(below, upper, middle)
+    return (lower + upper) / 2
@@ -0,0 +1,124 @@
+# Thread-safe batched evaluation of band structures.
+#
+# Symbolic stages (building, rotating and lambdifying models, discretizing
+# them) are pure Python: they hold the GIL and fill lazy caches, both
+# per model (Model._derived) and per module (the parameter cache of
+# ZincBlende and templates; the cache of renormalization has its own lock).
+# Only the model cache loaded at import (models._models_cache) is never
+# modified. All symbolic work done by this module is serialized by
+# "symbolic_lock", which other code sharing models between threads should
+# hold as well.
+#
+# BandEvaluator does the symbolic work once, at construction. Afterwards
+# it holds only read-only NumPy arrays, so a single instance can be used
+# from many threads without locking. Hamiltonians are assembled with a
+# single matrix product (BLAS) and diagonalized with batched eigh (LAPACK),
+# and both release the GIL, so threads evaluating different momenta run
+# in parallel.
+
+import concurrent.futures
+import os
+import threading
+
+import numpy as np
+
+from . import profiling
+from .numeric import PolynomialHamiltonian
+
+symbolic_lock = threading.RLock()
+
+
+def _read_only(array):
+    array = np.ascontiguousarray(array)
+    array.setflags(write=False)
+    return array
+
+
+class BandEvaluator:
+    """Thread-safe batched evaluation of a model.
+
+    Parameters
+    ----------
+    model : Model or numeric.PolynomialHamiltonian
+    parameters : dict or None
+        Parameters of the model, see `Model.lambdify`.
+
+    Attributes
+    ----------
+    powers : integer array of shape (n_monomials, 3)
+        Powers of (k_x, k_y, k_z) of every monomial.
+    coefficients : array of shape (n_monomials, n, n)
+    shape : shape of the Hamiltonian matrix
+    """
+
+    def __init__(self, model, parameters=None):
+        if not isinstance(model, PolynomialHamiltonian):
+            with symbolic_lock:
+                model = model.lambdify(parameters)
+        powers = sorted(model.coefficients)
+        self.shape = model.shape
+        self.powers = _read_only(np.array(powers, dtype=int).reshape(-1, 3))
+        self.coefficients = _read_only([model.coefficients[p] for p in powers])
+
+    def hamiltonian(self, k_x=0, k_y=0, k_z=0):
+        """Hamiltonian for (broadcastable arrays of) momenta.
+
+        Returns
+        -------
+        array of shape ``broadcast_shape + shape``
+        """
+        ks = np.stack(np.broadcast_arrays(k_x, k_y, k_z), axis=-1)
+        factors = np.prod(ks[..., None, :] ** self.powers, axis=-1)
+        n = len(self.powers)
+        output = factors.reshape(-1, n) @ self.coefficients.reshape(n, -1)
+        return output.reshape(ks.shape[:-1] + self.shape)
+
+    @profiling.register("evaluation.bands")
+    def bands(self, k_x=0, k_y=0, k_z=0, return_vectors=False):
+        """Band energies (and eigenvectors) for a batch of momenta.
+
+        Returns
+        -------
+        energies : array of shape ``broadcast_shape + (n,)``
+        vectors : array of shape ``broadcast_shape + (n, n)``
+            Only if ``return_vectors`` is True.
+        """
+        H = self.hamiltonian(k_x, k_y, k_z)
+        if return_vectors:
+            return np.linalg.eigh(H)
+        return np.linalg.eigvalsh(H)
+
+    def map(
+        self, k_x=0, k_y=0, k_z=0, return_vectors=False, n_threads=None, chunk_size=256
+    ):
+        """Band energies (and eigenvectors) computed by a pool of threads.
+
+        Momenta are split into chunks of ``chunk_size`` that are evaluated
+        by `bands` in ``n_threads`` threads (by default the number of CPUs).
+        Output is the same as of `bands`.
+        """
+        ks = np.broadcast_arrays(k_x, k_y, k_z)
+        shape = ks[0].shape
+        ks = [k.ravel() for k in ks]
+        chunks = [
+            [k[start : start + chunk_size] for k in ks]
+            for start in range(0, max(len(ks[0]), 1), chunk_size)
+        ]
+
+        def evaluate(chunk):
+            return self.bands(*chunk, return_vectors=return_vectors)
+
+        if n_threads is None:
+            n_threads = os.cpu_count() or 1
+        with concurrent.futures.ThreadPoolExecutor(n_threads) as executor:
+            results = list(executor.map(evaluate, chunks))
+
+        if return_vectors:
+            energies = np.concatenate([r[0] for r in results])
+            vectors = np.concatenate([r[1] for r in results])
+            return (
+                energies.reshape(shape + energies.shape[-1:]),
+                vectors.reshape(shape + vectors.shape[-2:]),
+            )
+        energies = np.concatenate(results)
+        return energies.reshape(shape + energies.shape[-1:])
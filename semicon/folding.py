@@ -0,0 +1,171 @@
+# Löwdin partitioning of band models.
+#
+# Remote bands are folded out of a model in second order perturbation
+# theory. Band edges, i.e. the Hamiltonian at k = 0 averaged over each band,
+# define the unperturbed energies. Everything else is the perturbation and
+# the effective Hamiltonian of the kept bands reads
+#
+#   H'_mn = H_mn + 1/2 sum_l H_ml [1/(E_m - E_l) + 1/(E_n - E_l)] H_ln,
+#
+# with terms of order higher than "order" in momenta discarded. The energy
+# denominators are placed between the Hamiltonian elements, which keeps the
+# operator ordering meaningful for position dependent parameters.
+
+import numpy as np
+import sympy
+
+from . import profiling
+from .models import Model
+from .numeric import PolynomialHamiltonian
+from .symbols import momentum
+
+
+def _partition(model, bands):
+    """Validate kept bands and return them with kept and removed indices."""
+    bands = [str(b) for b in np.atleast_1d(bands)]
+    model_bands = [str(b) for b in model.bands]
+    if not bands or not set(bands) <= set(model_bands):
+        raise ValueError(
+            "Kept bands must be a non-empty subset of model bands "
+            "{}.".format(model_bands)
+        )
+    if set(bands) == set(model_bands):
+        raise ValueError("At least one band must be folded out of the model.")
+
+    band_indices = model.band_indices
+    kept = [i for band in bands for i in band_indices[band]]
+    removed = [
+        i for band in model_bands if band not in bands for i in band_indices[band]
+    ]
+    return bands, kept, removed
+
+
+def _momentum_degree(term):
+    degree = 0
+    for factor in sympy.Mul.make_args(term):
+        base, exponent = factor.as_base_exp()
+        if base in momentum:
+            degree += int(exponent)
+    return degree
+
+
+def _truncate(expr, order):
+    """Drop terms of order higher than ``order`` in momenta."""
+    terms = sympy.Add.make_args(sympy.expand(expr))
+    return sympy.Add(*[t for t in terms if _momentum_degree(t) <= order])
+
+
+def band_edges(model):
+    """Band edge energies of the model (symbolic).
+
+    Returns
+    -------
+    dictionary (band name: sympy expression)
+        Diagonal of the Hamiltonian at k = 0, averaged over each band.
+    """
+    at_gamma = model.hamiltonian.subs({k: 0 for k in momentum})
+    output = {}
+    for band, indices in model.band_indices.items():
+        diagonal = [at_gamma[i, i] for i in indices]
+        output[band] = sympy.simplify(sympy.Add(*diagonal) / len(diagonal))
+    return output
+
+
+@profiling.register("folding.fold")
+def fold(model, bands, order=2):
+    """Fold remote bands out of the model symbolically.
+
+    Parameters
+    ----------
+    model : BandModel
+    bands : str or sequence of str
+        Bands that are kept, in the order they appear in the output.
+    order : int
+        Highest order in momenta kept in the effective Hamiltonian.
+
+    Returns
+    -------
+    Model with the effective Hamiltonian of the kept bands.
+    """
+    bands, kept, removed = _partition(model, bands)
+
+    edges = band_edges(model)
+    band_of = {i: band for band, indices in model.band_indices.items() for i in indices}
+    H = model.hamiltonian
+
+    output = sympy.zeros(len(kept), len(kept))
+    for a, m in enumerate(kept):
+        for b, n in enumerate(kept):
+            element = H[m, n]
+            for ell in removed:
+                if H[m, ell] == 0 or H[ell, n] == 0:
+                    continue
+                denominator = (
+                    1 / (edges[band_of[m]] - edges[band_of[ell]])
+                    + 1 / (edges[band_of[n]] - edges[band_of[ell]])
+                ) / 2
+                element += H[m, ell] * denominator * H[ell, n]
+            output[a, b] = _truncate(element, order)
+
+    spins = [model._band_spins[band] for band in bands]
+    return Model(sympy.ImmutableMatrix(output), spins=spins)
+
+
+def _fold_coefficients(coefficients, kept, removed, energies, order):
+    """Second order folding of coefficients of a polynomial Hamiltonian."""
+    denominators = energies[kept, None] - energies[None, removed]
+    if np.any(np.isclose(denominators, 0)):
+        raise ValueError("Kept and folded bands must not be degenerate.")
+    inverse = 1 / denominators
+    # (1/2) [1/(E_m - E_l) + 1/(E_n - E_l)], indices (m, l, n)
+    weights = (inverse[:, :, None] + inverse.T[None, :, :]) / 2
+
+    output = {p: c[np.ix_(kept, kept)].copy() for p, c in coefficients.items()}
+    for p, left in coefficients.items():
+        left = left[np.ix_(kept, removed)]
+        if not left.any():
+            continue
+        for q, right in coefficients.items():
+            powers = tuple(i + j for i, j in zip(p, q))
+            if sum(powers) > order:
+                continue
+            right = right[np.ix_(removed, kept)]
+            term = np.einsum("ml,mln,ln->mn", left, weights, right)
+            output[powers] = output.get(powers, 0) + term
+    return output
+
+
+@profiling.register("folding.fold_numeric")
+def fold_numeric(model, bands, parameters, order=2):
+    """Fold remote bands out of the numerical Hamiltonian of the model.
+
+    The folding is done on coefficients of the polynomial in momenta,
+    therefore the effective Hamiltonian can be evaluated on batched grids
+    of momenta at the cost of a small model.
+
+    Parameters
+    ----------
+    model : BandModel
+        Model with parameters that do not depend on position.
+    bands : str or sequence of str
+        Bands that are kept, in the order they appear in the output.
+    parameters : dict
+        Numerical values of model parameters, see `Model.lambdify`.
+    order : int
+        Highest order in momenta kept in the effective Hamiltonian.
+
+    Returns
+    -------
+    PolynomialHamiltonian
+    """
+    bands, kept, removed = _partition(model, bands)
+    coefficients = model.lambdify(parameters).coefficients
+
+    at_gamma = coefficients.get((0, 0, 0), np.zeros(model.hamiltonian.shape))
+    energies = np.empty(at_gamma.shape[0])
+    for indices in model.band_indices.values():
+        energies[indices] = np.mean(np.diag(at_gamma).real[indices])
+
+    return PolynomialHamiltonian(
+        _fold_coefficients(coefficients, kept, removed, energies, order)
+    )
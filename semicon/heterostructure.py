@@ -0,0 +1,210 @@
+# Heterostructures confined along z with cached Hamiltonians.
+#
+# Without magnetic field the discretized Hamiltonian of a heterostructure is
+# a polynomial of second order in the in-plane momenta,
+#
+#   H(k_x, k_y) = H_0 + k_x H_x + k_y H_y + k_x^2 H_xx + k_x k_y H_xy
+#                 + k_y^2 H_yy,
+#
+# so the (slow) evaluation of parameter functions and of the Kwant system
+# is done only once, when the coefficients are extracted. All coefficients
+# share a single sparsity pattern that contains the diagonal, hence
+# Hamiltonians are linear combinations of data arrays and an electrostatic
+# potential only updates the diagonal entries.
+
+import collections
+
+import kwant
+import numpy as np
+import scipy.sparse as sp
+
+from . import profiling, templates
+from .misc import two_deg
+
+# (k_x, k_y) points used to extract the coefficients
+_SAMPLES = [(0, 0), (1, 0), (-1, 0), (0, 1), (0, -1), (1, 1)]
+
+
+def in_plane_factors(k_x, k_y):
+    """Monomials of in-plane momenta matching `in_plane_coefficients`."""
+    k_x, k_y = np.broadcast_arrays(k_x, k_y)
+    return [np.ones_like(k_x), k_x, k_y, k_x**2, k_x * k_y, k_y**2]
+
+
+def in_plane_coefficients(evaluate):
+    """Decompose a Hamiltonian of second order in the in-plane momenta.
+
+    Parameters
+    ----------
+    evaluate : function (k_x, k_y) -> array or sparse matrix
+        Hamiltonian at given in-plane momenta.
+
+    Returns
+    -------
+    list of [H_0, H_x, H_y, H_xx, H_xy, H_yy]
+        Coefficients of `in_plane_factors`.
+    """
+    h0, hx_plus, hx_minus, hy_plus, hy_minus, h_plus = [
+        evaluate(k_x, k_y) for k_x, k_y in _SAMPLES
+    ]
+    hx, hxx = (hx_plus - hx_minus) / 2, (hx_plus + hx_minus) / 2 - h0
+    hy, hyy = (hy_plus - hy_minus) / 2, (hy_plus + hy_minus) / 2 - h0
+    hxy = h_plus - h0 - hx - hy - hxx - hyy
+    coefficients = [h0, hx, hy, hxx, hxy, hyy]
+
+    # the decomposition is exact only for Hamiltonians of second order
+    k = (0.3, -0.7)
+    combined = sum(f * c for f, c in zip(in_plane_factors(*k), coefficients))
+    if abs(combined - evaluate(*k)).max() > 1e-10:
+        raise ValueError("Hamiltonian must be of second order in the in-plane momenta.")
+    return coefficients
+
+
+def _aligned(matrices, size):
+    """Data arrays of matrices on a common sparsity pattern with diagonal."""
+    pattern = sp.identity(size, format="csr")
+    for m in matrices:
+        pattern = pattern + abs(m)
+    pattern = sp.csr_matrix(pattern)
+    pattern.sort_indices()
+
+    rows = np.repeat(np.arange(size), np.diff(pattern.indptr))
+    keys = rows * size + pattern.indices
+    data = []
+    for m in matrices:
+        m = sp.coo_matrix(m)
+        aligned = np.zeros(len(keys), dtype=complex)
+        np.add.at(aligned, np.searchsorted(keys, m.row * size + m.col), m.data)
+        data.append(aligned)
+    diagonal = np.searchsorted(keys, np.arange(size) * (size + 1))
+    return pattern, data, diagonal
+
+
+class Heterostructure:
+    """Heterostructure confined along z with a static band structure.
+
+    Material parameters, the Kwant system and the dependence of the
+    Hamiltonian on in-plane momenta are evaluated once. Electrostatic
+    potentials, e.g. of a gate sweep, are applied by `with_potential`.
+
+    Parameters
+    ----------
+    model : ZincBlende
+        Model with ``parameter_coords="z"``.
+    parameters : sequence of dicts
+        Parameters of each layer, see `misc.two_deg`.
+    widths : sequence of numbers
+        Width of each layer.
+    grid_spacing : float
+    extra_constants : dict or None
+        Passed to `misc.two_deg`.
+    cache_size : int
+        Number of momenta for which Hamiltonians are kept.
+    cache_dir : str, None or False
+        Disk cache of the discretization, see `templates.discretize`;
+        disabled by default, None selects `templates.cache_directory`.
+
+    Attributes
+    ----------
+    z : array of shape (n_sites,)
+        Positions of sites, in the order of orbitals of the Hamiltonian.
+    norbs : int
+    params : dict
+        Parameter functions of `misc.two_deg`.
+    walls : array of floats
+    syst : finalized Kwant system
+    """
+
+    @profiling.register("heterostructure.init")
+    def __init__(
+        self,
+        model,
+        parameters,
+        widths,
+        grid_spacing,
+        extra_constants=None,
+        cache_size=128,
+        cache_dir=False,
+    ):
+        self.params, self.walls = two_deg(
+            parameters, widths, grid_spacing, extra_constants=extra_constants
+        )
+
+        template = templates.discretize(
+            model.hamiltonian, "z", grid_spacing, cache_dir=cache_dir
+        )
+        syst = kwant.Builder()
+        syst.fill(
+            template, lambda site: -grid_spacing / 2 < site.pos[0] < sum(widths), (0,)
+        )
+        self.syst = syst.finalized()
+        self.z = np.array([s.pos[0] for s in self.syst.sites])
+
+        coefficients = in_plane_coefficients(self._evaluate)
+        size = coefficients[0].shape[0]
+        self.norbs = size // len(self.z)
+        self._pattern, data, self._diagonal = _aligned(coefficients, size)
+        self._coefficients = np.array(data)
+
+        self._potential = np.zeros(len(self.z) * self.norbs)
+        self._cache = collections.OrderedDict()
+        self._cache_size = cache_size
+
+    def _evaluate(self, k_x, k_y):
+        params = dict(self.params, k_x=k_x, k_y=k_y)
+        return self.syst.hamiltonian_submatrix(params=params, sparse=True)
+
+    def _data(self, k_x, k_y):
+        return np.array(in_plane_factors(k_x, k_y)) @ self._coefficients
+
+    def _matrix(self, data):
+        return sp.csr_matrix(
+            (data, self._pattern.indices, self._pattern.indptr),
+            shape=self._pattern.shape,
+        )
+
+    def hamiltonian(self, k_x=0, k_y=0):
+        """Hamiltonian at in-plane momenta including the potential.
+
+        Returns
+        -------
+        scipy.sparse.csr_matrix
+            The matrix is cached and updated in place by `with_potential`,
+            copy it if it is needed afterwards.
+        """
+        key = (float(k_x), float(k_y))
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key][0]
+
+        data = self._data(k_x, k_y)
+        diagonal = data[self._diagonal]
+        data[self._diagonal] += self._potential
+        matrix = self._matrix(data)
+        self._cache[key] = (matrix, diagonal)
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return matrix
+
+    def with_potential(self, potential):
+        """Set the electrostatic potential energy of electrons.
+
+        Only diagonals of cached Hamiltonians are updated, at cost linear in
+        the number of sites.
+
+        Parameters
+        ----------
+        potential : array of shape (n_sites,) or function of z
+            Potential at positions ``self.z``.
+
+        Returns
+        -------
+        self
+        """
+        if callable(potential):
+            potential = potential(self.z)
+        potential = np.broadcast_to(np.asarray(potential, dtype=float), self.z.shape)
+        self._potential = np.repeat(potential, self.norbs)
+        for matrix, diagonal in self._cache.values():
+            matrix.data[self._diagonal] = diagonal + self._potential
+        return self
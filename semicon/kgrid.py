@@ -0,0 +1,200 @@
+# Symmetry reduced grids of momenta.
+#
+# Energies of zincblende models are invariant under the point group Td of
+# the crystal and, due to time reversal symmetry, under k -> -k. Together
+# they form the group Oh (48 operations) acting on momenta. Slabs confined
+# along the z axis of a (rotated) model keep only operations that leave the
+# z axis invariant, e.g. C2v for [001], Cs for [110] and C3v for [111] slabs
+# (or larger groups for slabs that are symmetric under z -> -z).
+#
+# Operations are defined in the crystal frame and transformed into the frame
+# of the model using its orientation, see `Model.rotate`. Only operations
+# that map the grid onto itself are used.
+
+import itertools
+
+import numpy as np
+
+
+def point_group(name="Td"):
+    """Point group operations of the cubic crystal (crystal frame).
+
+    Parameters
+    ----------
+    name : "Td" or "Oh"
+
+    Returns
+    -------
+    array of shape (n_operations, 3, 3)
+    """
+    operations = []
+    for permutation in itertools.permutations(range(3)):
+        for signs in itertools.product([1, -1], repeat=3):
+            matrix = np.zeros((3, 3))
+            matrix[range(3), permutation] = signs
+            operations.append(matrix)
+    operations = np.array(operations)
+
+    if name == "Oh":
+        return operations
+    elif name == "Td":
+        # signed permutations with an even number of sign changes
+        return operations[np.prod(operations.sum(axis=1), axis=1) > 0]
+    raise ValueError("Unknown point group {}, use 'Td' or 'Oh'.".format(name))
+
+
+def _unique(operations):
+    output = []
+    for op in operations:
+        if not any(np.allclose(op, other) for other in output):
+            output.append(op)
+    return np.array(output)
+
+
+def symmetry_operations(
+    model=None, dimensions=3, time_reversal=True, symmetric_slab=False
+):
+    """Operations acting on momenta that leave energies invariant.
+
+    Parameters
+    ----------
+    model : Model or None
+        Operations are transformed into the frame of the model, i.e. the
+        frame obtained by ``model.rotate``. If None crystal frame is used.
+    dimensions : 2 or 3
+        For 2 the model is a slab confined along z and operations act on
+        (k_x, k_y).
+    time_reversal : bool
+        If True include k -> -k.
+    symmetric_slab : bool
+        If True the slab is assumed to be symmetric under z -> -z.
+
+    Returns
+    -------
+    array of shape (n_operations, dimensions, dimensions)
+
+    Notes
+    -----
+    Only operations of the crystal are taken into account. Perturbations
+    such as magnetic field or strain reduce the symmetry and must not be
+    used with these operations.
+    """
+    if dimensions not in (2, 3):
+        raise ValueError("Only 2 and 3 dimensional grids are supported.")
+
+    R = np.eye(3) if model is None else np.asarray(model.orientation)
+    operations = np.einsum("ji,njk,kl->nil", R, point_group("Td"), R)
+
+    if dimensions == 2:
+        z = operations[:, :, 2]
+        invariant = np.isclose(z[:, 2], 1)
+        if symmetric_slab:
+            invariant |= np.isclose(z[:, 2], -1)
+        operations = operations[invariant][:, :2, :2]
+
+    if time_reversal:
+        operations = np.concatenate([operations, -operations])
+    return _unique(operations)
+
+
+class KGrid:
+    """Grid of momenta reduced by symmetry.
+
+    Parameters
+    ----------
+    axes : sequence of 1D arrays
+        Momenta along each direction; the full grid is their product.
+    operations : array of shape (n_operations, d, d)
+        Symmetry operations, e.g. from `symmetry_operations`. Operations
+        that do not map the grid onto itself are discarded.
+    atol : float
+        Tolerance used to match momenta.
+
+    Attributes
+    ----------
+    shape : shape of the full grid
+    points : array of shape (n_points, d), full grid
+    irreducible : array of shape (n_irreducible, d)
+        Representatives of symmetry related points.
+    weights : array of shape (n_irreducible,)
+        Number of full grid points represented by each irreducible point.
+    operations : operations that map the grid onto itself
+    """
+
+    def __init__(self, axes, operations, atol=1e-8):
+        axes = [np.sort(np.asarray(a, dtype=float)) for a in axes]
+        operations = np.asarray(operations, dtype=float)
+        if operations.shape[1:] != (len(axes), len(axes)):
+            raise ValueError("Operations do not match dimension of the grid.")
+
+        self.axes = axes
+        self.shape = tuple(len(a) for a in axes)
+        mesh = np.meshgrid(*axes, indexing="ij")
+        self.points = np.stack([m.ravel() for m in mesh], axis=-1)
+
+        images, used = [], []
+        for op in operations:
+            index = self._index(self.points @ op.T, atol)
+            if index is not None:
+                images.append(index)
+                used.append(op)
+        self.operations = np.array(used)
+
+        # the set of operations is a group, so minimum over images of a point
+        # is the same for all points of an orbit
+        representatives = np.min(images, axis=0) if images else np.arange(len(self))
+        unique, self._full_to_irreducible, self.weights = np.unique(
+            representatives, return_inverse=True, return_counts=True
+        )
+        self.irreducible = self.points[unique]
+
+    def _index(self, points, atol):
+        """Flat indices of points in the grid or None if not on the grid."""
+        indices = []
+        for axis, coordinates in zip(self.axes, points.T):
+            i = np.clip(np.searchsorted(axis, coordinates - atol), 0, len(axis) - 1)
+            if not np.allclose(axis[i], coordinates, atol=atol, rtol=0):
+                return None
+            indices.append(i)
+        return np.ravel_multi_index(indices, self.shape)
+
+    def __len__(self):
+        return len(self.points)
+
+    @classmethod
+    def from_model(
+        cls, axes, model=None, time_reversal=True, symmetric_slab=False, atol=1e-8
+    ):
+        """Grid reduced by symmetries of a zincblende model.
+
+        The grid is 2 dimensional (slab confined along z) if two axes are
+        given, see `symmetry_operations`.
+        """
+        operations = symmetry_operations(
+            model,
+            dimensions=len(axes),
+            time_reversal=time_reversal,
+            symmetric_slab=symmetric_slab,
+        )
+        return cls(axes, operations, atol=atol)
+
+    def expand(self, values):
+        """Expand values of irreducible points onto the full grid.
+
+        Parameters
+        ----------
+        values : array of shape (n_irreducible, ...)
+            Quantities invariant under the operations, e.g. energies.
+
+        Returns
+        -------
+        array of shape ``self.shape + values.shape[1:]``
+        """
+        values = np.asarray(values)
+        if len(values) != len(self.irreducible):
+            raise ValueError(
+                "Expected values for {} irreducible points, got {}.".format(
+                    len(self.irreducible), len(values)
+                )
+            )
+        return values[self._full_to_irreducible].reshape(self.shape + values.shape[1:])
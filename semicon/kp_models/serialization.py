@@ -0,0 +1,164 @@
+"""
+--------------------------------------------------------------------------
+                Structured serialization of k·p Hamiltonians
+--------------------------------------------------------------------------
+
+Hamiltonians are stored as a list of terms per matrix entry. Each term is a
+numerical (exact) coefficient and an ordered sequence of symbolic factors
+(symbol name, integer power). The order of factors is preserved, therefore
+operator ordering of the Burt-Foreman symmetrized Hamiltonian is kept.
+
+Terms are saved into a compact ``.npz`` file, so Hamiltonians can be
+reconstructed without parsing strings. This module depends only on numpy
+and sympy, as it is used at build time.
+"""
+
+import numpy as np
+import sympy
+
+_fields = ["shape", "entries", "offsets", "factors", "names", "numbers"]
+
+
+def encode(matrix):
+    """Encode sympy matrix into a dictionary of arrays.
+
+    Parameters
+    ----------
+    matrix : sympy.Matrix
+        Expanded matrix; every term must be a product of numbers and
+        integer powers of symbols.
+
+    Returns
+    -------
+    dictionary (field name: np.ndarray)
+    """
+    names, numbers = [], []
+    entries, offsets, factors = [], [0], []
+
+    def index(table, value):
+        if value not in table:
+            table.append(value)
+        return table.index(value)
+
+    for (i, j), expr in np.ndenumerate(np.array(matrix.tolist(), dtype=object)):
+        for term in sympy.Add.make_args(sympy.expand(expr)):
+            if term == 0:
+                continue
+            coefficient = sympy.Integer(1)
+            for factor in sympy.Mul.make_args(term):
+                if not factor.free_symbols:
+                    coefficient *= factor
+                    continue
+                base, exponent = factor.as_base_exp()
+                if not (isinstance(base, sympy.Symbol) and exponent.is_Integer):
+                    raise ValueError("Cannot serialize factor {}.".format(factor))
+                factors.append((index(names, base.name), int(exponent)))
+            entries.append((i, j, index(numbers, sympy.srepr(coefficient))))
+            offsets.append(len(factors))
+
+    return {
+        "shape": np.array(matrix.shape),
+        "entries": np.array(entries, dtype=np.int16).reshape(-1, 3),
+        "offsets": np.array(offsets, dtype=np.int32),
+        "factors": np.array(factors, dtype=np.int16).reshape(-1, 2),
+        "names": np.array(names, dtype=str),
+        "numbers": np.array(numbers, dtype=str),
+    }
+
+
+def save(fname, components):
+    """Save components (dict name: sympy.Matrix) into a ``.npz`` file."""
+    data = {}
+    for component, matrix in components.items():
+        for field, value in encode(matrix).items():
+            data[component + "." + field] = value
+    np.savez_compressed(fname, **data)
+
+
+def load(fname):
+    """Load components saved with `save`.
+
+    Returns
+    -------
+    dictionary (component name: Terms)
+    """
+    output = {}
+    with np.load(fname) as data:
+        components = {key.split(".")[0] for key in data.files}
+        for component in components:
+            fields = {f: data[component + "." + f] for f in _fields}
+            output[component] = Terms.from_arrays(**fields)
+    return output
+
+
+class Terms:
+    """Terms of a Hamiltonian, see module documentation.
+
+    Attributes
+    ----------
+    shape : tuple of ints
+    terms : list of tuples (row, column, coefficient, factors)
+        ``coefficient`` is an exact sympy number and ``factors`` is a tuple
+        of (symbol name, power) pairs in the order of multiplication.
+    """
+
+    def __init__(self, shape, terms):
+        self.shape = tuple(shape)
+        self.terms = terms
+
+    @classmethod
+    def from_arrays(cls, shape, entries, offsets, factors, names, numbers):
+        names = [str(n) for n in names]
+        numbers = [sympy.sympify(str(n)) for n in numbers]
+        factors = [(names[n], int(p)) for n, p in factors]
+        terms = [
+            (int(i), int(j), numbers[c], tuple(factors[start:stop]))
+            for (i, j, c), start, stop in zip(entries, offsets[:-1], offsets[1:])
+        ]
+        return cls(shape, terms)
+
+    def submatrix(self, indices):
+        """Terms of ``matrix[indices, :][:, indices]``.
+
+        Terms of entries that are not selected are dropped, without
+        constructing any sympy expressions.
+        """
+        position = {old: new for new, old in enumerate(indices)}
+        terms = [
+            (position[i], position[j], coefficient, factors)
+            for i, j, coefficient, factors in self.terms
+            if i in position and j in position
+        ]
+        return Terms((len(indices), len(indices)), terms)
+
+    def __add__(self, other):
+        if self.shape != other.shape:
+            raise ValueError(
+                "Shapes {} and {} do not match.".format(self.shape, other.shape)
+            )
+        return Terms(self.shape, self.terms + other.terms)
+
+    @property
+    def names(self):
+        """Set of symbol names appearing in terms."""
+        return {name for *_, factors in self.terms for name, _ in factors}
+
+    def to_sympy(self, symbols):
+        """Reconstruct the Hamiltonian.
+
+        Parameters
+        ----------
+        symbols : dict (name: sympy object)
+            Objects substituted for each symbol name, for example commutative
+            symbols, non-commutative momentum operators or functions of
+            position.
+
+        Returns
+        -------
+        sympy.ImmutableMatrix
+        """
+        entries = [[[] for j in range(self.shape[1])] for i in range(self.shape[0])]
+        for i, j, coefficient, factors in self.terms:
+            term = [coefficient] + [symbols[name] ** power for name, power in factors]
+            entries[i][j].append(sympy.Mul(*term))
+        return sympy.ImmutableMatrix([[sympy.Add(*e) for e in row] for row in entries])
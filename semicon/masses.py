@@ -0,0 +1,268 @@
+# Effective masses, nonparabolicity and Luttinger parameters.
+#
+# Bands are fitted along many directions at once with
+#
+#   E(k) - E(0) = a k^2 + b k^4,
+#
+# from which the inverse effective mass a / T (in units of 1 / m_0, with
+# T = hbar^2 / 2 m_0) and the Kane nonparabolicity alpha = -b / a^2 of the
+# dispersion E (1 + alpha E) = hbar^2 k^2 / 2 m follow. Any Hamiltonian
+# that can be evaluated for arrays of momenta can be fitted, i.e. bulk
+# models, their discretized versions and discretized systems with
+# confinement in some directions.
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from . import profiling
+from .numeric import PolynomialHamiltonian, band_derivatives
+from .parameters import taa
+
+BandFit = namedtuple("BandFit", ["edges", "inverse_masses", "nonparabolicity"])
+BandFit.__doc__ = """Result of a fit of bands along multiple directions.
+
+Attributes
+----------
+edges : array of shape (..., n_bands)
+    Energies at the expansion point.
+inverse_masses : array of shape (..., n_directions, n_bands)
+    Inverse effective masses in units of 1 / m_0.
+nonparabolicity : array of shape (..., n_directions, n_bands)
+    Nonparabolicity in units of 1 / eV.
+"""
+
+
+def _normalize(directions):
+    directions = np.atleast_2d(np.asarray(directions, dtype=float))
+    if directions.shape[-1] != 3:
+        raise ValueError("Directions must be given as vectors (x, y, z).")
+    return directions / np.linalg.norm(directions, axis=-1, keepdims=True)
+
+
+@profiling.register("masses.fit_bands")
+def fit_bands(hamiltonian, directions, k_max=0.05, n_k=5, k0=(0, 0, 0)):
+    """Fit effective masses and nonparabolicity of all bands.
+
+    Parameters
+    ----------
+    hamiltonian : callable
+        Function of (k_x, k_y, k_z) accepting broadcastable arrays and
+        returning an array of shape ``broadcast_shape + batch + (n, n)``,
+        for example `PolynomialHamiltonian` or `system_hamiltonian`.
+    directions : array of shape (n_directions, 3)
+        Directions of the fit, normalized automatically.
+    k_max : float
+        Largest momentum (in 1 / nm) of the fit.
+    n_k : int
+        Number of momenta per direction, at least 2.
+    k0 : sequence of 3 floats
+        Expansion point.
+
+    Returns
+    -------
+    BandFit
+        Bands are ordered by energy at each momentum.
+    """
+    if n_k < 2:
+        raise ValueError("At least two momenta per direction are required.")
+    directions = _normalize(directions)
+    k = np.linspace(0, k_max, n_k + 1)
+
+    # momenta of shape (3, n_directions, n_k + 1)
+    momenta = np.asarray(k0, dtype=float)[:, None, None] + np.einsum(
+        "di,k->idk", directions, k
+    )
+    energies = np.linalg.eigvalsh(hamiltonian(*momenta))
+    energies = np.moveaxis(energies, (0, 1), (-3, -2))
+    edges = energies[..., 0, 0, :]
+    differences = energies[..., 1:, :] - energies[..., :1, :]
+
+    design = np.stack([k[1:] ** 2, k[1:] ** 4], axis=-1)
+    a, b = np.einsum("pk,...kn->p...n", np.linalg.pinv(design), differences)
+    return BandFit(edges=edges, inverse_masses=a / taa, nonparabolicity=-b / a**2)
+
+
+def inverse_mass_tensors(hamiltonian, k_x=0, k_y=0, k_z=0, direction=None):
+    """Inverse effective mass tensors from analytic derivatives.
+
+    Parameters
+    ----------
+    hamiltonian : PolynomialHamiltonian
+    k_x, k_y, k_z : numbers or broadcastable arrays of momenta
+    direction : sequence of 3 floats or None
+        Direction used to resolve degenerate bands, e.g. heavy and light
+        holes at k = 0, see `numeric.band_derivatives`.
+
+    Returns
+    -------
+    array of shape ``broadcast_shape + (n, 3, 3)`` in units of 1 / m_0
+        Tensors of degenerate bands are exact only along ``direction``,
+        without it they are averaged over the degenerate subspace.
+    """
+    _, _, curvatures = band_derivatives(hamiltonian, k_x, k_y, k_z, direction=direction)
+    return curvatures / (2 * taa)
+
+
+def system_hamiltonian(syst, params, grid_spacing=1):
+    """Batched Hamiltonian of a finalized (wrapped around) Kwant system.
+
+    Parameters
+    ----------
+    syst : kwant.system.FiniteSystem
+        System with momenta ``k_x``, ``k_y`` and/or ``k_z`` as parameters,
+        e.g. created with ``kwant.wraparound.wraparound``.
+    params : dict
+        Other parameters of the system.
+    grid_spacing : float
+        Lattice constant, momenta of the system are ``k * grid_spacing``.
+
+    Returns
+    -------
+    function of (k_x, k_y, k_z), see `fit_bands`
+    """
+    names = [k for k in ("k_x", "k_y", "k_z") if k in syst.parameters]
+
+    def evaluate(k_x=0, k_y=0, k_z=0):
+        ks = dict(zip(("k_x", "k_y", "k_z"), np.broadcast_arrays(k_x, k_y, k_z)))
+        shape = ks["k_x"].shape
+        output = None
+        for i, index in enumerate(np.ndindex(*shape)):
+            momenta = {k: grid_spacing * ks[k][index] for k in names}
+            h = syst.hamiltonian_submatrix(params={**params, **momenta})
+            if output is None:
+                output = np.empty(shape + h.shape, dtype=complex)
+            output[index] = h
+        return output
+
+    return evaluate
+
+
+def luttinger_parameters(heavy_001, light_001, heavy_111):
+    """Luttinger parameters from inverse masses of holes.
+
+    Parameters
+    ----------
+    heavy_001, light_001, heavy_111 : floats or arrays
+        Inverse masses (in units of 1 / m_0, negative for holes) of heavy
+        and light holes along [001] and heavy holes along [111].
+
+    Returns
+    -------
+    dictionary with "gamma_1", "gamma_2" and "gamma_3"
+    """
+    gamma_1 = -(heavy_001 + light_001) / 2
+    return {
+        "gamma_1": gamma_1,
+        "gamma_2": (heavy_001 - light_001) / 4,
+        "gamma_3": (gamma_1 + heavy_111) / 2,
+    }
+
+
+def _band_labels(model, hamiltonian, directions, k):
+    """Label bands of ZincBlende model ordered by energy near k = 0.
+
+    Heavy and light holes of the gamma_8v band are distinguished by the
+    square of the angular momentum along the direction.
+    """
+    # vectors of shape (n_directions, ..., n, n)
+    _, vectors = np.linalg.eigh(hamiltonian(*(k * np.asarray(directions).T)))
+
+    weights = {
+        band: np.einsum("...an,ab,...bn->...n", vectors.conj(), p, vectors).real
+        for band, p in model.band_projectors.items()
+    }
+    labels = np.array(list(weights))[np.argmax(list(weights.values()), axis=0)]
+
+    if "gamma_8v" in weights:
+        J = np.einsum("di,iab->dab", directions, model.spin_matrices)
+        projected = np.einsum(
+            "d...an,dab,d...bn->d...n", vectors.conj(), J @ J, vectors
+        ).real
+        heavy = projected / np.maximum(weights["gamma_8v"], 1e-12) > 5 / 4
+        labels = np.where(
+            labels == "gamma_8v", np.where(heavy, "heavy", "light"), labels
+        )
+    return labels
+
+
+def _mean_over_label(values, labels, label):
+    mask = labels == label
+    return np.sum(values * mask, axis=-1) / mask.sum(axis=-1)
+
+
+@profiling.register("masses.databank_masses")
+def databank_masses(
+    model, databank, materials=None, grid_spacing=None, k_max=0.05, **kwargs
+):
+    """Effective masses and Luttinger parameters of databank materials.
+
+    All materials are evaluated together in a single batch.
+
+    Parameters
+    ----------
+    model : ZincBlende
+        Bulk model, parameters must not depend on position.
+    databank : DataBank
+    materials : sequence of str or None
+        Materials to process, by default all materials of the databank
+        with complete parameters.
+    grid_spacing : float or None
+        If given, masses of the discretized model are calculated.
+    k_max : float
+        Largest momentum of the fit, bands are labeled at this momentum.
+    kwargs
+        Passed to `fit_bands`.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Masses (positive for holes) in units of m_0 and nonparabolicity
+        of the conduction band in 1 / eV. Columns of bands that are not
+        in the model are omitted.
+    """
+    from .renormalization import lattice_hamiltonian
+
+    if materials is None:
+        materials = [
+            m for m, p in databank.items() if all(v is not None for v in p.values())
+        ]
+    coefficients = [
+        model.lambdify(model.parameters(m, databank)).coefficients for m in materials
+    ]
+    hamiltonian = PolynomialHamiltonian(
+        {p: np.array([c[p] for c in coefficients]) for p in coefficients[0]}
+    )
+    if grid_spacing is not None:
+        hamiltonian = lattice_hamiltonian(hamiltonian, grid_spacing)
+
+    directions = _normalize([[0, 0, 1], [1, 1, 1]])
+    fit = fit_bands(hamiltonian, directions, k_max=k_max, **kwargs)
+    # labels of shape (n_directions, n_materials, n)
+    labels = _band_labels(model, hamiltonian, directions, k_max)
+
+    # quantities of shape (n_materials, n_directions, n)
+    labels = np.swapaxes(labels, 0, 1)
+    inverse = fit.inverse_masses
+    alpha = fit.nonparabolicity
+
+    data = {}
+    bands = [str(b) for b in model.bands]
+    if "gamma_6c" in bands:
+        inverse_c = _mean_over_label(inverse, labels, "gamma_6c")
+        data["m_c"] = 1 / inverse_c[:, 0]
+        data["alpha_c"] = _mean_over_label(alpha, labels, "gamma_6c")[:, 0]
+    if "gamma_8v" in bands:
+        heavy = _mean_over_label(inverse, labels, "heavy")
+        light = _mean_over_label(inverse, labels, "light")
+        data["m_hh_001"] = -1 / heavy[:, 0]
+        data["m_lh_001"] = -1 / light[:, 0]
+        data["m_hh_111"] = -1 / heavy[:, 1]
+        data["m_lh_111"] = -1 / light[:, 1]
+        data.update(luttinger_parameters(heavy[:, 0], light[:, 0], heavy[:, 1]))
+    if "gamma_7v" in bands:
+        inverse_so = _mean_over_label(inverse, labels, "gamma_7v")
+        data["m_so"] = -1 / inverse_so[:, 0]
+
+    return pd.DataFrame(data, index=materials)
@@ -2,6 +2,7 @@
 # See comments for each group of functions for more details.
 
 
+import hashlib
 import warnings
 from collections import defaultdict
 
@@ -11,6 +12,7 @@ import scipy.linalg as la
 import sympy
 from scipy.interpolate import interp1d
 
+from . import profiling
 from .symbols import momentum
 
 try:
@@ -40,6 +42,31 @@ def spin_matrices(s):
     return np.array([Sx, Sy, Sz])
 
 
+def expectation_values(operators, vectors):
+    """Calculate expectation values of operators for stacks of vectors.
+
+    Parameters
+    ----------
+    operators : array of shape (n, n) or (p, n, n)
+        Hermitian operators, for example spin operators or band projectors.
+    vectors : array of shape (..., n, m)
+        Normalized vectors stored as columns, as returned by ``np.linalg.eigh``.
+
+    Returns
+    -------
+    array of shape (..., m) or (..., p, m)
+    """
+    operators = np.asarray(operators)
+    vectors = np.asarray(vectors)
+    if operators.ndim == 2:
+        return np.einsum(
+            "...an,ab,...bn->...n", vectors.conj(), operators, vectors, optimize=True
+        ).real
+    return np.einsum(
+        "...an,pab,...bn->...pn", vectors.conj(), operators, vectors, optimize=True
+    ).real
+
+
 def _prettify_term(expr, decimals=None, zero_atol=None, nsimplify=False):
     terms = [(k, v) for k, v in monomials(expr).items()]
 
@@ -65,6 +92,7 @@ def _prettify_term(expr, decimals=None, zero_atol=None, nsimplify=False):
     return sympy.Add(*output)
 
 
+@profiling.register("misc.prettify")
 def prettify(expression, decimals=None, zero_atol=None, nsimplify=False):
     """Prettify SymPy expression.
 
@@ -109,12 +137,15 @@ def _validate_rotation_matrix(R):
 
 def _basis_rotation(R, spin_operators):
     R = sympy_to_numpy(R, dtype=float)
-    n = Rotation.from_dcm(R).as_rotvec()
+    # "from_dcm" was renamed to "from_matrix" in scipy 1.4 and later removed
+    from_matrix = getattr(Rotation, "from_matrix", None) or Rotation.from_dcm
+    n = from_matrix(R).as_rotvec()
     spin_operators = [sympy_to_numpy(s) for s in spin_operators]
     ns = np.sum([ni * si for (ni, si) in zip(n, spin_operators)], axis=0)
     return la.expm(1j * ns)
 
 
+@profiling.register("misc.rotate")
 def rotate(expr, R, act_on=momentum, spin_operators=None):
     if not rotation_functionality_available:
         raise RuntimeError(
@@ -169,6 +200,7 @@ def make_commutative(expr, *symbols):
     return expr
 
 
+@profiling.register("misc.monomials")
 def monomials(expr, gens=None):
     """Parse ``expr`` into monomials in the symbols in ``gens``.
 
@@ -236,7 +268,76 @@ def _expression_monomials(expr, gens):
     return dict(output)
 
 
+# Stable hashes of expressions, e.g. for keys of on-disk caches. Terms are
+# reduced to a canonical form: the exact numerical factor (sympy.srepr of
+# Integers, Rationals and Floats at full precision), sorted commutative
+# factors and the ordered non-commutative factors (momenta and functions of
+# position). Factors are written with sympy.srepr, so symbols with
+# different assumptions are distinct. Only terms that cancel exactly are
+# removed.
+
+
+def _expanded_terms(expr):
+    for term in sympy.Add.make_args(expr):
+        factors = [f.as_base_exp()[0] for f in sympy.Mul.make_args(term)]
+        if any(isinstance(f, sympy.Add) for f in factors):
+            yield from sympy.Add.make_args(sympy.expand(term))
+        else:
+            yield term
+
+
+def _canonical_terms(expr):
+    output = defaultdict(lambda: sympy.S.Zero)
+    for term in _expanded_terms(sympy.sympify(expr)):
+        commutative, noncommutative = term.args_cnc()
+        numbers, symbols = [], []
+        for factor in commutative:
+            if factor.is_number:
+                numbers.append(factor)
+            else:
+                symbols.append(sympy.srepr(factor))
+        key = (tuple(sorted(symbols)), tuple(map(sympy.srepr, noncommutative)))
+        output[key] += sympy.Mul(*numbers)
+
+    return sorted(
+        key + (sympy.srepr(number),) for key, number in output.items() if number != 0
+    )
+
+
+@profiling.register("misc.fingerprint")
+def fingerprint(expr):
+    """Stable hash of a sympy expression or matrix.
+
+    Equal for expressions that have equal canonical forms, i.e. that differ
+    only by the order or grouping of terms, in every Python process.
+    Numerical factors are compared exactly, so e.g. ``0.5 * A`` and
+    ``A / 2`` have different fingerprints.
+
+    Parameters
+    ----------
+    expr : sympy.Expr, sympy.Matrix or str
+
+    Returns
+    -------
+    str, hexadecimal SHA-256 digest
+    """
+    if isinstance(expr, str):
+        expr = kwant.continuum.sympify(expr)
+
+    digest = hashlib.sha256()
+    if isinstance(expr, sympy.MatrixBase):
+        digest.update(repr(expr.shape).encode())
+        elements = np.ndenumerate(np.array(expr.tolist(), dtype=object))
+    else:
+        elements = [((), expr)]
+    for index, element in elements:
+        for term in _canonical_terms(element):
+            digest.update(repr((index,) + term).encode())
+    return digest.hexdigest()
+
+
 ### Helper functions, to be replaced with something better...
+@profiling.register("misc.two_deg")
 def two_deg(parameters, widths, grid_spacing, extra_constants=None):
     """Get parameter functions for a specified 2D heterostructure.
 
@@ -1,16 +1,23 @@
 import abc
+import collections
 import copy
+import functools
 import json
 import os
+import types
 
 import kwant.continuum
 import numpy as np
 import scipy.linalg as la
 import sympy
 
-from . import parameters
-from .misc import prettify, rotate, spin_matrices
-from .symbols import momentum
+from . import numeric, parameters, profiling, templates
+from .kp_models import serialization
+from .misc import fingerprint, prettify, rotate, spin_matrices
+from .parameters import ParameterRecord
+from .symbols import momentum, position
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 
 # Read the cache
@@ -19,14 +26,80 @@ def _load_cache():
 
     File semicon/cache.json should be created on package build.
     """
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
     fname = os.path.join(BASE_DIR, "model_cache.json")
     with open(fname) as f:
         models_cache = json.load(f)
     return models_cache
 
 
+def _load_terms():
+    """Load structured model cache, see `kp_models.serialization`.
+
+    File semicon/model_cache.npz is created on package build. If it is
+    missing (package built with older version) None is returned and models
+    are built from the string cache.
+    """
+    fname = os.path.join(BASE_DIR, "model_cache.npz")
+    if not os.path.exists(fname):
+        return None
+    return serialization.load(fname)
+
+
 _models_cache = _load_cache()
+_models_terms = _load_terms()
+
+
+def _read_only(array):
+    array = np.array(array)
+    array.setflags(write=False)
+    return array
+
+
+# Operators below depend only on the sequence of bands (and their spins),
+# therefore they are computed once and shared between all model instances.
+@functools.lru_cache(maxsize=None)
+def _spin_operators(spins):
+    operators = []
+    for s in spins:
+        # Explicit if clause seems more clear than oneliner with np.sign
+        # spin_matrices: float -> tupple of three spin operators (x, y, z)
+        if s > 0:
+            operators.append(spin_matrices(s))
+        else:
+            operators.append(-spin_matrices(-s))
+
+    operators = [la.block_diag(*[p[i] for p in operators]) for i in range(3)]
+
+    return _read_only(operators)
+
+
+@functools.lru_cache(maxsize=None)
+def _band_index_map(bands, spins):
+    sizes = [int(round(2 * abs(s) + 1)) for s in spins]
+    offsets = np.cumsum([0] + sizes)
+    indices = {
+        band: _read_only(np.arange(start, stop))
+        for band, start, stop in zip(bands, offsets[:-1], offsets[1:])
+    }
+    return types.MappingProxyType(indices)
+
+
+@functools.lru_cache(maxsize=None)
+def _band_projectors(bands, spins):
+    indices = _band_index_map(bands, spins)
+    size = sum(len(i) for i in indices.values())
+    projectors = {}
+    for band, i in indices.items():
+        projector = np.zeros((size, size))
+        projector[i, i] = 1
+        projectors[band] = _read_only(projector)
+    return types.MappingProxyType(projectors)
+
+
+@functools.lru_cache(maxsize=None)
+def _total_angular_momentum(spins):
+    operators = _spin_operators(spins)
+    return _read_only(sum(o @ o for o in operators))
 
 
 def validate_coords(coords):
@@ -44,26 +117,45 @@ class Model(metaclass=abc.ABCMeta):
 
     Parameters
     ----------
-    hamiltonian : sympy.Expr or sympy.Matrix
-        Corresponding Hamiltonian.
+    hamiltonian : str, sympy.Expr, sympy.Matrix or dict
+        Corresponding Hamiltonian. A dictionary maps momentum monomials,
+        given as tuples of powers of (k_x, k_y, k_z) or as sympy
+        expressions, to numerical coefficient matrices; its sympy form is
+        created only when the ``hamiltonian`` attribute is accessed.
 
     Attributes
     ----------
     hamiltonian : str, sympy.Expr or sympy.Matrix
-    spin_operators : spin_operators, a 3D tensor
+    spin_matrices : array of shape (3, n, n), spin operators of the model
+                    or None (the static method spin_operators builds them)
     spins : sequence of spins, alternative to spin_operators
     locals : dict or None, to be passed to kwant.continuum.sympify if
              hamiltonian is string
+    orientation : 3x3 array, momenta of the model k correspond to momenta
+                  ``orientation @ k`` in the original (crystal) frame;
+                  updated by rotate
 
     Methods
     -------
     rotate : rotate model, see documentation of the method
     prettify : prettify model, see documentation of the meth
+    velocity_operators : first derivatives of the Hamiltonian in momenta
+    curvature_operators : second derivatives of the Hamiltonian in momenta
+    lambdify : numerical Hamiltonian for batched evaluation
+    fingerprint : stable hash of the Hamiltonian
+    discretize : cached tight-binding template
     """
 
+    _lambdified_cache_size = 128
+
     def __init__(self, hamiltonian, spin_operators=None, spins=None, locals=None):
+        coefficients = None
         if isinstance(hamiltonian, str):
             hamiltonian = kwant.continuum.sympify(hamiltonian, locals=locals)
+        elif isinstance(hamiltonian, dict) and locals is None:
+            coefficients = numeric.PolynomialHamiltonian(
+                {numeric.monomial_powers(k): v for k, v in hamiltonian.items()}
+            )
         elif locals is not None:
             raise ValueError(
                 "locals can be not None only when hamiltonian is " "of type string."
@@ -72,29 +164,54 @@ class Model(metaclass=abc.ABCMeta):
         if (spin_operators is not None) and (spins is not None):
             raise ValueError('"spin_operators" and "spins" are mutually exclusive')
         elif spins is not None:
-            spin_operators = self.spin_operators(spins)
+            spin_operators = Model.spin_operators(spins)
 
         if spin_operators is not None:
-            expected_shape = (3, *hamiltonian.shape)
+            shape = hamiltonian.shape if coefficients is None else coefficients.shape
+            expected_shape = (3, *shape)
             if spin_operators.shape != expected_shape:
                 raise ValueError(
                     "Shape of spin operators is expected to "
                     "be {}".format(expected_shape)
                 )
 
-        self.hamiltonian = hamiltonian
-        self.spin_operators = spin_operators
+        if coefficients is None:
+            self.hamiltonian = hamiltonian
+        else:
+            self._hamiltonian, self._derived = None, {}
+        self._numeric = coefficients
+        self.spin_matrices = spin_operators
+        self.orientation = np.eye(3)
 
+    @property
+    def hamiltonian(self):
+        if self._hamiltonian is None:
+            self._hamiltonian = self._numeric.to_sympy()
+        return self._hamiltonian
+
+    @hamiltonian.setter
+    def hamiltonian(self, value):
+        # Quantities derived from the Hamiltonian are cached in "_derived"
+        # and must be invalidated whenever the Hamiltonian changes.
+        self._hamiltonian = value
+        self._derived = {}
+        self._numeric = None
+
+    @profiling.register("models.rotate")
     def rotate(self, R, act_on=momentum, act_on_spin=True):
-        spin_operators = self.spin_operators if act_on_spin else None
+        spin_operators = self.spin_matrices if act_on_spin else None
         hamiltonian = rotate(
             self.hamiltonian, R=R, act_on=act_on, spin_operators=spin_operators
         )
 
         output = copy.deepcopy(self)
         output.hamiltonian = hamiltonian
+        # H'(k) = H(R k), so rotations of momenta accumulate on the right
+        if any(tuple(row) == tuple(momentum) for row in np.atleast_2d(act_on)):
+            output.orientation = self.orientation @ np.asarray(R, dtype=float)
         return output
 
+    @profiling.register("models.prettify")
     def prettify(self, decimals=None, zero_atol=None, nsimplify=False):
         hamiltonian = prettify(
             self.hamiltonian,
@@ -107,20 +224,97 @@ class Model(metaclass=abc.ABCMeta):
         output.hamiltonian = hamiltonian
         return output
 
+    def velocity_operators(self):
+        """Derivatives of the Hamiltonian with respect to momenta.
+
+        Returns
+        -------
+        list of three sympy expressions: dH/dk_x, dH/dk_y and dH/dk_z
+        """
+        if "velocity_operators" not in self._derived:
+            self._derived["velocity_operators"] = [
+                sympy.diff(self.hamiltonian, k) for k in momentum
+            ]
+        return self._derived["velocity_operators"]
+
+    def curvature_operators(self):
+        """Second derivatives of the Hamiltonian with respect to momenta.
+
+        Returns
+        -------
+        nested 3x3 list of sympy expressions: d^2H/dk_i dk_j
+        """
+        if "curvature_operators" not in self._derived:
+            self._derived["curvature_operators"] = [
+                [sympy.diff(v, k) for k in momentum] for v in self.velocity_operators()
+            ]
+        return self._derived["curvature_operators"]
+
+    @profiling.register("models.lambdify")
+    def lambdify(self, parameters=None):
+        """Create numerical Hamiltonian for batched evaluation in momenta.
+
+        Symbolic decomposition of the Hamiltonian into powers of momenta
+        is done only once per model, subsequent calls only substitute
+        numerical values of parameters.
+
+        Parameters
+        ----------
+        parameters : dict, parameters.ParameterRecord or None
+            Numerical values of all symbols apart from the momenta. Results
+            for (hashable) parameter records are cached, up to
+            ``_lambdified_cache_size`` records per model. Not used by models
+            created from numerical coefficients.
+
+        Returns
+        -------
+        numeric.PolynomialHamiltonian
+        """
+        if self._numeric is not None:
+            return self._numeric
+        if "coefficients" not in self._derived:
+            coefficients = numeric.symbolic_coefficients(self.hamiltonian)
+            self._derived["coefficients"] = numeric.lambdify_coefficients(coefficients)
+        evaluate = self._derived["coefficients"]
+        if not isinstance(parameters, ParameterRecord):
+            return numeric.PolynomialHamiltonian(evaluate(parameters or {}))
+
+        # least recently used records are dropped
+        cache = self._derived.setdefault("lambdified", collections.OrderedDict())
+        if parameters in cache:
+            cache.move_to_end(parameters)
+            return cache[parameters]
+        cache[parameters] = numeric.PolynomialHamiltonian(evaluate(parameters))
+        if len(cache) > self._lambdified_cache_size:
+            cache.popitem(last=False)
+        return cache[parameters]
+
+    def fingerprint(self):
+        """Stable hash of the Hamiltonian, see `misc.fingerprint`."""
+        if "fingerprint" not in self._derived:
+            self._derived["fingerprint"] = fingerprint(self.hamiltonian)
+        return self._derived["fingerprint"]
+
+    def discretize(self, coords, grid_spacing, cache_dir=None):
+        """Tight-binding template of the model, see `templates.discretize`.
+
+        The symbolic discretization is cached in memory and on disk.
+        """
+        return templates.discretize(
+            self.hamiltonian,
+            coords,
+            grid_spacing,
+            cache_dir=cache_dir,
+            fingerprint=self.fingerprint(),
+        )
+
     @staticmethod
     def spin_operators(spins):
-        operators = []
-        for s in np.atleast_1d(spins):
-            # Explicit if clause seems more clear than oneliner with np.sign
-            # spin_matrices: float -> tupple of three spin operators (x, y, z)
-            if s > 0:
-                operators.append(spin_matrices(s))
-            else:
-                operators.append(-spin_matrices(-s))
-
-        operators = [la.block_diag(*[p[i] for p in operators]) for i in range(3)]
+        """Block diagonal spin operators for a sequence of spins.
 
-        return np.array(operators)
+        Operators are cached and returned as read-only arrays.
+        """
+        return _spin_operators(tuple(float(s) for s in np.atleast_1d(spins)))
 
 
 class BandModel(Model):
@@ -185,6 +379,21 @@ class BandModel(Model):
         spins = [self._band_spins[band] for band in self.bands]
         return spins
 
+    @property
+    def band_indices(self):
+        """Mapping: band name -> indices of the band in the Hamiltonian."""
+        return _band_index_map(tuple(str(b) for b in self.bands), tuple(self.spins))
+
+    @property
+    def band_projectors(self):
+        """Mapping: band name -> projector on the band (read-only array)."""
+        return _band_projectors(tuple(str(b) for b in self.bands), tuple(self.spins))
+
+    @property
+    def total_angular_momentum(self):
+        """Operator of the total angular momentum J^2 (read-only array)."""
+        return _total_angular_momentum(tuple(self.spins))
+
 
 class ZincBlende(BandModel):
     """Model for ZincBlende crystals."""
@@ -218,6 +427,7 @@ class ZincBlende(BandModel):
         default_databank=None,
     ):
         self._parameter_coords = parameter_coords
+        self._bare_cache = {}
 
         if isinstance(default_databank, str):
             self.default_databank = parameters.DataBank(default_databank)
@@ -226,10 +436,24 @@ class ZincBlende(BandModel):
 
         BandModel.__init__(self, bands=bands, components=components)
 
+    @profiling.register("models.build_hamiltonian")
     def _build_hamiltonian(self):
         # return foreman(self._parameter_coords, self.components, self.bands)
         if self._parameter_coords is not None:
             self._parameter_coords = validate_coords(self._parameter_coords)
+
+        indices = []
+        for band in self.bands:
+            indices += self._band_indices[band]
+
+        if _models_terms is not None:
+            return self._hamiltonian_from_terms(indices)
+
+        hamiltonian = self._hamiltonian_from_strings()
+        return hamiltonian[:, indices][indices, :]
+
+    def _hamiltonian_from_strings(self):
+        if self._parameter_coords is not None:
             str_coords = "({})".format(", ".join(self._parameter_coords))
             subs = {v: v + str_coords for v in self._varied_parameters}
         else:
@@ -240,20 +464,37 @@ class ZincBlende(BandModel):
             for c in self.components
         ]
 
-        hamiltonian = sympy.ImmutableMatrix(sympy.MatAdd(*hamiltonian_components))
+        return sympy.ImmutableMatrix(sympy.MatAdd(*hamiltonian_components))
 
-        indices = []
-        for band in self.bands:
-            indices += self._band_indices[band]
+    def _hamiltonian_from_terms(self, indices):
+        # Only the requested band blocks are selected, before any sympy
+        # expression is created, and components are summed term-wise.
+        terms = _models_terms[self.components[0]].submatrix(indices)
+        for c in self.components[1:]:
+            terms = terms + _models_terms[c].submatrix(indices)
 
-        return hamiltonian[:, indices][indices, :]
+        # Symbols are created in the same way as kwant.continuum.sympify
+        # would create them when parsing the string cache.
+        symbols = {k.name: k for k in momentum}
+        if self._parameter_coords is not None:
+            coords = [r for r in position if r.name in self._parameter_coords]
+            symbols.update(
+                {v: sympy.Function(v)(*coords) for v in self._varied_parameters}
+            )
+        symbols = {n: symbols.get(n, sympy.Symbol(n)) for n in terms.names}
 
-    def parameters(self, material, databank=None, valence_band_offset=0):
+        return terms.to_sympy(symbols)
+
+    def _databank(self, databank):
         if databank is None:
             if self.default_databank is not None:
-                databank = self.default_databank
-            else:
-                raise ValueError("No databank provided.")
+                return self.default_databank
+            raise ValueError("No databank provided.")
+        return databank
+
+    @profiling.register("models.parameters")
+    def parameters(self, material, databank=None, valence_band_offset=0):
+        databank = self._databank(databank)
 
         output = parameters.ZincBlendeParameters(
             name=material,
@@ -264,3 +505,50 @@ class ZincBlende(BandModel):
 
         output.update(parameters.constants)
         return output
+
+    @profiling.register("models.parameters_batch")
+    def parameters_batch(self, materials, valence_band_offset=0, databank=None):
+        """Position dependent parameters of many materials at once.
+
+        Parameters
+        ----------
+        materials : str or array of str
+            Names of materials in the databank.
+        valence_band_offset : float or array
+            Broadcastable against ``materials``, e.g. of shape
+            ``(n_stacks, n_layers)`` for a batch of stacks.
+        databank : DataBank or None
+            By default the ``default_databank`` of the model.
+
+        Returns
+        -------
+        structured array of shape ``broadcast_shape``
+            With one float field for each of ``_varied_parameters`` (NaN if
+            missing in the databank). Elements are records that are accepted
+            in place of parameter dictionaries by `misc.two_deg`, constants
+            are not included (see `parameters.constants`).
+        """
+        databank = self._databank(databank)
+        materials = np.asarray(materials)
+        offsets = np.asarray(valence_band_offset, dtype=float)
+
+        # bare parameters depend only on the effective ones and are cached
+        # by their contents, so changes of databank entries are respected
+        names, inverse = np.unique(materials, return_inverse=True)
+        table = np.zeros(len(names), [(p, float) for p in self._varied_parameters])
+        for i, name in enumerate(names):
+            effective = databank[name]
+            key = tuple(sorted(effective.items()))
+            if key not in self._bare_cache:
+                bare = parameters.ZincBlendeParameters(
+                    name=name, bands=self.bands, parameters=effective
+                )
+                values = tuple(bare.get(p, np.nan) for p in self._varied_parameters)
+                self._bare_cache[key] = values
+            table[i] = self._bare_cache[key]
+
+        output = table[inverse.reshape(materials.shape)]
+        output = np.broadcast_to(output, np.broadcast(output, offsets).shape)
+        output = output.copy()
+        output["E_v"] += offsets
+        return output
@@ -0,0 +1,358 @@
+# Numerical counterparts of the symbolic models.
+#
+# Hamiltonians of semicon models are polynomials in momenta, therefore they
+# can be stored as a mapping from momentum powers to numerical coefficient
+# matrices and evaluated for whole grids of momenta at once.
+
+
+import kwant.continuum
+import numpy as np
+import sympy
+
+from . import profiling
+from .misc import make_commutative, monomials
+from .symbols import momentum
+
+_momentum_names = tuple(k.name for k in momentum)
+
+
+def _powers(monomial):
+    """Convert commutative monomial in momenta into tuple of powers."""
+    powers = monomial.as_powers_dict()
+    return tuple(int(powers.get(sympy.Symbol(k), 0)) for k in _momentum_names)
+
+
+def monomial_powers(monomial):
+    """Tuple of powers of (k_x, k_y, k_z) of a momentum monomial.
+
+    Parameters
+    ----------
+    monomial : tuple of ints, str or sympy.Expr
+        E.g. ``(2, 0, 1)``, ``"k_x**2 * k_z"`` or ``1``.
+    """
+    if isinstance(monomial, tuple):
+        return tuple(int(p) for p in monomial)
+    if isinstance(monomial, str):
+        monomial = kwant.continuum.sympify(monomial)
+    monomial = make_commutative(sympy.sympify(monomial), *momentum)
+    powers = _powers(monomial)
+    expected = sympy.Mul(
+        *[sympy.Symbol(k) ** p for k, p in zip(_momentum_names, powers)]
+    )
+    if monomial != expected:
+        raise ValueError("{} is not a monomial in momenta.".format(monomial))
+    return powers
+
+
+def symbolic_coefficients(expr):
+    """Decompose Hamiltonian into momentum powers and symbolic coefficients.
+
+    Parameters
+    ----------
+    expr : sympy.Expr or sympy.Matrix
+        Hamiltonian that is polynomial in momenta. Momenta are treated as
+        commutative, i.e. parameters must not depend on position.
+
+    Returns
+    -------
+    dictionary (tuple of powers of (k_x, k_y, k_z): sympy.Matrix)
+    """
+    if not isinstance(expr, sympy.MatrixBase):
+        expr = sympy.Matrix([[expr]])
+
+    positions = {"x", "y", "z"}
+    if any(s.name in positions for s in expr.atoms(sympy.Symbol)):
+        raise ValueError(
+            "Numerical evaluation requires parameters that do not "
+            "depend on position."
+        )
+
+    expr = make_commutative(expr, *momentum)
+    gens = [sympy.Symbol(k) for k in _momentum_names]
+
+    output = {}
+    for key, value in monomials(expr, gens=gens).items():
+        powers = _powers(key)
+        if powers in output:
+            output[powers] += value
+        else:
+            output[powers] = value
+    return output
+
+
+def lambdify_coefficients(coefficients):
+    """Create function evaluating symbolic coefficients numerically.
+
+    Parameters
+    ----------
+    coefficients : dict
+        Output of `symbolic_coefficients`.
+
+    Returns
+    -------
+    function: dict of parameters -> dict (tuple of powers: np.ndarray)
+    """
+    functions = {}
+    for powers, value in coefficients.items():
+        symbols = sorted(value.free_symbols, key=lambda s: s.name)
+        f = sympy.lambdify(symbols, value, modules="numpy")
+        functions[powers] = (f, [s.name for s in symbols])
+
+    def evaluate(parameters):
+        output = {}
+        for powers, (f, names) in functions.items():
+            try:
+                values = [parameters[name] for name in names]
+            except KeyError as error:
+                raise ValueError(
+                    "Parameter {} is required to evaluate the "
+                    "Hamiltonian.".format(error)
+                )
+            output[powers] = np.array(f(*values), dtype=complex)
+        return output
+
+    return evaluate
+
+
+def _number(value):
+    if value.imag:
+        return sympy.Float(value.real) + sympy.I * sympy.Float(value.imag)
+    return sympy.Float(value.real)
+
+
+class PolynomialHamiltonian:
+    """Numerical Hamiltonian that is polynomial in momenta.
+
+    Parameters
+    ----------
+    coefficients : dict
+        Mapping from powers of (k_x, k_y, k_z) to coefficient matrices.
+
+    Attributes
+    ----------
+    coefficients : dict (tuple of powers: np.ndarray)
+    shape : shape of the Hamiltonian matrix
+    """
+
+    def __init__(self, coefficients):
+        coefficients = {
+            tuple(int(p) for p in powers): np.atleast_2d(np.asarray(c, dtype=complex))
+            for powers, c in coefficients.items()
+        }
+        if not coefficients:
+            raise ValueError("At least one coefficient must be provided.")
+
+        shapes = {c.shape for c in coefficients.values()}
+        if len(shapes) != 1:
+            raise ValueError("All coefficients must have the same shape.")
+
+        if any(len(p) != len(_momentum_names) for p in coefficients):
+            raise ValueError("Powers must be given for (k_x, k_y, k_z).")
+
+        self.coefficients = coefficients
+        self.shape = shapes.pop()
+
+    def to_sympy(self):
+        """Symbolic form of the Hamiltonian with non-commutative momenta."""
+        output = sympy.zeros(*self.shape)
+        for powers, c in self.coefficients.items():
+            monomial = sympy.Mul(*[k**p for k, p in zip(momentum, powers)])
+            matrix = sympy.Matrix(
+                *self.shape, [_number(v) * monomial for v in c.ravel()]
+            )
+            output += matrix
+        return sympy.ImmutableMatrix(output)
+
+    @classmethod
+    def from_sympy(cls, expr, parameters=None):
+        """Create numerical Hamiltonian from a sympy expression.
+
+        Parameters
+        ----------
+        expr : sympy.Expr or sympy.Matrix
+            Hamiltonian that is polynomial in momenta.
+        parameters : dict or None
+            Numerical values of all symbols apart from the momenta.
+        """
+        parameters = {} if parameters is None else parameters
+        evaluate = lambdify_coefficients(symbolic_coefficients(expr))
+        return cls(evaluate(parameters))
+
+    def __call__(self, k_x=0, k_y=0, k_z=0):
+        """Evaluate Hamiltonian for (broadcastable arrays of) momenta.
+
+        Returns
+        -------
+        array of shape ``np.broadcast(k_x, k_y, k_z).shape + self.shape``
+        """
+        ks = np.broadcast_arrays(*[np.asarray(k) for k in (k_x, k_y, k_z)])
+        powers = list(self.coefficients)
+
+        factors = np.ones((len(powers),) + ks[0].shape, dtype=np.result_type(*ks))
+        for i, p in enumerate(powers):
+            for k, n in zip(ks, p):
+                if n:
+                    factors[i] = factors[i] * k**n
+
+        coefficients = np.array([self.coefficients[p] for p in powers])
+        return np.tensordot(factors, coefficients, axes=(0, 0))
+
+    def derivative(self, direction):
+        """Derivative of the Hamiltonian with respect to momentum.
+
+        Parameters
+        ----------
+        direction : int or str
+            Index of the momentum or its name ('k_x', 'k_y' or 'k_z').
+
+        Returns
+        -------
+        PolynomialHamiltonian
+        """
+        if isinstance(direction, str):
+            direction = _momentum_names.index(direction)
+
+        output = {}
+        for powers, value in self.coefficients.items():
+            n = powers[direction]
+            if n == 0:
+                continue
+            new_powers = list(powers)
+            new_powers[direction] -= 1
+            new_powers = tuple(new_powers)
+            output[new_powers] = output.get(new_powers, 0) + n * value
+
+        if not output:
+            output = {(0, 0, 0): np.zeros(self.shape, dtype=complex)}
+
+        return PolynomialHamiltonian(output)
+
+    def velocity_operators(self, k_x=0, k_y=0, k_z=0):
+        """Evaluate first derivatives of the Hamiltonian.
+
+        Returns
+        -------
+        array of shape ``broadcast_shape + (3,) + self.shape``
+        """
+        dH = [self.derivative(i)(k_x, k_y, k_z) for i in range(3)]
+        return np.stack(dH, axis=-3)
+
+    def curvature_operators(self, k_x=0, k_y=0, k_z=0):
+        """Evaluate second derivatives of the Hamiltonian.
+
+        Returns
+        -------
+        array of shape ``broadcast_shape + (3, 3) + self.shape``
+        """
+        dH = [self.derivative(i) for i in range(3)]
+        d2H = [[dH[i].derivative(j)(k_x, k_y, k_z) for j in range(3)] for i in range(3)]
+        return np.stack([np.stack(row, axis=-3) for row in d2H], axis=-4)
+
+
+def _resolve_blocks(vectors, operator, groups):
+    """Rotate vectors within groups to diagonalize the operator there.
+
+    ``operator`` is given in the basis of ``vectors``, ``groups`` are
+    integer labels of sorted, contiguous groups of columns. Blocks are
+    separated by offsets larger than the norm of the operator, so that
+    eigenvectors do not mix different groups.
+    """
+    same = groups[..., :, None] == groups[..., None, :]
+    block = np.where(same, (operator + np.conj(np.swapaxes(operator, -1, -2))) / 2, 0)
+    scale = 2 * np.linalg.norm(block, axis=(-2, -1), keepdims=True) + 1
+    offsets = groups[..., None] * np.eye(groups.shape[-1]) * scale
+    _, rotation = np.linalg.eigh(block + offsets)
+    return vectors @ rotation
+
+
+@profiling.register("numeric.band_derivatives")
+def band_derivatives(hamiltonian, k_x=0, k_y=0, k_z=0, atol=1e-8, direction=None):
+    """Calculate band energies with their first and second derivatives.
+
+    Derivatives are obtained from Hellmann-Feynman theorem and second order
+    perturbation theory, therefore single diagonalization per momentum is
+    required. Bands that are degenerate (up to ``atol``) have derivatives
+    only along a given direction: if ``direction`` is given, degenerate
+    states are chosen by degenerate perturbation theory along it, i.e. they
+    diagonalize the velocity and then the curvature along ``direction``
+    within the degenerate subspace. Otherwise quantities are averaged over
+    the degenerate subspace.
+
+    Parameters
+    ----------
+    hamiltonian : PolynomialHamiltonian
+    k_x, k_y, k_z : numbers or broadcastable arrays of momenta
+    atol : float
+        Tolerance for treating energies (and velocities) as degenerate.
+    direction : sequence of 3 floats or None
+        Direction of derivatives used to resolve degeneracies.
+
+    Returns
+    -------
+    energies : array of shape ``broadcast_shape + (n,)``
+    velocities : array of shape ``broadcast_shape + (n, 3)``
+        Derivatives dE/dk_i.
+    curvatures : array of shape ``broadcast_shape + (n, 3, 3)``
+        Derivatives d^2E/dk_i dk_j. With ``direction`` only their
+        projection ``direction @ curvature @ direction`` is exact for
+        degenerate bands.
+    """
+    energies, vectors = np.linalg.eigh(hamiltonian(k_x, k_y, k_z))
+
+    def to_eigenbasis(operators, vectors):
+        return np.einsum(
+            "...an,...ab,...bm->...nm",
+            vectors.conj()[..., None, :, :],
+            operators,
+            vectors[..., None, :, :],
+        )
+
+    velocity_operators = hamiltonian.velocity_operators(k_x, k_y, k_z)
+    d2H = hamiltonian.curvature_operators(k_x, k_y, k_z)
+
+    differences = energies[..., :, None] - energies[..., None, :]
+    degenerate = np.abs(differences) < atol
+    inverse = np.zeros_like(differences)
+    inverse[~degenerate] = 1 / differences[~degenerate]
+
+    if direction is not None:
+        n = np.asarray(direction, dtype=float)
+        n = n / np.linalg.norm(n)
+        # labels of groups of degenerate energies (sorted by eigh)
+        groups = np.cumsum(np.diff(energies, axis=-1, prepend=-np.inf) >= atol, -1)
+
+        # first order: velocity along the direction within degenerate blocks
+        dH = to_eigenbasis(velocity_operators, vectors)
+        vectors = _resolve_blocks(vectors, np.einsum("i,...inm->...nm", n, dH), groups)
+
+        # second order within blocks that are still degenerate
+        dH = to_eigenbasis(velocity_operators, vectors)
+        v = np.einsum("i,...inm->...nm", n, dH)
+        slopes = np.einsum("...nn->...n", v).real
+        new_group = (np.diff(groups, axis=-1, prepend=-1) > 0) | (
+            np.abs(np.diff(slopes, axis=-1, prepend=-np.inf)) >= atol
+        )
+        curvature = np.einsum(
+            "...an,...ab,...bm->...nm",
+            vectors.conj(),
+            np.einsum("i,j,...ijab->...ab", n, n, d2H),
+            vectors,
+        ) + 2 * np.einsum("...nm,...mk,...nm->...nk", v, v, inverse)
+        vectors = _resolve_blocks(vectors, curvature, np.cumsum(new_group, -1))
+
+    dH = to_eigenbasis(velocity_operators, vectors)
+    d2H_diagonal = np.einsum(
+        "...an,...ijab,...bn->...nij", vectors.conj(), d2H, vectors
+    ).real
+
+    velocities = np.einsum("...inn->...ni", dH).real
+    second_order = 2 * np.einsum("...inm,...jmn,...nm->...nij", dH, dH, inverse).real
+    curvatures = d2H_diagonal + second_order
+
+    if direction is None:
+        # average over degenerate subspaces to make output basis independent
+        weights = degenerate / degenerate.sum(axis=-1, keepdims=True)
+        velocities = np.einsum("...nm,...mi->...ni", weights, velocities)
+        curvatures = np.einsum("...nm,...mij->...nij", weights, curvatures)
+
+    return energies, velocities, curvatures
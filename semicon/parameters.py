@@ -3,6 +3,7 @@ import inspect
 import os
 import re
 from collections import UserDict
+from collections.abc import Mapping
 
 import kwant
 import numpy as np
@@ -10,6 +11,8 @@ import pandas as pd
 import yaml
 from scipy.constants import physical_constants as phys_const
 
+from . import profiling
+
 # General constants and globals
 constants = {
     "m_0": phys_const["electron mass energy equivalent in MeV"][0] * 1e6,
@@ -40,6 +43,7 @@ _banks_names = _find_available_databanks()
 class DataBank(UserDict):
     """Data bank of effective parameters."""
 
+    @profiling.register("parameters.load_databank")
     def __init__(self, name):
         # If "name" is one of predefined databank then load it, otherwise
         # check if it is absolute path to existin datafile.
@@ -96,6 +100,7 @@ class BareParameters(UserDict):
     def to_effective(self):
         return self._calculate_bare(self.data, reverse=True)
 
+    @profiling.register("parameters.calculate_bare")
     def _calculate_bare(self, parameters, reverse=False):
         renormalizations = self._renormalization_rules
 
@@ -130,6 +135,120 @@ class BareParameters(UserDict):
         return bare_parameters
 
 
+# placeholder of NaN values in keys of records, NaN is not equal to itself
+_NAN = object()
+
+
+class ParameterRecord(Mapping):
+    """Immutable and hashable record of parameters.
+
+    Values of ``_fields`` are available as attributes stored in slots.
+    Records are read-only mappings of all parameters, so they can be used
+    in place of parameter dictionaries and as keys of caches. Item lookups
+    are a Python method, attributes are the faster access.
+
+    NaN values (e.g. parameters missing in a databank) compare equal in
+    records, so records with NaN are equal to their copies and hit caches.
+
+    Parameters
+    ----------
+    name : str or None
+    bands : sequence of str
+    **parameters : parameter values
+    """
+
+    __slots__ = ("name", "bands", "_data", "_hash")
+    _fields = ()
+
+    def __init__(self, name=None, bands=(), **parameters):
+        set_attribute = object.__setattr__
+        set_attribute(self, "name", name)
+        set_attribute(self, "bands", tuple(bands))
+        # fields first, so that equal records have equal items
+        data = {f: parameters.pop(f) for f in self._fields if f in parameters}
+        data.update(sorted(parameters.items()))
+        for field in self._fields:
+            if field in data:
+                set_attribute(self, field, data[field])
+        set_attribute(self, "_data", data)
+        set_attribute(self, "_hash", None)
+
+    @classmethod
+    def from_mapping(cls, parameters):
+        """Record of a dictionary, keeps ``name`` and ``bands`` if present."""
+        return cls(
+            name=getattr(parameters, "name", None),
+            bands=getattr(parameters, "bands", ()),
+            **parameters,
+        )
+
+    def __setattr__(self, name, value):
+        raise AttributeError("{} is immutable.".format(type(self).__name__))
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def _key(self):
+        items = tuple(
+            (k, _NAN if isinstance(v, float) and v != v else v)
+            for k, v in self._data.items()
+        )
+        return (type(self), self.name, self.bands, items)
+
+    def __hash__(self):
+        if self._hash is None:
+            object.__setattr__(self, "_hash", hash(self._key()))
+        return self._hash
+
+    def __eq__(self, other):
+        if isinstance(other, ParameterRecord):
+            return self._key() == other._key()
+        return Mapping.__eq__(self, other)
+
+    def __reduce__(self):
+        return (_make_record, (type(self), self.name, self.bands, self._data))
+
+    def __repr__(self):
+        return "{}(name={!r}, {})".format(
+            type(self).__name__,
+            self.name,
+            ", ".join("{}={!r}".format(*item) for item in self._data.items()),
+        )
+
+    def replace(self, **changes):
+        """New record with some parameters replaced."""
+        return type(self)(name=self.name, bands=self.bands, **dict(self, **changes))
+
+
+def _make_record(cls, name, bands, parameters):
+    return cls(name=name, bands=bands, **parameters)
+
+
+class ZincBlendeRecord(ParameterRecord):
+    """Record of bare parameters of a ZincBlende material."""
+
+    _fields = (
+        "E_0",
+        "E_v",
+        "Delta_0",
+        "P",
+        "kappa",
+        "g_c",
+        "q",
+        "gamma_0",
+        "gamma_1",
+        "gamma_2",
+        "gamma_3",
+    ) + tuple(constants)
+    __slots__ = _fields
+
+
 class ZincBlendeParameters(BareParameters):
     """Parameter class for ZincBlende materials."""
 
@@ -151,7 +270,7 @@ class ZincBlendeParameters(BareParameters):
     def __init__(
         self, name, bands, parameters, valence_band_offset=0, already_bare=False
     ):
-        parameters = parameters.copy()
+        parameters = dict(parameters)
 
         if "m_c" in parameters:
             parameters["gamma_0"] = 1 / parameters.pop("m_c")
@@ -169,6 +288,11 @@ class ZincBlendeParameters(BareParameters):
             already_bare=already_bare,
         )
 
+    def to_record(self):
+        """Immutable and hashable `ZincBlendeRecord` of the parameters."""
+        return ZincBlendeRecord(name=self.name, bands=self.bands, **self.data)
+
+    @profiling.register("parameters.renormalize")
     def renormalize(self, new_gamma_0=None, new_P=None):
         if (new_gamma_0 is not None) and (new_P is not None):
             msg = "'new_gamma_0' and 'new_P' are mutually exclusive."
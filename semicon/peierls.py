@@ -1,12 +1,15 @@
 import kwant
 import sympy
 
+from . import profiling
+
 a = sympy.symbols("a")
 phi_0 = sympy.symbols("phi_0")
 ri = sympy.symbols("x_i y_i z_i")
 rj = sympy.symbols("x_j y_j z_j")
 
 
+@profiling.register("peierls.get_phase")
 def get_phase(A):
     """Calculate Peierl's phase phi_ij
 
@@ -43,6 +46,7 @@ def get_phase(A):
     return (2 * sympy.pi / phi_0) * sum(output)
 
 
+@profiling.register("peierls.apply")
 def apply(tb_hamiltonian, coords, *, A, signs=None):
     """Modify tight-binding Hamiltonian to include Peierl's substitution.
 
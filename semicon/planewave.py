@@ -0,0 +1,289 @@
+# Envelope function Hamiltonians in a basis of plane waves.
+#
+# Heterostructures (with ``parameter_coords``) are treated as periodic with
+# a period of the simulation cell along every confined direction and
+# expanded in plane waves exp(i (G + k) r). Every term of the Hamiltonian
+# has the form
+#
+#   c(k_free) * k_conf^n_left * f(r) * k_conf^n_right,
+#
+# with in-plane (free) momenta k_free and confined momenta k_conf on both
+# sides of a function of position f, so its matrix elements are
+#
+#   c(k_free) (G + k)^n_left f(G - G') (G' + k)^n_right,
+#
+# where f(q) are Fourier coefficients of the profile, computed by FFT.
+# Smooth structures converge with far fewer plane waves than grid points
+# of finite difference discretizations. Abrupt interfaces do not: Fourier
+# series of step profiles converge slowly, and the error of energies
+# decreases only about as 1 / n_waves. For a 10 nm InAs well between
+# 10 nm AlSb barriers, 21 plane waves are within about 1 meV of converged
+# finite differences and 121 plane waves within 0.1, 0.3 and 0.6 meV for
+# the first three electron subbands (see test_planewave.py).
+
+import collections
+import itertools
+
+import numpy as np
+import sympy
+from sympy.core.function import AppliedUndef
+
+from . import profiling
+from .models import Model
+from .symbols import momentum, position
+
+
+def operator_terms(hamiltonian, coords):
+    """Decompose Hamiltonian into momentum structure and coefficients.
+
+    Parameters
+    ----------
+    hamiltonian : sympy.Matrix
+        Hamiltonian with non-commutative momenta and parameters that depend
+        on position only along ``coords``.
+    coords : str or sequence of str
+        Confined directions, e.g. "z" or "yz".
+
+    Returns
+    -------
+    dictionary ((left powers, right powers, free powers): sympy.Matrix)
+        Left and right powers of confined momenta (one per coordinate) and
+        powers of free momenta (one per remaining coordinate).
+    """
+    coords = sorted(coords)
+    if not isinstance(hamiltonian, sympy.MatrixBase):
+        hamiltonian = sympy.Matrix([[hamiltonian]])
+    names = {r.name for r in position if r.name in coords}
+    confined = ["k_" + c for c in coords]
+    free = [k.name for k in momentum if k.name not in confined]
+
+    output = collections.defaultdict(lambda: sympy.zeros(*hamiltonian.shape))
+    for (i, j), entry in np.ndenumerate(np.array(hamiltonian.tolist(), dtype=object)):
+        for term in sympy.Add.make_args(sympy.expand(entry)):
+            if term == 0:
+                continue
+            left, right = [0] * len(confined), [0] * len(confined)
+            powers, coefficient, after = [0] * len(free), sympy.S.One, False
+            for factor in sympy.Mul.make_args(term):
+                base, exponent = factor.as_base_exp()
+                if isinstance(base, sympy.Symbol) and base.name in confined:
+                    sides = right if after else left
+                    sides[confined.index(base.name)] += int(exponent)
+                elif isinstance(base, sympy.Symbol) and base.name in free:
+                    powers[free.index(base.name)] += int(exponent)
+                elif {s.name for s in factor.free_symbols} & names:
+                    if any(right):
+                        raise ValueError(
+                            "Momenta between functions of position are not "
+                            "supported: {}".format(term)
+                        )
+                    coefficient, after = coefficient * factor, True
+                else:
+                    coefficient = coefficient * factor
+            key = (tuple(left), tuple(right), tuple(powers))
+            output[key][i, j] += _commutative(coefficient)
+    return dict(output)
+
+
+def _commutative(expr):
+    """Make all symbols and functions in the expression commutative."""
+    subs = {s: sympy.Symbol(s.name) for s in expr.atoms(sympy.Symbol)}
+    functions = {
+        f: sympy.Function(f.func.__name__)(*f.args) for f in expr.atoms(AppliedUndef)
+    }
+    return expr.subs(functions).subs(subs)
+
+
+def _function(value):
+    """Position dependent parameter, constants are accepted as well."""
+    if callable(value):
+        return value
+    return lambda *r: value + 0 * r[0]
+
+
+def _fourier_coefficients(expr, coords, parameters, grid):
+    """Fourier coefficients of an expression sampled on a grid."""
+    symbols = [sympy.Symbol(c) for c in coords]
+    functions = {f.func.__name__ for f in expr.atoms(AppliedUndef)}
+    constants = sorted({s.name for s in expr.free_symbols} - set(coords), key=str)
+    try:
+        modules = [{name: _function(parameters[name]) for name in functions}, "numpy"]
+        values = [parameters[name] for name in constants]
+    except KeyError as error:
+        raise ValueError(
+            "Parameter {} is required to evaluate the Hamiltonian.".format(error)
+        )
+    f = sympy.lambdify(symbols + [sympy.Symbol(c) for c in constants], expr, modules)
+    sampled = np.broadcast_to(f(*grid, *values), grid[0].shape)
+    return np.fft.fftn(sampled) / sampled.size
+
+
+class PlaneWaveHamiltonian:
+    """Hamiltonian of a heterostructure in a basis of plane waves.
+
+    Parameters
+    ----------
+    model : Model or sympy.Matrix
+        Hamiltonian with parameters that depend on position along
+        ``coords``, e.g. ``ZincBlende(parameter_coords="z")``.
+    parameters : dict
+        Parameters of the model; position dependent parameters are
+        functions of the coordinates (in alphabetical order), e.g. the
+        output of `misc.two_deg`, or constants.
+    lengths : float or sequence of floats
+        Size of the simulation cell along each confined direction. The
+        structure is treated as periodic with this period, confined states
+        should be separated from the cell boundaries by barriers.
+    n_waves : int or sequence of ints
+        Number of plane waves along each confined direction.
+    coords : str or None
+        Confined directions; by default the ``parameter_coords`` of the
+        model.
+    oversampling : int
+        Number of samples of parameter profiles per plane wave. Profiles
+        with abrupt interfaces need many samples, otherwise aliasing of
+        their Fourier coefficients makes the convergence in ``n_waves``
+        irregular.
+
+    Attributes
+    ----------
+    G : array of shape (n_waves_total, d)
+        Reciprocal lattice vectors of the basis.
+    origin : array of shape (d,)
+        The cell spans [origin, origin + lengths).
+    norbs : int
+    """
+
+    @profiling.register("planewave.init")
+    def __init__(
+        self,
+        model,
+        parameters,
+        lengths,
+        n_waves,
+        coords=None,
+        origin=0,
+        oversampling=64,
+    ):
+        if isinstance(model, Model):
+            hamiltonian = model.hamiltonian
+            coords = coords or getattr(model, "_parameter_coords", None)
+        else:
+            hamiltonian = model
+        if not isinstance(hamiltonian, sympy.MatrixBase):
+            hamiltonian = sympy.Matrix([[hamiltonian]])
+        if not coords:
+            raise ValueError("Confined directions 'coords' are required.")
+
+        self.coords = sorted(coords)
+        d = len(self.coords)
+        self.lengths = np.broadcast_to(np.asarray(lengths, dtype=float), (d,))
+        self.origin = np.broadcast_to(np.asarray(origin, dtype=float), (d,))
+        n_waves = np.broadcast_to(np.asarray(n_waves, dtype=int), (d,))
+        self.norbs = hamiltonian.shape[0]
+
+        # integer indices of plane waves, shape (n_waves_total, d)
+        indices = np.array(
+            list(itertools.product(*[np.arange(n) - n // 2 for n in n_waves]))
+        )
+        self.G = 2 * np.pi * indices / self.lengths
+
+        n_samples = oversampling * n_waves
+        grid = np.meshgrid(
+            *[
+                o + L * np.arange(n) / n
+                for o, L, n in zip(self.origin, self.lengths, n_samples)
+            ],
+            indexing="ij",
+        )
+        # differences of indices, wrapped into the sampled grid
+        difference = tuple(
+            np.mod(indices[:, None, c] - indices[None, :, c], n_samples[c])
+            for c in range(d)
+        )
+        # Fourier coefficients are relative to the origin of the cell
+        phase = np.exp(-1j * (self.G[:, None, :] - self.G[None, :, :]) @ self.origin)
+
+        self._terms = []
+        for (left, right, powers), matrix in operator_terms(
+            hamiltonian, self.coords
+        ).items():
+            blocks = np.zeros(
+                (len(indices), self.norbs, len(indices), self.norbs), dtype=complex
+            )
+            for (i, j), expr in np.ndenumerate(np.array(matrix.tolist(), dtype=object)):
+                if expr != 0:
+                    f = _fourier_coefficients(expr, self.coords, parameters, grid)
+                    blocks[:, i, :, j] = f[difference] * phase
+            size = len(indices) * self.norbs
+            self._terms.append(
+                (np.array(left), np.array(right), powers, blocks.reshape(size, size))
+            )
+
+        self._free = [k.name for k in momentum if k.name[-1] not in self.coords]
+
+    @property
+    def size(self):
+        return len(self.G) * self.norbs
+
+    def hamiltonian(self, k_x=0, k_y=0, k_z=0):
+        """Hamiltonian matrix at a batch of momenta.
+
+        Momenta along confined directions are Bloch momenta of the periodic
+        cell.
+
+        Returns
+        -------
+        array of shape ``broadcast_shape + (size, size)``
+        """
+        momenta = dict(zip(("k_x", "k_y", "k_z"), np.broadcast_arrays(k_x, k_y, k_z)))
+        shape = momenta["k_x"].shape
+        bloch = np.stack([momenta["k_" + c] for c in self.coords], axis=-1)
+        # (G + k) of shape broadcast_shape + (n_waves_total * norbs, d)
+        waves = np.repeat(self.G, self.norbs, axis=0) + bloch[..., None, :]
+
+        output = np.zeros(shape + (self.size, self.size), dtype=complex)
+        for left, right, powers, block in self._terms:
+            factor = np.ones(shape)
+            for name, power in zip(self._free, powers):
+                factor = factor * momenta[name] ** power
+            left = np.prod(waves**left, axis=-1) * factor[..., None]
+            right = np.prod(waves**right, axis=-1)
+            output += left[..., :, None] * block * right[..., None, :]
+        return output
+
+    @profiling.register("planewave.bands")
+    def bands(self, k_x=0, k_y=0, k_z=0, return_vectors=False):
+        """Eigenvalues (and eigenvectors) at a batch of momenta.
+
+        Eigenvectors are stored as (plane wave, orbital) pairs, see
+        `wavefunctions`.
+        """
+        H = self.hamiltonian(k_x, k_y, k_z)
+        if return_vectors:
+            return np.linalg.eigh(H)
+        return np.linalg.eigvalsh(H)
+
+    def wavefunctions(self, vectors, positions, k_x=0, k_y=0, k_z=0):
+        """Envelope functions of eigenvectors in real space.
+
+        Parameters
+        ----------
+        vectors : array of shape (size, n_vectors)
+        positions : array of shape (n_positions, d)
+        k_x, k_y, k_z : floats
+            Momenta of the eigenvectors.
+
+        Returns
+        -------
+        array of shape (n_positions, norbs, n_vectors)
+            Normalized to one over the cell.
+        """
+        momenta = dict(k_x=k_x, k_y=k_y, k_z=k_z)
+        bloch = np.array([momenta["k_" + c] for c in self.coords])
+        positions = np.atleast_2d(positions)
+        waves = np.exp(1j * positions @ (self.G + bloch).T) / np.sqrt(
+            np.prod(self.lengths)
+        )
+        vectors = np.asarray(vectors).reshape(len(self.G), self.norbs, -1)
+        return np.einsum("pg,gon->pon", waves, vectors)
@@ -0,0 +1,303 @@
+# Self-consistent Schrödinger-Poisson calculations of heterostructures.
+#
+# Heterostructures are confined along z, e.g. stacks created with
+# `misc.two_deg`, and translation invariant in the (k_x, k_y) plane. The
+# Hamiltonian of the confined system is evaluated once for all momenta of a
+# (symmetry reduced) `kgrid.KGrid` and cached; the electrostatic potential
+# energy only adds a diagonal to these matrices, so the Kwant system is never
+# rebuilt during iterations.
+#
+# The 1D Poisson equation
+#
+#   d/dz (eps(z) dU/dz) = e^2 / eps_0 (N_D(z) - n(z))
+#
+# for the potential energy U of electrons is tridiagonal and solved with a
+# banded solver. Iterations are accelerated by Anderson (Pulay) mixing of
+# the potential.
+
+import warnings
+from collections import namedtuple
+
+import numpy as np
+import scipy.linalg as la
+import scipy.sparse as sp
+import scipy.sparse.linalg as sla
+from scipy.special import expit
+
+from . import dos as _dos
+from . import profiling
+
+# e / eps_0 in V nm, i.e. e^2 / eps_0 in eV nm
+e_over_eps_0 = 18.0951
+
+SchrodingerPoissonResult = namedtuple(
+    "SchrodingerPoissonResult",
+    ["z", "potential", "density", "fermi_level", "energies", "residuals"],
+)
+SchrodingerPoissonResult.__doc__ = """Result of `schrodinger_poisson`.
+
+Attributes
+----------
+z : array of shape (n_z,)
+    Positions of the Poisson grid.
+potential : array of shape (n_z,)
+    Electrostatic potential energy of electrons in eV.
+density : array of shape (n_z,)
+    Electron density in 1 / nm^3.
+fermi_level : float
+energies : array of shape (n_irreducible, n_states)
+    Energies at irreducible momenta, states below the neutrality level
+    are set to infinity.
+residuals : array of shape (n_iterations,)
+    Largest change of the potential in each iteration.
+"""
+
+
+def _profile(values, z):
+    """Evaluate a function of position or broadcast a constant."""
+    if callable(values):
+        values = values(z)
+    return np.broadcast_to(np.asarray(values, dtype=float), z.shape)
+
+
+@profiling.register("poisson.solve_poisson")
+def solve_poisson(charge, permittivity, grid_spacing, boundary=(None, 0)):
+    """Electrostatic potential energy of electrons in 1D.
+
+    Parameters
+    ----------
+    charge : array of shape (n_z,)
+        Density of positive charge in units of e / nm^3, e.g. N_D - n.
+    permittivity : array of shape (n_z,)
+        Relative permittivity at grid points.
+    grid_spacing : float
+    boundary : pair of floats or None
+        Potential energy at the points one grid spacing outside of the
+        grid on the left and on the right. None means zero electric field.
+
+    Returns
+    -------
+    array of shape (n_z,)
+    """
+    charge = np.asarray(charge, dtype=float)
+    eps = np.broadcast_to(np.asarray(permittivity, dtype=float), charge.shape)
+    if all(b is None for b in boundary):
+        raise ValueError("Potential must be fixed on at least one boundary.")
+
+    # permittivity between grid points, outer points use the edge values
+    eps_half = np.concatenate([eps[:1], (eps[1:] + eps[:-1]) / 2, eps[-1:]])
+    rhs = e_over_eps_0 * grid_spacing**2 * charge
+
+    banded = np.zeros((3, len(charge)))
+    banded[0, 1:] = eps_half[1:-1]
+    banded[2, :-1] = eps_half[1:-1]
+    banded[1] = -(eps_half[1:] + eps_half[:-1])
+    for value, i in zip(boundary, (0, -1)):
+        if value is None:
+            # no flux through the outer face
+            banded[1, i] += eps_half[i]
+        else:
+            rhs[i] -= eps_half[i] * value
+
+    return la.solve_banded((1, 1), banded, rhs)
+
+
+class AndersonMixer:
+    """Anderson (Pulay) mixing for fixed point problems x = g(x).
+
+    Parameters
+    ----------
+    beta : float
+        Fraction of the new output mixed into the input.
+    history : int
+        Number of previous iterations used; 0 gives simple linear mixing.
+    """
+
+    def __init__(self, beta=0.3, history=5):
+        self.beta = beta
+        self.history = history
+        self._inputs, self._residuals = [], []
+
+    def __call__(self, x, gx):
+        """Next input from the current input ``x`` and output ``g(x)``."""
+        x, residual = np.asarray(x, dtype=float), np.asarray(gx) - x
+        self._inputs.append(x)
+        self._residuals.append(residual)
+        self._inputs = self._inputs[-self.history - 1 :]
+        self._residuals = self._residuals[-self.history - 1 :]
+
+        new = x + self.beta * residual
+        if len(self._inputs) > 1:
+            dx = np.diff(self._inputs, axis=0).T
+            dr = np.diff(self._residuals, axis=0).T
+            gamma = la.lstsq(dr, residual)[0]
+            new -= (dx + self.beta * dr) @ gamma
+        return new
+
+
+@profiling.register("poisson.schrodinger_poisson")
+def schrodinger_poisson(
+    hamiltonian,
+    positions,
+    norbs,
+    kgrid,
+    permittivity,
+    doping=0,
+    fermi_level=None,
+    density=None,
+    temperature=4,
+    neutrality_level=0,
+    n_states=10,
+    sigma=None,
+    boundary=(None, 0),
+    initial_potential=None,
+    tol=1e-5,
+    max_iterations=50,
+    beta=0.3,
+    history=5,
+):
+    """Self-consistent electron density and potential of a heterostructure.
+
+    Parameters
+    ----------
+    hamiltonian : callable
+        Function of a point (k_x, k_y) returning the (sparse) Hamiltonian of
+        the confined system, e.g. ``lambda k: syst.hamiltonian_submatrix(
+        params={**params, "k_x": k[0], "k_y": k[1]}, sparse=True)``.
+        Evaluated once per irreducible point.
+    positions : array of shape (n_sites,)
+        Position z of every site of the system, e.g.
+        ``[s.pos[0] for s in syst.sites]``. Sites must form a uniform grid.
+    norbs : int
+        Number of orbitals per site.
+    kgrid : kgrid.KGrid
+        Momenta (k_x, k_y) of the charge integral. Must cover all occupied
+        states.
+    permittivity : float, array of shape (n_z,) or function of z
+        Relative permittivity.
+    doping : float, array of shape (n_z,) or function of z
+        Density of ionized donors (negative for acceptors) in 1 / nm^3.
+    fermi_level : float or None
+        Fixed Fermi level, e.g. set by a contact.
+    density : float or None
+        Fixed sheet density of electrons in 1 / nm^2; either this or
+        ``fermi_level`` must be given.
+    temperature : float
+        Temperature in Kelvin, must be positive.
+    neutrality_level : float
+        Only states above this energy (conduction subbands) are counted
+        as electrons.
+    n_states : int
+        Number of eigenstates nearest ``sigma`` per momentum.
+    sigma : float or None
+        Shift of the eigensolver, defaults to ``neutrality_level``.
+    boundary : pair of floats or None
+        See `solve_poisson`.
+    initial_potential : array of shape (n_z,) or None
+    tol : float
+        Tolerance of the potential in eV.
+    max_iterations : int
+    beta, history
+        See `AndersonMixer`.
+
+    Returns
+    -------
+    SchrodingerPoissonResult
+    """
+    if (fermi_level is None) == (density is None):
+        raise ValueError("Either 'fermi_level' or 'density' must be given.")
+    if temperature <= 0:
+        raise ValueError("Temperature must be positive.")
+    sigma = neutrality_level if sigma is None else sigma
+
+    z, site_index = np.unique(np.asarray(positions, dtype=float), return_inverse=True)
+    grid_spacing = np.diff(z)
+    if len(z) < 2 or not np.allclose(grid_spacing, grid_spacing[0]):
+        raise ValueError("Sites must form a uniform grid along z.")
+    grid_spacing = grid_spacing[0]
+    orbital_index = np.repeat(site_index, norbs)
+
+    permittivity = _profile(permittivity, z)
+    doping = _profile(doping, z)
+    kT = _dos.k_B * temperature
+    weights = kgrid.weights * _dos.k_measure(kgrid.axes)
+
+    # Hamiltonians without potential are cached for all momenta
+    matrices = [sp.csr_matrix(hamiltonian(k)) for k in kgrid.irreducible]
+    if len(orbital_index) != matrices[0].shape[0]:
+        raise ValueError("Number of sites and orbitals do not match Hamiltonian.")
+
+    potential = np.zeros(len(z)) if initial_potential is None else initial_potential
+    potential = np.array(potential, dtype=float)
+    starts = [None] * len(matrices)
+    mixer = AndersonMixer(beta=beta, history=history)
+    residuals = []
+
+    for iteration in range(max_iterations):
+        diagonal = sp.diags(potential[orbital_index])
+        energies, vectors = [], []
+        for i, H in enumerate(matrices):
+            values, states = sla.eigsh(
+                H + diagonal, k=n_states, sigma=sigma, v0=starts[i]
+            )
+            starts[i] = states.sum(axis=1)
+            energies.append(np.where(values > neutrality_level, values, np.inf))
+            vectors.append(states)
+        energies = np.array(energies)
+
+        if density is not None:
+            mu = _fermi_level(energies, weights, density, kT)
+        else:
+            mu = fermi_level
+
+        # occupation of shape (n_irreducible, n_states)
+        occupation = weights[:, None] * expit(-(energies - mu) / kT)
+        # states above the highest computed one are missing
+        highest = np.max(np.where(np.isfinite(energies), energies, -np.inf), axis=1)
+        if np.any(expit(-(highest - mu) / kT) > 1e-6):
+            warnings.warn(
+                "Highest computed states are occupied, increase 'n_states'.",
+                RuntimeWarning,
+            )
+
+        n = np.zeros(len(z))
+        for states, occupied in zip(vectors, occupation):
+            weights_per_orbital = np.abs(states) ** 2 @ occupied
+            np.add.at(n, orbital_index, weights_per_orbital)
+        n /= grid_spacing
+
+        output = solve_poisson(doping - n, permittivity, grid_spacing, boundary)
+        residuals.append(np.max(np.abs(output - potential)))
+        if residuals[-1] < tol:
+            potential = output
+            break
+        potential = mixer(potential, output)
+    else:
+        warnings.warn(
+            "Schrödinger-Poisson iterations did not converge, largest change "
+            "of the potential is {:.3g} eV.".format(residuals[-1]),
+            RuntimeWarning,
+        )
+
+    return SchrodingerPoissonResult(
+        z=z,
+        potential=potential,
+        density=n,
+        fermi_level=mu,
+        energies=energies,
+        residuals=np.array(residuals),
+    )
+
+
+def _fermi_level(energies, weights, density, kT):
+    """Fermi level of a given density at finite temperature.
+
+    Integrated density of states broadened by the derivative of the Fermi
+    function is the density of occupied states at the Fermi level.
+    """
+    finite = energies[np.isfinite(energies)]
+    energy_grid = np.linspace(finite.min() - 20 * kT, finite.max(), 4001)
+    broadened = _dos.smearing_dos(
+        energies, energy_grid, kT, weights=weights, method="fermi"
+    )
+    return float(_dos.fermi_level(broadened, density))
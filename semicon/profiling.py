@@ -0,0 +1,309 @@
+# Opt-in instrumentation of semicon's computational stages.
+#
+# Functions are registered as stages by their code objects and are left
+# untouched, i.e. they are not wrapped. Timing is done by a profile hook
+# (sys.setprofile) that is installed only while profiling is active,
+# therefore instrumentation has no overhead at all when it is disabled.
+#
+# Profiling is enabled with the "profile" context manager or by setting
+# the SEMICON_PROFILE environment variable to the name of an output file
+# (or to "1" to print a summary at exit).
+
+import atexit
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+_stages = {}
+_active = None
+
+
+def register(name, func=None):
+    """Register function as a profiled stage.
+
+    Can be used as a decorator, ``@register("models.build_hamiltonian")``,
+    or called directly, ``register("scipy.eigsh", eigsh)``, to profile
+    functions defined outside of semicon. The function is returned
+    unchanged.
+    """
+
+    def decorator(func):
+        _stages[func.__code__] = name
+        return func
+
+    return decorator if func is None else decorator(func)
+
+
+class Report:
+    """Timing report of a profiling session.
+
+    Attributes
+    ----------
+    events : list of dicts
+        Single calls of profiled stages with their name, thread, start time
+        and duration (in seconds) and peak memory (in bytes, None if memory
+        was not traced).
+    """
+
+    def __init__(self):
+        self.events = []
+
+    def summary(self):
+        """Aggregate events per stage.
+
+        Returns
+        -------
+        dictionary (stage name: dict with "calls", "total_time",
+        "max_time" and "peak_memory")
+        """
+        output = {}
+        for event in self.events:
+            stats = output.setdefault(
+                event["name"],
+                {"calls": 0, "total_time": 0, "max_time": 0, "peak_memory": None},
+            )
+            stats["calls"] += 1
+            stats["total_time"] += event["duration"]
+            stats["max_time"] = max(stats["max_time"], event["duration"])
+            if event["peak_memory"] is not None:
+                stats["peak_memory"] = max(
+                    stats["peak_memory"] or 0, event["peak_memory"]
+                )
+        return output
+
+    def to_json(self, fname=None):
+        """Return report as JSON string or save it if fname is given."""
+        data = json.dumps({"stages": self.summary(), "events": self.events}, indent=2)
+        if fname is None:
+            return data
+        with open(fname, "w") as f:
+            f.write(data)
+
+    def to_chrome_trace(self, fname=None):
+        """Return report in Chrome trace format or save it if fname is given.
+
+        The output can be inspected with chrome://tracing or Perfetto.
+        """
+        events = [
+            {
+                "name": event["name"],
+                "cat": event["name"].split(".")[0],
+                "ph": "X",
+                "ts": 1e6 * event["start"],
+                "dur": 1e6 * event["duration"],
+                "pid": os.getpid(),
+                "tid": event["thread"],
+                "args": {"peak_memory": event["peak_memory"]},
+            }
+            for event in self.events
+        ]
+        data = json.dumps({"traceEvents": events, "displayTimeUnit": "ms"})
+        if fname is None:
+            return data
+        with open(fname, "w") as f:
+            f.write(data)
+
+    def __str__(self):
+        lines = [
+            "{:<40} {:>8} {:>12} {:>14}".format(
+                "stage", "calls", "time [s]", "peak [MiB]"
+            )
+        ]
+        summary = sorted(self.summary().items(), key=lambda x: -x[1]["total_time"])
+        for name, stats in summary:
+            peak = stats["peak_memory"]
+            peak = "-" if peak is None else "{:.2f}".format(peak / 2**20)
+            lines.append(
+                "{:<40} {:>8} {:>12.4f} {:>14}".format(
+                    name, stats["calls"], stats["total_time"], peak
+                )
+            )
+        return "\n".join(lines)
+
+
+class _Recorder:
+    """Records events of the registered stages from the profile hook."""
+
+    def __init__(self, report, memory):
+        self.report = report
+        self.memory = memory and hasattr(tracemalloc, "reset_peak")
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.t0 = time.perf_counter()
+
+    def _stack(self):
+        try:
+            return self.local.stack
+        except AttributeError:
+            self.local.stack = []
+            return self.local.stack
+
+    def enter(self, name, key):
+        stack = self._stack()
+        # Recursive calls are accounted for in the outermost call only.
+        recursive = any(e["name"] == name for e in stack)
+        entry = {"name": name, "key": key, "recursive": recursive}
+        entry["start"] = time.perf_counter()
+        if self.memory:
+            # Peak memory of the enclosing stage must be stored before
+            # resetting the peak for the new stage.
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+            tracemalloc.reset_peak()
+            entry["initial"] = entry["peak"] = current
+        stack.append(entry)
+
+    def exit(self, key):
+        stack = self._stack()
+        if not stack or stack[-1]["key"] is not key:
+            return
+        entry = stack.pop()
+        end = time.perf_counter()
+
+        peak_memory = None
+        if self.memory:
+            entry["peak"] = max(entry["peak"], tracemalloc.get_traced_memory()[1])
+            peak_memory = entry["peak"] - entry["initial"]
+            if stack:
+                stack[-1]["peak"] = max(stack[-1]["peak"], entry["peak"])
+
+        if entry["recursive"]:
+            return
+
+        event = {
+            "name": entry["name"],
+            "thread": threading.get_ident(),
+            "start": entry["start"] - self.t0,
+            "duration": end - entry["start"],
+            "peak_memory": peak_memory,
+        }
+        with self.lock:
+            self.report.events.append(event)
+
+    def hook(self, frame, event, arg):
+        if event == "call":
+            name = _stages.get(frame.f_code)
+            if name is not None:
+                self.enter(name, frame)
+        elif event == "return":
+            if frame.f_code in _stages:
+                self.exit(frame)
+
+
+def _start(memory):
+    global _active
+    if _active is not None:
+        raise RuntimeError("Profiling is already active.")
+
+    report = Report()
+    recorder = _Recorder(report, memory)
+    started_tracemalloc = recorder.memory and not tracemalloc.is_tracing()
+    if started_tracemalloc:
+        tracemalloc.start()
+
+    # Only the current thread and threads started later are profiled.
+    previous = (sys.getprofile(), getattr(threading, "getprofile", lambda: None)())
+    sys.setprofile(recorder.hook)
+    threading.setprofile(recorder.hook)
+    _active = (recorder, previous, started_tracemalloc)
+    return report
+
+
+def _stop():
+    global _active
+    recorder, previous, started_tracemalloc = _active
+    sys.setprofile(previous[0])
+    threading.setprofile(previous[1])
+    if started_tracemalloc:
+        tracemalloc.stop()
+    _active = None
+
+
+@contextlib.contextmanager
+def profile(memory=True):
+    """Profile registered stages of semicon within a context.
+
+    Parameters
+    ----------
+    memory : bool
+        If True trace peak memory of each stage with tracemalloc. This
+        slows down the profiled code considerably.
+
+    Yields
+    ------
+    Report, filled with events when the context exits.
+
+    Example
+    -------
+        >>> with semicon.profiling.profile() as report:
+        ...     model = semicon.models.ZincBlende()
+        >>> print(report)
+    """
+    report = _start(memory)
+    try:
+        yield report
+    finally:
+        _stop()
+
+
+@contextlib.contextmanager
+def stage(name):
+    """Profile a block of code as a stage, e.g. call to an eigensolver.
+
+    Does nothing when profiling is not active.
+    """
+    if _active is None:
+        yield
+        return
+
+    recorder = _active[0]
+    key = object()
+    recorder.enter(name, key)
+    try:
+        yield
+    finally:
+        recorder.exit(key)
+
+
+def _register_external():
+    """Register functions outside of semicon commonly used in simulations."""
+    import kwant.continuum
+    import scipy.interpolate
+    import scipy.sparse.linalg
+
+    register("kwant.sympify", kwant.continuum.sympify)
+    register("kwant.lambdify", kwant.continuum.lambdify)
+    register("kwant.discretize", kwant.continuum.discretize)
+    register("kwant.discretize_symbolic", kwant.continuum.discretize_symbolic)
+    register("scipy.interp1d.init", scipy.interpolate.interp1d.__init__)
+    register("scipy.interp1d.call", scipy.interpolate.interp1d.__call__)
+    register("scipy.eigsh", scipy.sparse.linalg.eigsh)
+
+
+def _profile_from_environment():
+    target = os.environ.get("SEMICON_PROFILE")
+    if not target:
+        return
+
+    report = _start(memory=os.environ.get("SEMICON_PROFILE_MEMORY", "1") != "0")
+
+    def save():
+        if _active is not None:
+            _stop()
+        if target == "1":
+            print(report, file=sys.stderr)
+        elif os.environ.get("SEMICON_PROFILE_FORMAT") == "chrome":
+            report.to_chrome_trace(target)
+        else:
+            report.to_json(target)
+
+    atexit.register(save)
+
+
+_register_external()
+_profile_from_environment()
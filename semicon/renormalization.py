@@ -0,0 +1,261 @@
+# Automatic renormalization of parameters against spurious solutions.
+#
+# Discretized k·p models with large (bare) band curvature develop states
+# inside the band gap far from the Gamma point, so called spurious
+# solutions. They are removed by reducing the Kane parameter P (or
+# equivalently by setting gamma_0), see `ZincBlendeParameters.renormalize`.
+#
+# Functions below scan candidate values, evaluate the dispersion of the
+# discretized bulk model for all candidates and momenta at once and pick
+# the spurious-free candidate that modifies the original parameters least.
+
+import collections
+import functools
+import threading
+
+import numpy as np
+
+from . import profiling
+from .numeric import PolynomialHamiltonian
+
+ScanResult = collections.namedtuple(
+    "ScanResult", ["candidates", "parameters", "in_gap", "best", "optimal"]
+)
+ScanResult.__doc__ = """Result of the scan of renormalization candidates.
+
+Attributes
+----------
+candidates : array of shape (n_candidates,)
+    Scanned values of the renormalized parameter.
+parameters : list of ZincBlendeParameters
+    Renormalized parameters for each candidate.
+in_gap : array of shape (n_candidates,)
+    Number of eigenvalues of the discretized model inside the band gap,
+    candidates with non-zero values have spurious solutions.
+best : int or None
+    Index of the best spurious-free candidate, None if all are spurious.
+optimal : ZincBlendeParameters or None
+    Parameters of the best candidate.
+"""
+
+# results of auto_renormalize, least recently used entries are dropped
+_cache = collections.OrderedDict()
+_cache_size = 128
+_cache_lock = threading.Lock()
+
+
+def lattice_hamiltonian(hamiltonian, grid_spacing):
+    """Dispersion of the Hamiltonian discretized on a cubic grid.
+
+    Powers of momenta are substituted in the same way as by
+    ``kwant.continuum.discretize``: even powers ``k**n`` by
+    ``(2 * sin(k * a / 2) / a)**n`` and odd powers by ``(sin(k * a) / a)**n``.
+
+    Parameters
+    ----------
+    hamiltonian : PolynomialHamiltonian
+    grid_spacing : float
+
+    Returns
+    -------
+    PolynomialHamiltonian-like callable of (k_x, k_y, k_z)
+    """
+    a = grid_spacing
+
+    def lattice_momentum(k, n):
+        if n % 2:
+            return (np.sin(k * a) / a) ** n
+        return (2 * np.sin(k * a / 2) / a) ** n
+
+    def evaluate(k_x=0, k_y=0, k_z=0):
+        ks = np.broadcast_arrays(*[np.asarray(k, dtype=float) for k in (k_x, k_y, k_z)])
+        powers = list(hamiltonian.coefficients)
+        factors = np.ones((len(powers),) + ks[0].shape)
+        for i, p in enumerate(powers):
+            for k, n in zip(ks, p):
+                if n:
+                    factors[i] = factors[i] * lattice_momentum(k, n)
+
+        coefficients = np.array([hamiltonian.coefficients[p] for p in powers])
+        return np.tensordot(factors, coefficients, axes=(0, 0))
+
+    return evaluate
+
+
+def brillouin_zone_path(grid_spacing, n_k=51):
+    """Momenta along [100], [110] and [111] up to the zone boundary.
+
+    Returns
+    -------
+    array of shape (3, 3 * n_k), momenta (k_x, k_y, k_z)
+    """
+    k = np.linspace(0, np.pi / grid_spacing, n_k)
+    directions = (
+        np.array([[1, 0, 0], [1, 1, 0], [1, 1, 1]]) / np.sqrt([1, 2, 3])[:, None]
+    )
+    return np.concatenate([np.outer(d, k) for d in directions], axis=1)
+
+
+@functools.lru_cache()
+def _bulk_model(bands):
+    from .models import ZincBlende
+
+    return ZincBlende(bands=bands, components=("foreman",))
+
+
+def _band_gap(parameters):
+    E_v = parameters["E_v"]
+    return E_v, E_v + parameters["E_0"]
+
+
+@profiling.register("renormalization.count_in_gap")
+def count_in_gap(parameters, grid_spacing, n_k=51, atol=1e-6):
+    """Count eigenvalues of discretized bulk models inside the band gap.
+
+    Parameters
+    ----------
+    parameters : sequence of ZincBlendeParameters
+        Parameter sets evaluated together; all must have the same bands.
+    grid_spacing : float
+    n_k : int
+        Number of momenta along each direction of `brillouin_zone_path`.
+    atol : float
+        Tolerance of the band edges.
+
+    Returns
+    -------
+    array of shape (len(parameters),)
+    """
+    bands = tuple(str(b) for b in parameters[0].bands)
+    if "gamma_6c" not in bands or len(bands) < 2:
+        raise ValueError("Band gap requires electron and at least one hole band.")
+
+    model = _bulk_model(bands)
+    coefficients = [model.lambdify(p).coefficients for p in parameters]
+    batched = PolynomialHamiltonian(
+        {
+            powers: np.array([c[powers] for c in coefficients])
+            for powers in coefficients[0]
+        }
+    )
+    k = brillouin_zone_path(grid_spacing, n_k)
+    # shape (n_k, n_parameters, n, n), one diagonalization for all
+    energies = np.linalg.eigvalsh(lattice_hamiltonian(batched, grid_spacing)(*k))
+
+    lower, upper = np.array([_band_gap(p) for p in parameters]).T
+    in_gap = (energies > lower[:, None] + atol) & (energies < upper[:, None] - atol)
+    return in_gap.sum(axis=(0, 2))
+
+
+def _default_candidates(parameters, parameter):
+    if parameter == "gamma_0":
+        return np.linspace(-1, 2, 31)
+    return np.linspace(0, parameters.to_effective()["P"], 31)
+
+
+@profiling.register("renormalization.scan")
+def scan(parameters, grid_spacing, parameter="gamma_0", candidates=None, n_k=51):
+    """Scan renormalized parameters for spurious solutions.
+
+    Parameters
+    ----------
+    parameters : ZincBlendeParameters
+        Parameters that are renormalized.
+    grid_spacing : float
+    parameter : "gamma_0" or "P"
+        Parameter that is scanned, see `ZincBlendeParameters.renormalize`.
+    candidates : sequence of floats or None
+        Scanned values. By default ``gamma_0`` in [-1, 2] or ``P`` between
+        0 and its effective value.
+    n_k : int
+        Number of momenta along each direction of `brillouin_zone_path`.
+
+    Returns
+    -------
+    ScanResult
+    """
+    if parameter not in ("gamma_0", "P"):
+        raise ValueError("Parameter must be either 'gamma_0' or 'P'.")
+    if candidates is None:
+        candidates = _default_candidates(parameters, parameter)
+
+    # Candidates that require imaginary P are dropped.
+    renormalized, valid = [], []
+    for value in np.atleast_1d(candidates):
+        new = parameters.renormalize(**{"new_" + parameter: value})
+        if np.isfinite(new["P"]):
+            renormalized.append(new)
+            valid.append(value)
+
+    if not renormalized:
+        raise ValueError("None of the candidates gives valid parameters.")
+
+    in_gap = count_in_gap(renormalized, grid_spacing, n_k=n_k)
+
+    P = parameters.to_effective()["P"]
+    distance = np.array([abs(p["P"] - P) for p in renormalized])
+    distance[in_gap > 0] = np.inf
+    best = int(np.argmin(distance)) if np.isfinite(distance).any() else None
+
+    return ScanResult(
+        candidates=np.array(valid),
+        parameters=renormalized,
+        in_gap=in_gap,
+        best=best,
+        optimal=None if best is None else renormalized[best],
+    )
+
+
+def auto_renormalize(
+    model, material, grid_spacing, databank=None, parameter="gamma_0", candidates=None
+):
+    """Spurious-free renormalized parameters of a material.
+
+    Results are cached per effective parameters of the material, bands and
+    grid spacing.
+
+    Parameters
+    ----------
+    model : ZincBlende
+    material : str
+    grid_spacing : float
+    databank : DataBank or None
+        If None the default databank of the model is used.
+    parameter, candidates
+        See `scan`.
+
+    Returns
+    -------
+    ZincBlendeParameters
+    """
+    if databank is None:
+        databank = model.default_databank
+    if candidates is not None:
+        candidates = tuple(np.atleast_1d(candidates))
+
+    parameters = model.parameters(material, databank)
+    key = (
+        material,
+        tuple(sorted(databank[material].items())),
+        tuple(str(b) for b in model.bands),
+        float(grid_spacing),
+        parameter,
+        candidates,
+    )
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key].copy()
+
+    result = scan(parameters, grid_spacing, parameter=parameter, candidates=candidates)
+    if result.optimal is None:
+        raise ValueError(
+            "All candidates give spurious solutions for {} with grid "
+            "spacing {}.".format(material, grid_spacing)
+        )
+
+    with _cache_lock:
+        _cache[key] = result.optimal
+        if len(_cache) > _cache_size:
+            _cache.popitem(last=False)
+    return result.optimal.copy()
@@ -0,0 +1,263 @@
+# Recursive Green's functions of layered structures.
+#
+# Hamiltonians of structures discretized along z with nearest neighbour
+# hoppings (e.g. `heterostructure.Heterostructure`) are block tridiagonal,
+# with one block of size norbs per site. All quantities below are computed
+# by recursions over sites, so their cost is linear in the depth of the
+# stack, and all recursions are vectorized over energies.
+#
+# * Eigenvalues are counted with the Sylvester law of inertia: the number of
+#   eigenvalues below E is the number of negative eigenvalues of the pivot
+#   blocks of the block LDL^T decomposition of H - E. Bound states within
+#   an energy window follow by bisection of this count.
+# * Local density of states and transmission use the recursive Green's
+#   function method; semi-infinite leads continuing the outermost layers are
+#   included by surface Green's functions (Lopez Sancho decimation).
+
+import numpy as np
+import scipy.sparse as sp
+
+from . import profiling
+
+
+def _dagger(a):
+    return np.conj(np.swapaxes(a, -1, -2))
+
+
+def _energies(energies):
+    energies = np.asarray(energies)
+    return energies[..., None, None]
+
+
+def surface_green_function(energies, onsite, hopping, tol=1e-12, max_iterations=100):
+    """Surface Green's function of a semi-infinite periodic chain.
+
+    The surface cell couples to the rest of the chain by ``hopping``, i.e.
+    ``g = (E - onsite - hopping @ g @ hopping^H)^-1``.
+
+    Parameters
+    ----------
+    energies : complex array of shape (n_energies,)
+        Energies with (small) positive imaginary part.
+    onsite, hopping : arrays of shape (norbs, norbs)
+
+    Returns
+    -------
+    array of shape (n_energies, norbs, norbs)
+    """
+    E = _energies(energies) * np.eye(len(onsite))
+    alpha = np.broadcast_to(hopping, E.shape).astype(complex)
+    beta = _dagger(alpha)
+    surface = np.broadcast_to(onsite, E.shape).astype(complex)
+    bulk = surface.copy()
+    for _ in range(max_iterations):
+        g = np.linalg.inv(E - bulk)
+        a_g_b, b_g_a = alpha @ g @ beta, beta @ g @ alpha
+        surface = surface + a_g_b
+        bulk = bulk + a_g_b + b_g_a
+        alpha, beta = alpha @ g @ alpha, beta @ g @ beta
+        if np.max(np.abs(alpha)) < tol and np.max(np.abs(beta)) < tol:
+            break
+    return np.linalg.inv(E - surface)
+
+
+class BlockTridiagonal:
+    """Hermitian block tridiagonal Hamiltonian of a layered structure.
+
+    Parameters
+    ----------
+    onsite : array of shape (n_sites, norbs, norbs)
+    hopping : array of shape (n_sites - 1, norbs, norbs)
+        ``hopping[i]`` is the block between sites i and i + 1.
+    """
+
+    def __init__(self, onsite, hopping):
+        self.onsite = np.asarray(onsite)
+        self.hopping = np.asarray(hopping)
+        if self.hopping.shape != (len(self.onsite) - 1,) + self.onsite.shape[1:]:
+            raise ValueError("Shapes of onsite and hopping blocks do not match.")
+        self.norbs = self.onsite.shape[-1]
+
+    def __len__(self):
+        return len(self.onsite)
+
+    @classmethod
+    def from_sparse(cls, matrix, positions, norbs):
+        """Blocks of a (sparse) matrix with sites ordered by positions.
+
+        Parameters
+        ----------
+        matrix : sparse or dense array of shape (n_sites * norbs,) * 2
+        positions : array of shape (n_sites,)
+            Position of each site, sites are sorted by position.
+        norbs : int
+
+        Returns
+        -------
+        BlockTridiagonal
+            Sites are ordered by position.
+        """
+        order = np.argsort(positions)
+        indices = (order[:, None] * norbs + np.arange(norbs)).ravel()
+        matrix = sp.csr_matrix(matrix)[indices][:, indices]
+
+        coo = matrix.tocoo()
+        if np.any(np.abs(coo.row // norbs - coo.col // norbs) > 1):
+            raise ValueError("Matrix is not block tridiagonal.")
+
+        dense_blocks = [
+            matrix[i * norbs : (i + 2) * norbs, i * norbs : (i + 2) * norbs].toarray()
+            for i in range(len(order) - 1)
+        ]
+        onsite = [b[:norbs, :norbs] for b in dense_blocks]
+        onsite.append(matrix[-norbs:, -norbs:].toarray())
+        hopping = [b[:norbs, norbs:] for b in dense_blocks]
+        return cls(np.array(onsite), np.array(hopping).reshape(-1, norbs, norbs))
+
+    @classmethod
+    def from_heterostructure(cls, heterostructure, k_x=0, k_y=0):
+        """Blocks of a `heterostructure.Heterostructure` at given momenta."""
+        return cls.from_sparse(
+            heterostructure.hamiltonian(k_x, k_y),
+            heterostructure.z,
+            heterostructure.norbs,
+        )
+
+    @profiling.register("rgf.inertia")
+    def inertia(self, energies):
+        """Number of eigenvalues below each energy.
+
+        Parameters
+        ----------
+        energies : array of shape (n_energies,)
+
+        Returns
+        -------
+        integer array of shape (n_energies,)
+        """
+        E = _energies(np.asarray(energies, dtype=float)) * np.eye(self.norbs)
+        count = np.zeros(E.shape[:-2], dtype=int)
+        pivot = self.onsite[0] - E
+        for i in range(len(self)):
+            if i:
+                hopping = self.hopping[i - 1]
+                pivot = (
+                    self.onsite[i]
+                    - E
+                    - _dagger(hopping)
+                    @ np.linalg.solve(pivot, np.broadcast_to(hopping, pivot.shape))
+                )
+                # pivots are Hermitian up to rounding errors
+                pivot = (pivot + _dagger(pivot)) / 2
+            count += np.sum(np.linalg.eigvalsh(pivot) < 0, axis=-1)
+        return count
+
+    @profiling.register("rgf.eigenvalues")
+    def eigenvalues(self, e_min, e_max, tol=1e-10):
+        """All eigenvalues in the window [e_min, e_max) by bisection.
+
+        Returns
+        -------
+        array of shape (n_eigenvalues,)
+        """
+        lower_count, upper_count = self.inertia([e_min, e_max])
+        targets = np.arange(lower_count, upper_count)
+        lower = np.full(len(targets), float(e_min))
+        upper = np.full(len(targets), float(e_max))
+        if not len(targets):
+            return lower
+
+        for _ in range(int(np.ceil(np.log2((e_max - e_min) / tol))) + 1):
+            middle = (lower + upper) / 2
+            above = self.inertia(middle) > targets
+            upper = np.where(above, middle, upper)
+            lower = np.where(above, lower, middle)
+        return (lower + upper) / 2
+
+    def _lead_self_energies(self, E):
+        # leads continue the first and the last layer
+        left = surface_green_function(E, self.onsite[0], _dagger(self.hopping[0]))
+        right = surface_green_function(E, self.onsite[-1], self.hopping[-1])
+        sigma_left = _dagger(self.hopping[0]) @ left @ self.hopping[0]
+        sigma_right = self.hopping[-1] @ right @ _dagger(self.hopping[-1])
+        return sigma_left, sigma_right
+
+    def _left_self_energies(self, E, sigma_left=0):
+        """Self-energies of sites 0..i-1 (and the left lead) at site i."""
+        output = [sigma_left + 0 * E]
+        for i in range(1, len(self)):
+            hopping = self.hopping[i - 1]
+            g = np.linalg.inv(E - self.onsite[i - 1] - output[-1])
+            output.append(_dagger(hopping) @ g @ hopping)
+        return output
+
+    @profiling.register("rgf.local_dos")
+    def local_dos(self, energies, eta=1e-3, leads=False):
+        """Local density of states of every site.
+
+        Parameters
+        ----------
+        energies : array of shape (n_energies,)
+        eta : float
+            Broadening, imaginary part added to energies.
+        leads : bool
+            If True semi-infinite leads continue the outermost layers.
+
+        Returns
+        -------
+        array of shape (n_energies, n_sites)
+        """
+        E = _energies(np.asarray(energies) + 1j * eta) * np.eye(self.norbs)
+        if leads:
+            sigma_left, sigma_right = self._lead_self_energies(E[..., 0, 0])
+        else:
+            sigma_left = sigma_right = 0
+
+        left = self._left_self_energies(E, sigma_left)
+        output = np.empty(E.shape[:-2] + (len(self),))
+        # backward sweep, sigma is the self-energy of sites i+1.. at site i
+        sigma = sigma_right
+        for i in reversed(range(len(self))):
+            if i < len(self) - 1:
+                hopping = self.hopping[i]
+                g = np.linalg.inv(E - self.onsite[i + 1] - sigma)
+                sigma = hopping @ g @ _dagger(hopping)
+            G = np.linalg.inv(E - self.onsite[i] - left[i] - sigma)
+            output[..., i] = -np.trace(G, axis1=-2, axis2=-1).imag / np.pi
+        return output
+
+    @profiling.register("rgf.transmission")
+    def transmission(self, energies, eta=1e-9):
+        """Transmission between leads continuing the outermost layers.
+
+        Parameters
+        ----------
+        energies : array of shape (n_energies,)
+        eta : float
+            Imaginary part added to energies.
+
+        Returns
+        -------
+        array of shape (n_energies,)
+        """
+        E = _energies(np.asarray(energies) + 1j * eta) * np.eye(self.norbs)
+        sigma_left, sigma_right = self._lead_self_energies(E[..., 0, 0])
+
+        # G_{i0} of the left connected structure, built site by site
+        g = np.linalg.inv(E - self.onsite[0] - sigma_left)
+        propagator = g
+        for i in range(1, len(self)):
+            hopping = self.hopping[i - 1]
+            last = i == len(self) - 1
+            g = np.linalg.inv(
+                E
+                - self.onsite[i]
+                - _dagger(hopping) @ g @ hopping
+                - (sigma_right if last else 0)
+            )
+            propagator = g @ _dagger(hopping) @ propagator
+
+        gamma_left = 1j * (sigma_left - _dagger(sigma_left))
+        gamma_right = 1j * (sigma_right - _dagger(sigma_right))
+        T = gamma_right @ propagator @ gamma_left @ _dagger(propagator)
+        return np.trace(T, axis1=-2, axis2=-1).real
@@ -0,0 +1,364 @@
+# Storage of results of large parameter sweeps.
+#
+# Results are stored per point of a sweep grid, e.g. (k_x, B, gate), with
+# a fixed shape of each field per point (energies, eigenvectors, ...). Points
+# are written as soon as they are computed and a mask of completed points is
+# stored next to the data, so interrupted sweeps can be resumed.
+#
+# Two backends are available: a directory of memory mapped ".npy" files
+# (default) and, if h5py is installed, a single HDF5 file with chunked and
+# compressed datasets (used for paths ending with ".h5" or ".hdf5").
+
+import json
+import numbers
+import os
+
+import numpy as np
+
+from ._version import __version__
+
+
+def _to_json(value):
+    """Convert parameter value into a JSON serializable object."""
+    if isinstance(value, (bool, str)) or value is None:
+        return value
+    if isinstance(value, numbers.Integral):
+        return int(value)
+    if isinstance(value, numbers.Real):
+        return float(value)
+    if isinstance(value, numbers.Complex):
+        return [float(value.real), float(value.imag)]
+    if isinstance(value, np.ndarray):
+        return _to_json(value.tolist())
+    if isinstance(value, (list, tuple)):
+        return [_to_json(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _to_json(v) for k, v in value.items()}
+    return repr(value)
+
+
+def model_metadata(model=None, parameters=None, **kwargs):
+    """Metadata describing a sweep.
+
+    Parameters
+    ----------
+    model : BandModel or None
+        Bands, components and parameter coordinates of the model are stored.
+    parameters : dict or None
+        Parameters of the model; values that are not numbers (e.g. functions
+        of position) are stored by their representation.
+    kwargs
+        Additional entries.
+
+    Returns
+    -------
+    dictionary that can be serialized into JSON
+    """
+    metadata = {"semicon_version": __version__}
+    if model is not None:
+        metadata["model"] = type(model).__name__
+        for name in ("bands", "components"):
+            if hasattr(model, name):
+                metadata[name] = [str(v) for v in getattr(model, name)]
+        coords = getattr(model, "_parameter_coords", None)
+        metadata["parameter_coords"] = None if coords is None else list(coords)
+    if parameters is not None:
+        metadata["parameters"] = _to_json(dict(parameters))
+    metadata.update(_to_json(kwargs))
+    return metadata
+
+
+def _normalize_fields(fields):
+    output = {}
+    for name, spec in fields.items():
+        if isinstance(spec, (int, np.integer)) or (
+            isinstance(spec, tuple)
+            and all(isinstance(s, (int, np.integer)) for s in spec)
+        ):
+            shape, dtype = spec, float
+        else:
+            shape, dtype = spec
+        output[name] = (
+            tuple(int(s) for s in np.atleast_1d(shape)),
+            np.dtype(dtype).str,
+        )
+    return output
+
+
+class _DirectoryBackend:
+    def __init__(self, path):
+        self.path = path
+        self.arrays = {}
+
+    def _file(self, name):
+        return os.path.join(self.path, name + ".npy")
+
+    def exists(self):
+        return os.path.exists(os.path.join(self.path, "metadata.json"))
+
+    def create(self, header, mask):
+        os.makedirs(self.path, exist_ok=True)
+        for name, (shape, dtype) in header["fields"].items():
+            self.arrays[name] = np.lib.format.open_memmap(
+                self._file(name),
+                mode="w+",
+                dtype=dtype,
+                shape=tuple(header["grid_shape"]) + tuple(shape),
+            )
+        self.save_mask(mask)
+        # Header is written last, it marks the store as valid.
+        with open(os.path.join(self.path, "metadata.json"), "w") as f:
+            json.dump(header, f, indent=2)
+
+    def open(self, mode):
+        with open(os.path.join(self.path, "metadata.json")) as f:
+            header = json.load(f)
+        memmap_mode = "r" if mode == "r" else "r+"
+        for name in header["fields"]:
+            self.arrays[name] = np.load(self._file(name), mmap_mode=memmap_mode)
+        mask = np.load(self._file("completed"))
+        return header, mask
+
+    def write(self, name, index, value):
+        self.arrays[name][index] = value
+
+    def save_mask(self, mask):
+        # Data is flushed before the mask is replaced atomically, therefore
+        # points marked as completed are always stored on disk.
+        for array in self.arrays.values():
+            array.flush()
+        tmp = self._file("completed.tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, mask)
+        os.replace(tmp, self._file("completed"))
+
+    def read(self, name):
+        return np.load(self._file(name), mmap_mode="r")
+
+    def close(self):
+        for array in self.arrays.values():
+            if isinstance(array, np.memmap) and array.mode != "r":
+                array.flush()
+        self.arrays = {}
+
+
+class _HDF5Backend:
+    def __init__(self, path):
+        try:
+            import h5py
+        except ImportError:
+            raise ImportError("Storing results in HDF5 files requires h5py.")
+        self.h5py = h5py
+        self.path = path
+        self.file = None
+
+    def exists(self):
+        if not os.path.exists(self.path):
+            return False
+        with self.h5py.File(self.path, "r") as f:
+            return "header" in f.attrs
+
+    def create(self, header, mask):
+        self.file = self.h5py.File(self.path, "a")
+        grid_shape = tuple(header["grid_shape"])
+        for name, (shape, dtype) in header["fields"].items():
+            # every point of the grid is stored in a separate chunk
+            chunks = (1,) * len(grid_shape) + tuple(shape)
+            self.file.create_dataset(
+                name,
+                shape=grid_shape + tuple(shape),
+                dtype=np.dtype(dtype),
+                chunks=chunks,
+                compression="gzip",
+                shuffle=True,
+            )
+        self.file.create_dataset("completed", data=mask)
+        self.file.attrs["header"] = json.dumps(header)
+        self.file.flush()
+
+    def open(self, mode):
+        self.file = self.h5py.File(self.path, "r" if mode == "r" else "a")
+        header = json.loads(self.file.attrs["header"])
+        return header, self.file["completed"][...]
+
+    def write(self, name, index, value):
+        self.file[name][index] = value
+
+    def save_mask(self, mask):
+        self.file["completed"][...] = mask
+        self.file.flush()
+
+    def read(self, name):
+        return self.file[name]
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class ResultStore:
+    """Chunked, resumable storage of results of a sweep.
+
+    Parameters
+    ----------
+    path : str
+        Directory of the store, or HDF5 file if it ends with ".h5" or
+        ".hdf5" (requires h5py).
+    grid_shape : tuple of ints or None
+        Shape of the sweep grid. Required when a new store is created.
+    fields : dict or None
+        Mapping from field name to shape of the field per point, or to
+        a (shape, dtype) pair; dtype defaults to float. Required when a
+        new store is created.
+    metadata : dict or None
+        Metadata of the sweep, see `model_metadata`.
+    mode : "a" or "r"
+        Open for appending (create if necessary) or read-only.
+    flush_every : int
+        Number of written points after which the data and the mask of
+        completed points are flushed to disk.
+
+    Attributes
+    ----------
+    grid_shape : tuple of ints
+    fields : dict (name: (shape, dtype string))
+    metadata : dict
+
+    Notes
+    -----
+    When an existing store is opened for appending, ``grid_shape`` and
+    ``fields`` (if given) must agree with the stored ones. Points that were
+    written but not flushed before an interruption are reported as missing.
+
+    Example
+    -------
+        >>> with ResultStore("sweep", (len(ks),), {"energies": 20}) as store:
+        ...     for i in store.missing():
+        ...         store.write(i, energies=eigsh(...)[0])
+    """
+
+    def __init__(
+        self,
+        path,
+        grid_shape=None,
+        fields=None,
+        metadata=None,
+        mode="a",
+        flush_every=100,
+    ):
+        if mode not in ("a", "r"):
+            raise ValueError("Mode must be either 'a' or 'r'.")
+
+        if path.endswith((".h5", ".hdf5")):
+            self._backend = _HDF5Backend(path)
+        else:
+            self._backend = _DirectoryBackend(path)
+
+        self.path = path
+        self.mode = mode
+        self.flush_every = flush_every
+        self._unflushed = 0
+
+        if self._backend.exists():
+            header, self._completed = self._backend.open(mode)
+            self._check(header, grid_shape, fields)
+        elif mode == "r":
+            raise ValueError("Store {} does not exist.".format(path))
+        else:
+            if grid_shape is None or fields is None:
+                raise ValueError("New store requires 'grid_shape' and 'fields'.")
+            header = {
+                "grid_shape": [int(s) for s in np.atleast_1d(grid_shape)],
+                "fields": _normalize_fields(fields),
+                "metadata": _to_json(metadata or {}),
+            }
+            self._completed = np.zeros(header["grid_shape"], dtype=bool)
+            self._backend.create(header, self._completed)
+
+        self.grid_shape = tuple(header["grid_shape"])
+        self.fields = {n: (tuple(s), d) for n, (s, d) in header["fields"].items()}
+        self.metadata = header["metadata"]
+
+    @staticmethod
+    def _check(header, grid_shape, fields):
+        if grid_shape is not None:
+            if list(np.atleast_1d(grid_shape)) != list(header["grid_shape"]):
+                raise ValueError(
+                    "Grid shape {} does not match stored grid shape "
+                    "{}.".format(tuple(grid_shape), tuple(header["grid_shape"]))
+                )
+        if fields is not None:
+            stored = {n: (tuple(s), d) for n, (s, d) in header["fields"].items()}
+            if _normalize_fields(fields) != stored:
+                raise ValueError("Fields do not match stored fields {}.".format(stored))
+
+    def _index(self, index):
+        index = tuple(np.atleast_1d(index).astype(int))
+        if len(index) != len(self.grid_shape):
+            raise ValueError(
+                "Index {} does not match grid shape {}.".format(index, self.grid_shape)
+            )
+        return index
+
+    @property
+    def completed(self):
+        """Boolean mask of completed points (read-only copy)."""
+        completed = self._completed.copy()
+        completed.flags.writeable = False
+        return completed
+
+    def missing(self):
+        """List of indices of points that are not completed yet."""
+        return [tuple(int(i) for i in index) for index in np.argwhere(~self._completed)]
+
+    def write(self, index, **values):
+        """Store values of all fields at a point of the grid."""
+        if self.mode == "r":
+            raise ValueError("Store is opened in read-only mode.")
+        index = self._index(index)
+        if set(values) != set(self.fields):
+            raise ValueError(
+                "Values of all fields {} are required.".format(list(self.fields))
+            )
+
+        for name, value in values.items():
+            shape, _ = self.fields[name]
+            value = np.asarray(value)
+            if value.shape != shape:
+                raise ValueError(
+                    "Field {} has shape {}, got {}.".format(name, shape, value.shape)
+                )
+            self._backend.write(name, index, value)
+
+        self._completed[index] = True
+        self._unflushed += 1
+        if self._unflushed >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """Flush data and the mask of completed points to disk."""
+        if self.mode != "r" and self._unflushed:
+            self._backend.save_mask(self._completed)
+            self._unflushed = 0
+
+    def read(self, name):
+        """Read-only, memory mapped array (or HDF5 dataset) of a field.
+
+        Points that are not completed contain arbitrary values, see
+        `completed`.
+        """
+        if name not in self.fields:
+            raise ValueError("Unknown field {}.".format(name))
+        self.flush()
+        return self._backend.read(name)
+
+    def close(self):
+        self.flush()
+        self._backend.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,165 @@
+# Superlattices, i.e. heterostructures periodic along the growth axis z.
+#
+# Only a single period is discretized. Its Hamiltonian is obtained from
+# a Kwant system with translational symmetry along z,
+#
+#   H(k) = H_cell + V exp(-i k_z L) + V^H exp(i k_z L),
+#
+# where V is the hopping to the previous period of length L. As in
+# `heterostructure`, the dependence on in-plane momenta is extracted once,
+# hence minibands for any batch of (k_x, k_y, k_z) are computed from small
+# dense matrices without evaluating parameter functions again.
+
+import kwant
+import numpy as np
+
+from . import profiling, templates
+from .heterostructure import in_plane_coefficients, in_plane_factors
+
+
+def periodic_profiles(parameters, widths, grid_spacing, names):
+    """Parameter functions of a single period of a superlattice.
+
+    Profiles follow the same conventions as `misc.two_deg`: interfaces are
+    located half a grid spacing before the end of each layer and parameters
+    change linearly within one grid spacing around each interface,
+    including the interface between periods.
+
+    Parameters
+    ----------
+    parameters : sequence of dicts
+        Parameters of each layer in a period.
+    widths : sequence of numbers
+    grid_spacing : float
+    names : sequence of str
+        Parameters that are functions of position.
+
+    Returns
+    -------
+    dictionary of functions of z, periodic with the period ``sum(widths)``
+    """
+    a, period = grid_spacing, sum(widths)
+    interfaces = np.cumsum(widths) - a / 2
+    xs = np.ravel([[x - a / 2, x + a / 2] for x in interfaces])
+
+    def profile(name):
+        values = [p[name] for p in parameters]
+        ys = np.ravel([[v, w] for v, w in zip(values, np.roll(values, -1))])
+
+        def function(z):
+            return np.interp(z, xs, ys, period=period)
+
+        return function
+
+    return {name: profile(name) for name in names}
+
+
+class Superlattice:
+    """Heterostructure periodic along z.
+
+    Parameters
+    ----------
+    model : ZincBlende
+        Model with ``parameter_coords="z"``.
+    parameters : sequence of dicts
+        Parameters of each layer in a period, see `misc.two_deg`.
+    widths : sequence of numbers
+        Width of each layer in a period, the period must be a multiple of
+        the grid spacing.
+    grid_spacing : float
+    extra_constants : dict or None
+        Additional parameters of the model.
+    cache_dir : str, None or False
+        Disk cache of the discretization, see `templates.discretize`;
+        disabled by default, None selects `templates.cache_directory`.
+
+    Attributes
+    ----------
+    period : float
+    z : array of shape (n_sites,)
+        Positions of sites in a period, in the order of orbitals.
+    norbs : int
+    params : dict
+        Parameters of the Kwant system (without momenta).
+    syst : kwant.system.InfiniteSystem
+    """
+
+    @profiling.register("superlattice.init")
+    def __init__(
+        self,
+        model,
+        parameters,
+        widths,
+        grid_spacing,
+        extra_constants=None,
+        cache_dir=False,
+    ):
+        self.period = sum(widths)
+        n_sites = self.period / grid_spacing
+        if not np.isclose(n_sites, round(n_sites)):
+            raise ValueError("Period must be a multiple of the grid spacing.")
+
+        names = getattr(model, "_varied_parameters", [])
+        self.params = {k: v for k, v in parameters[0].items() if k not in names}
+        self.params.update(
+            periodic_profiles(parameters, widths, grid_spacing, names=names)
+        )
+        if extra_constants is not None:
+            self.params.update(extra_constants)
+
+        template = templates.discretize(
+            model.hamiltonian, "z", grid_spacing, cache_dir=cache_dir
+        )
+        syst = kwant.Builder(kwant.TranslationalSymmetry((self.period,)))
+        syst.fill(template, lambda site: True, (0,))
+        self.syst = syst.finalized()
+        self.z = np.array([s.pos[0] for s in self.syst.sites[: self.syst.cell_size]])
+
+        # coefficients of shape (6, 2, n, n) for the cell and the hopping
+        self._coefficients = np.array(in_plane_coefficients(self._evaluate))
+        self.norbs = self._coefficients.shape[-1] // len(self.z)
+
+    def _evaluate(self, k_x, k_y):
+        params = dict(self.params, k_x=k_x, k_y=k_y)
+        cell = self.syst.cell_hamiltonian(params=params)
+        hopping = np.zeros_like(cell, dtype=complex)
+        inter_cell = self.syst.inter_cell_hopping(params=params)
+        hopping[:, : inter_cell.shape[1]] = inter_cell
+        return np.array([cell, hopping])
+
+    def _blocks(self, k_x, k_y):
+        factors = np.array(in_plane_factors(k_x, k_y))
+        return np.tensordot(factors, self._coefficients, axes=(0, 0))
+
+    def hamiltonian(self, k_x=0, k_y=0, k_z=0):
+        """Bloch Hamiltonian of a period.
+
+        Parameters
+        ----------
+        k_x, k_y, k_z : numbers or broadcastable arrays
+            Momenta in 1 / nm, k_z in the mini Brillouin zone
+            ``[-pi / period, pi / period]``.
+
+        Returns
+        -------
+        array of shape ``broadcast_shape + (n, n)``
+        """
+        k_x, k_y, k_z = np.broadcast_arrays(k_x, k_y, k_z)
+        cell, hopping = np.moveaxis(self._blocks(k_x, k_y), -3, 0)
+        hopping = hopping * np.exp(-1j * k_z * self.period)[..., None, None]
+        return cell + hopping + np.conj(np.swapaxes(hopping, -1, -2))
+
+    @profiling.register("superlattice.bands")
+    def bands(self, k_x=0, k_y=0, k_z=0, return_vectors=False):
+        """Minibands at a batch of momenta.
+
+        Returns
+        -------
+        energies : array of shape ``broadcast_shape + (n,)``
+        vectors : array of shape ``broadcast_shape + (n, n)``
+            Only if ``return_vectors`` is True.
+        """
+        H = self.hamiltonian(k_x, k_y, k_z)
+        if return_vectors:
+            return np.linalg.eigh(H)
+        return np.linalg.eigvalsh(H)
@@ -0,0 +1,300 @@
+# Band tracking along smooth paths in parameter space, e.g. momentum.
+#
+# Instead of solving every point of a sweep from scratch with shift-invert
+# Lanczos, eigenvectors of the previous point are used as the starting
+# subspace of a block Davidson iteration. The LU factorization of
+# (H - sigma) is computed once and reused as a preconditioner for many
+# points, it is only recomputed when the convergence slows down, i.e. when
+# the Hamiltonian or the tracked energy window moved too far away. Only
+# unconverged tracked pairs are expanded, and projections of the
+# Hamiltonian onto the search space are updated by new columns only, so
+# every iteration costs a few sparse solves and products with the new
+# columns (see BandTracking in benchmarks/benchmarks.py for a comparison
+# with shift-invert eigsh).
+#
+# Eigenpairs are ordered by their overlap with the previous point, therefore
+# columns of the output follow bands through crossings.
+
+from collections import namedtuple
+
+import numpy as np
+import scipy.linalg as la
+import scipy.sparse as sp
+import scipy.sparse.linalg as sla
+from scipy.optimize import linear_sum_assignment
+
+from . import profiling
+
+SweepResult = namedtuple(
+    "SweepResult", ["energies", "vectors", "iterations", "factorizations"]
+)
+SweepResult.__doc__ = """Result of `track_bands`.
+
+Attributes
+----------
+energies : array of shape (n_points, n_bands)
+    Energies of tracked bands, columns follow bands by overlap.
+vectors : array of shape (n_points, size, n_bands) or None
+    Corresponding eigenvectors.
+iterations : array of shape (n_points,)
+    Davidson iterations per point, 0 for points solved directly.
+factorizations : int
+    Total number of LU factorizations.
+"""
+
+
+def reorder_by_overlap(previous, vectors):
+    """Permutation of ``vectors`` columns that best matches ``previous``.
+
+    Parameters
+    ----------
+    previous, vectors : arrays of shape (size, n)
+
+    Returns
+    -------
+    permutation : array of shape (n,)
+        ``vectors[:, permutation]`` maximizes the total squared overlap
+        with ``previous``.
+    """
+    overlaps = np.abs(previous.conj().T @ vectors) ** 2
+    _, permutation = linear_sum_assignment(-overlaps)
+    return permutation
+
+
+class _ShiftInvert:
+    """LU factorization of (H - sigma) used as (approximate) inverse."""
+
+    def __init__(self, hamiltonian, sigma):
+        size = hamiltonian.shape[0]
+        shifted = sp.csc_matrix(hamiltonian - sigma * sp.identity(size))
+        self.sigma = sigma
+        self.lu = sla.splu(shifted)
+        self.operator = sla.LinearOperator(
+            hamiltonian.shape, matvec=self.lu.solve, dtype=self.lu.U.dtype
+        )
+
+    def solve(self, vectors):
+        return self.lu.solve(np.ascontiguousarray(vectors))
+
+
+def _hermitian(matrix):
+    return (matrix + matrix.conj().T) / 2
+
+
+class _SearchSpace:
+    """Orthonormal search space Q with projections of W = (H - sigma) Q.
+
+    Projected matrices ``A = Q^H W`` and ``B = W^H W`` are extended by the
+    new columns only, and restarts are done in the projected space, so no
+    product of H with the whole search space is ever recomputed.
+    """
+
+    def __init__(self, hamiltonian, sigma, vectors):
+        self.hamiltonian, self.sigma = hamiltonian, sigma
+        self.Q, _ = la.qr(vectors, mode="economic")
+        self.W = self._shifted(self.Q)
+        self.A = _hermitian(self.Q.conj().T @ self.W)
+        self.B = _hermitian(self.W.conj().T @ self.W)
+
+    def _shifted(self, vectors):
+        return self.hamiltonian @ vectors - self.sigma * vectors
+
+    def harmonic_ritz(self, n):
+        """Harmonic Ritz pairs nearest sigma.
+
+        Unlike standard Rayleigh-Ritz, harmonic Ritz extraction does not
+        produce spurious approximations of interior eigenvalues. Returns
+        energies and coefficients Y of the normalized vectors ``Q @ Y``,
+        sorted by energy.
+        """
+        # A y = nu B y, with nu approximating 1 / (E - sigma)
+        nu, Y = la.eigh(self.A, self.B)
+        Y = Y[:, np.argsort(-np.abs(nu))[:n]]
+        Y /= la.norm(Y, axis=0)
+        shifts = np.einsum("an,an->n", Y.conj(), self.A @ Y).real
+        order = np.argsort(shifts)
+        return self.sigma + shifts[order], Y[:, order]
+
+    def residuals(self, values, Y):
+        """Residuals of the pairs ``(values, Q @ Y)``."""
+        return self.W @ Y - (self.Q @ Y) * (values - self.sigma)
+
+    def restart(self, Y):
+        """Restrict the search space to the span of ``Q @ Y``."""
+        V, _ = la.qr(Y, mode="economic")
+        self.Q, self.W = self.Q @ V, self.W @ V
+        self.A = _hermitian(V.conj().T @ self.A @ V)
+        self.B = _hermitian(V.conj().T @ self.B @ V)
+
+    def extend(self, vectors):
+        """Add the part of ``vectors`` orthogonal to the search space."""
+        # two passes of block Gram-Schmidt against the search space
+        for _ in range(2):
+            vectors = vectors - self.Q @ (self.Q.conj().T @ vectors)
+        C, _ = la.qr(vectors, mode="economic")
+        WC = self._shifted(C)
+        QWC, WWC = self.Q.conj().T @ WC, self.W.conj().T @ WC
+        self.A = np.block([[self.A, QWC], [QWC.conj().T, _hermitian(C.conj().T @ WC)]])
+        self.B = np.block([[self.B, WWC], [WWC.conj().T, _hermitian(WC.conj().T @ WC)]])
+        self.Q, self.W = np.hstack([self.Q, C]), np.hstack([self.W, WC])
+
+
+def _nearest(values, sigma, n):
+    return np.sort(np.argsort(np.abs(values - sigma))[:n])
+
+
+def _davidson(
+    hamiltonian, start, preconditioner, sigma, n_tracked, tol, max_iterations
+):
+    """Block Davidson iteration for ``start.shape[1]`` pairs nearest sigma.
+
+    Only convergence of ``n_tracked`` pairs nearest sigma is required.
+    The search space grows by the preconditioned residuals in every
+    iteration and is restarted when it exceeds three times the block size.
+    """
+    n = start.shape[1]
+
+    try:
+        space = _SearchSpace(hamiltonian, sigma, start)
+        for iteration in range(max_iterations + 1):
+            values, Y = space.harmonic_ritz(n)
+            tracked = _nearest(values, sigma, n_tracked)
+            residuals = space.residuals(values[tracked], Y[:, tracked])
+            unconverged = la.norm(residuals, axis=0) >= tol
+            if iteration and not np.any(unconverged):
+                return values, space.Q @ Y, iteration
+            if iteration == max_iterations:
+                break
+            # only unconverged tracked pairs are expanded, which saves solves;
+            # guard pairs are kept in the search space at restarts
+            if np.any(unconverged):
+                corrections = preconditioner.solve(residuals[:, unconverged])
+                if space.Q.shape[1] + corrections.shape[1] > 3 * n:
+                    space.restart(Y)
+                space.extend(corrections)
+    except la.LinAlgError:
+        pass
+    return None
+
+
+@profiling.register("sweep.track_bands")
+def track_bands(
+    hamiltonian,
+    points,
+    n_bands,
+    sigma,
+    n_guard=None,
+    tol=1e-6,
+    max_iterations=8,
+    refactor_after=5,
+    adapt_sigma=True,
+    return_vectors=True,
+):
+    """Track eigenpairs nearest to an energy window along a sweep.
+
+    Parameters
+    ----------
+    hamiltonian : callable
+        Function of a point returning a (sparse) Hermitian matrix, e.g.
+        ``lambda k: syst.hamiltonian_submatrix(params={..., "k_x": k},
+        sparse=True)``.
+    points : sequence
+        Points of the sweep, passed to ``hamiltonian``. Neighbouring points
+        should be close, so that eigenvectors change smoothly.
+    n_bands : int
+        Number of tracked eigenpairs.
+    sigma : float
+        Initial center of the energy window.
+    n_guard : int or None
+        Additional eigenpairs included in the iterations, but not returned,
+        that stabilize convergence of the tracked ones. Defaults to
+        ``n_bands``.
+    tol : float
+        Tolerance of residual norms of the eigenpairs. Error of energies
+        is of the order of ``tol**2`` divided by the level spacing.
+    max_iterations : int
+        Davidson iterations before the factorization is recomputed.
+    refactor_after : int
+        The factorization is recomputed for the next point if a point
+        needed more iterations than this.
+    adapt_sigma : bool
+        If True the window is centered at the mean energy of the tracked
+        bands after each point.
+    return_vectors : bool
+        If False eigenvectors are not returned to save memory.
+
+    Returns
+    -------
+    SweepResult
+    """
+    n_guard = n_bands if n_guard is None else n_guard
+    n_total = n_bands + n_guard
+
+    energies, vectors, iterations = [], [], []
+    factorizations = 0
+    preconditioner = None
+    previous = previous_total = None
+
+    for point in points:
+        H = sp.csr_matrix(hamiltonian(point))
+        result = None
+
+        if previous is not None:
+            fresh = preconditioner is None
+            for attempt in range(2):
+                if preconditioner is None:
+                    preconditioner = _ShiftInvert(H, sigma)
+                    factorizations += 1
+                result = _davidson(
+                    H,
+                    previous_total,
+                    preconditioner,
+                    sigma,
+                    n_bands,
+                    tol,
+                    max_iterations,
+                )
+                if result is not None or fresh:
+                    break
+                # stale factorization, refactorize at the current point
+                preconditioner, fresh = None, True
+
+        if result is None:
+            # cold start, also used as fallback if iterations do not converge
+            preconditioner = _ShiftInvert(H, sigma)
+            factorizations += 1
+            values, total = sla.eigsh(
+                H, k=n_total, sigma=sigma, OPinv=preconditioner.operator, tol=tol
+            )
+            order = np.argsort(values)
+            values, total, iteration = values[order], total[:, order], 0
+        else:
+            values, total, iteration = result
+            if iteration > refactor_after:
+                preconditioner = None
+
+        # tracked bands are the pairs nearest to the window center
+        tracked = _nearest(values, sigma, n_bands)
+        values_tracked, vectors_tracked = values[tracked], total[:, tracked]
+        if previous is not None:
+            permutation = reorder_by_overlap(previous, vectors_tracked)
+            values_tracked = values_tracked[permutation]
+            vectors_tracked = vectors_tracked[:, permutation]
+
+        energies.append(values_tracked)
+        if return_vectors:
+            vectors.append(vectors_tracked)
+        iterations.append(iteration)
+        previous, previous_total = vectors_tracked, total
+
+        if adapt_sigma:
+            # factorization at the previous sigma is kept, it remains a good
+            # preconditioner as long as the window moves slowly
+            sigma = np.mean(values_tracked)
+
+    return SweepResult(
+        energies=np.array(energies),
+        vectors=np.array(vectors) if return_vectors else None,
+        iterations=np.array(iterations),
+        factorizations=factorizations,
+    )
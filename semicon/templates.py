@@ -0,0 +1,262 @@
+# Memoized discretization of continuum Hamiltonians.
+#
+# kwant.continuum.discretize works in two stages: the symbolic
+# discretization (discretize_symbolic), which is slow for 8x8 models, and
+# building a Builder template with lambdified hoppings (build_discretized).
+# The symbolic stage does not depend on the grid spacing, its output is
+# stored on disk (as JSON with sympy.srepr of all matrix elements) under a
+# content address (misc.fingerprint) of the Hamiltonian and the
+# coordinates, so repeated runs skip it entirely. Every entry also stores
+# the srepr of its input Hamiltonian, which is compared on load. Entries
+# are decoded by a parser of the srepr grammar (calls of sympy classes
+# with literal arguments), nothing in them is evaluated as Python code.
+# Discretizations and templates (per grid spacing) are additionally kept
+# in memory, up to _cache_size least recently used entries each.
+#
+# The cache directory is given by the SEMICON_CACHE_DIR environment
+# variable, by default ~/.cache/semicon (or $XDG_CACHE_HOME/semicon).
+
+import ast
+import collections
+import hashlib
+import json
+import os
+import sys
+import tempfile
+
+import kwant
+import kwant.continuum
+import sympy
+
+from . import misc, profiling
+
+_FORMAT_VERSION = 2
+
+# least recently used discretizations and templates are dropped
+_symbolic = collections.OrderedDict()
+_templates = collections.OrderedDict()
+_cache_size = 128
+
+
+def _remember(cache, key, value):
+    cache[key] = value
+    if len(cache) > _cache_size:
+        cache.popitem(last=False)
+    return value
+
+
+def cache_directory():
+    """Directory of the disk cache of discretized Hamiltonians."""
+    if "SEMICON_CACHE_DIR" in os.environ:
+        return os.environ["SEMICON_CACHE_DIR"]
+    base = os.environ.get("XDG_CACHE_HOME", os.path.join("~", ".cache"))
+    return os.path.join(os.path.expanduser(base), "semicon")
+
+
+def clear_cache(disk=False, cache_dir=None):
+    """Clear memory cache, and disk cache if ``disk`` is True."""
+    _symbolic.clear()
+    _templates.clear()
+    if disk:
+        directory = os.path.join(cache_dir or cache_directory(), "templates")
+        if os.path.isdir(directory):
+            for fname in os.listdir(directory):
+                if fname.endswith(".json"):
+                    os.remove(os.path.join(directory, fname))
+
+
+def _key(hamiltonian, coords, fingerprint=None):
+    if fingerprint is None:
+        fingerprint = misc.fingerprint(hamiltonian)
+    content = json.dumps([_FORMAT_VERSION, kwant.__version__, fingerprint, coords])
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def _encode(tb, coords, source):
+    hoppings = []
+    for offset, value in tb.items():
+        if isinstance(value, sympy.MatrixBase):
+            shape, elements = list(value.shape), [sympy.srepr(e) for e in value]
+        else:
+            shape, elements = None, [sympy.srepr(value)]
+        hoppings.append([list(offset), shape, elements])
+    return {"source": source, "coords": list(coords), "hoppings": hoppings}
+
+
+# sympy classes that take names or decimal numbers as strings, all other
+# calls receive sympy objects only (strings would be sympified)
+_STRING_ARGUMENTS = (sympy.Symbol, sympy.Dummy, sympy.Function, sympy.Float)
+
+
+def _sympy_name(name):
+    value = getattr(sympy, name, None)
+    if isinstance(value, sympy.Basic) or (
+        isinstance(value, type) and issubclass(value, sympy.Basic)
+    ):
+        return value
+    if name == "Function":
+        return sympy.Function
+    raise ValueError("Unexpected name in a cache entry: {}".format(name))
+
+
+_NOT_LITERAL = object()
+
+
+def _literal(node):
+    """Value of a literal node, `_NOT_LITERAL` for other nodes."""
+    if sys.version_info < (3, 8):
+        # numbers, strings and booleans have separate node types
+        field = {ast.Num: "n", ast.Str: "s", ast.NameConstant: "value"}.get(type(node))
+    else:
+        field = "value" if isinstance(node, ast.Constant) else None
+    return _NOT_LITERAL if field is None else getattr(node, field)
+
+
+def _parse(node):
+    """Evaluate a node of the srepr grammar.
+
+    Only calls of sympy classes (and of undefined functions) with literal,
+    tuple or nested call arguments are accepted.
+    """
+    value = _literal(node)
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        value = _parse(node.operand)
+        if isinstance(value, (int, float)):
+            return -value
+    elif isinstance(node, ast.Tuple):
+        return tuple(_parse(e) for e in node.elts)
+    elif isinstance(node, ast.Name):
+        return _sympy_name(node.id)
+    elif isinstance(node, ast.Call):
+        func = _parse(node.func)
+        if not callable(func):
+            raise ValueError("Unexpected call in a cache entry.")
+        args = [_parse(a) for a in node.args]
+        kwargs = {k.arg: _parse(k.value) for k in node.keywords if k.arg}
+        if len(kwargs) != len(node.keywords) or any(
+            isinstance(v, str) for v in kwargs.values()
+        ):
+            raise ValueError("Unexpected keyword arguments in a cache entry.")
+        if func not in _STRING_ARGUMENTS and any(isinstance(a, str) for a in args):
+            raise ValueError("Unexpected string argument in a cache entry.")
+        return func(*args, **kwargs)
+    raise ValueError("Unexpected expression in a cache entry.")
+
+
+def _from_srepr(string):
+    return _parse(ast.parse(string, mode="eval").body)
+
+
+def _decode(data):
+    tb = {}
+    for offset, shape, elements in data["hoppings"]:
+        elements = [_from_srepr(e) for e in elements]
+        tb[tuple(offset)] = (
+            elements[0] if shape is None else sympy.Matrix(*shape, elements)
+        )
+    return tb, data["coords"]
+
+
+def _read(fname, source):
+    try:
+        with open(fname) as f:
+            data = json.load(f)
+        if data["source"] != source:
+            # hash collision or a foreign entry
+            return None
+        return _decode(data)
+    except (OSError, ValueError, KeyError, TypeError, SyntaxError, RecursionError):
+        # missing or corrupt entries are recomputed
+        return None
+
+
+def _write(fname, tb, coords, source):
+    directory = os.path.dirname(fname)
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        # write to a temporary file first, so entries are never incomplete
+        fd, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(_encode(tb, coords, source), f)
+        os.replace(temporary, fname)
+    except OSError:
+        pass
+
+
+@profiling.register("templates.discretize_symbolic")
+def discretize_symbolic(hamiltonian, coords, cache_dir=None):
+    """Cached ``kwant.continuum.discretize_symbolic``.
+
+    Parameters
+    ----------
+    hamiltonian : sympy.Expr or sympy.Matrix
+    coords : str or sequence of str
+        Discretized coordinates, e.g. "z" or "xyz".
+    cache_dir : str, None or False
+        Directory of the disk cache, by default `cache_directory`; False
+        disables the disk cache.
+
+    Returns
+    -------
+    tb : dictionary (offset: sympy.Matrix)
+    coords : list of str
+    """
+    coords = sorted(coords)
+    return _discretize_symbolic(
+        hamiltonian, coords, _key(hamiltonian, coords), cache_dir
+    )
+
+
+def _discretize_symbolic(hamiltonian, coords, key, cache_dir):
+    if key in _symbolic:
+        _symbolic.move_to_end(key)
+        return _symbolic[key]
+
+    fname = None
+    if cache_dir is not False:
+        directory = os.path.join(cache_dir or cache_directory(), "templates")
+        fname = os.path.join(directory, key + ".json")
+
+    result = None
+    if fname is not None:
+        source = sympy.srepr(hamiltonian)
+        result = _read(fname, source)
+    if result is None:
+        result = kwant.continuum.discretize_symbolic(hamiltonian, coords=coords)
+        if fname is not None:
+            _write(fname, *result, source)
+
+    return _remember(_symbolic, key, result)
+
+
+@profiling.register("templates.discretize")
+def discretize(hamiltonian, coords, grid_spacing, cache_dir=None, fingerprint=None):
+    """Cached ``kwant.continuum.discretize``.
+
+    Parameters
+    ----------
+    hamiltonian : sympy.Expr or sympy.Matrix
+    coords : str or sequence of str
+    grid_spacing : float
+    cache_dir : str, None or False
+        See `discretize_symbolic`.
+    fingerprint : str or None
+        Precomputed `misc.fingerprint` of the Hamiltonian.
+
+    Returns
+    -------
+    kwant.Builder
+        Template of the tight-binding model. Templates are shared between
+        calls with the same arguments and must not be modified.
+    """
+    coords = sorted(coords)
+    key = _key(hamiltonian, coords, fingerprint)
+    template_key = (key, float(grid_spacing))
+    if template_key in _templates:
+        _templates.move_to_end(template_key)
+        return _templates[template_key]
+    tb, coords = _discretize_symbolic(hamiltonian, coords, key, cache_dir)
+    template = kwant.continuum.build_discretized(tb, coords, grid=grid_spacing)
+    return _remember(_templates, template_key, template)
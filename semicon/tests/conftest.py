@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def cache_directory(tmp_path, monkeypatch):
+    """Keep disk caches of tests out of the user's cache directory."""
+    monkeypatch.setenv("SEMICON_CACHE_DIR", str(tmp_path / "cache"))
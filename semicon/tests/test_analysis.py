@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from semicon.analysis import (
+    band_character,
+    dominant_bands,
+    site_orbital_view,
+    stream_band_character,
+)
+from semicon.misc import expectation_values
+from semicon.models import ZincBlende
+
+model = ZincBlende()
+n_sites, norbs, n_vectors = 7, 8, 10
+
+
+def random_vectors(*batch):
+    shape = (*batch, n_sites * norbs, n_vectors)
+    vectors = np.random.randn(*shape) + 1j * np.random.randn(*shape)
+    return vectors / np.linalg.norm(vectors, axis=-2, keepdims=True)
+
+
+def test_site_orbital_view():
+    vectors = random_vectors()
+    view = site_orbital_view(vectors, norbs)
+    assert view.shape == (n_sites, norbs, n_vectors)
+    assert np.shares_memory(view, vectors)
+    assert np.allclose(view[2, 3], vectors[2 * norbs + 3])
+
+    with pytest.raises(ValueError):
+        site_orbital_view(vectors, 3)
+
+    strided = np.asfortranarray(vectors)[:, ::2]
+    assert np.shares_memory(site_orbital_view(strided, norbs), strided)
+
+
+@pytest.mark.parametrize("chunk_size", [None, 1, 3, 100])
+def test_band_character(chunk_size):
+    vectors = random_vectors(2)
+    character = band_character(vectors, model, chunk_size=chunk_size, density=True)
+
+    assert character.weights.shape == (2, 3, n_vectors)
+    assert np.allclose(character.weights.sum(axis=-2), 1)
+    assert np.allclose(character.density.sum(axis=-2), 1)
+
+    # compare with explicit operators acting on the whole system
+    identity = np.eye(n_sites)
+    spin = np.array([np.kron(identity, s) for s in model.spin_matrices])
+    assert np.allclose(character.spin, expectation_values(spin, vectors))
+
+    projectors = [np.kron(identity, p) for p in model.band_projectors.values()]
+    assert np.allclose(character.weights, expectation_values(projectors, vectors))
+
+
+def test_streaming():
+    results = [(None, random_vectors()) for i in range(3)]
+    streamed = list(stream_band_character(results, model, chunk_size=4))
+    assert len(streamed) == 3
+    for (_, vectors), character in zip(results, streamed):
+        reference = band_character(vectors, model)
+        assert np.allclose(character.weights, reference.weights)
+        assert character.density is None
+
+
+def test_dominant_bands():
+    vectors = np.zeros((n_sites * norbs, 3))
+    vectors[0, 0] = vectors[2 * norbs + 3, 1] = vectors[6, 2] = 1
+    character = band_character(vectors, model)
+    assert list(dominant_bands(character, model)) == [
+        "gamma_6c",
+        "gamma_8v",
+        "gamma_7v",
+    ]
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from semicon.dos import (
+    carrier_density,
+    fermi_level,
+    k_B,
+    k_measure,
+    linear_dos,
+    smearing_dos,
+)
+from semicon.kgrid import KGrid, symmetry_operations
+from semicon.parameters import taa
+
+# free electrons with m = m_0 and two spin bands
+k = np.linspace(-2, 2, 81)
+k_x, k_y = np.meshgrid(k, k, indexing="ij")
+energies_2d = np.repeat((taa * (k_x**2 + k_y**2))[..., None], 2, axis=-1)
+energy_grid = np.linspace(-0.02, 0.1, 121)
+dos_2d = 2 / (4 * np.pi * taa)
+
+
+def test_linear_dos_2d():
+    dos = linear_dos(energies_2d, [k, k], energy_grid)
+    positive = energy_grid > 0.004
+    assert np.allclose(dos.dos[positive], dos_2d, rtol=2e-2)
+    assert np.allclose(dos.dos[energy_grid < 0], 0)
+    assert np.allclose(dos.integrated, dos_2d * np.maximum(energy_grid, 0), atol=5e-4)
+
+    # flattened energies, e.g. from a sweep over the grid
+    flat = linear_dos(energies_2d.reshape(-1, 2), [k, k], energy_grid)
+    assert np.allclose(flat.dos, dos.dos)
+
+    with pytest.raises(ValueError):
+        linear_dos(energies_2d[1:], [k, k], energy_grid)
+    with pytest.raises(ValueError):
+        linear_dos(energies_2d, [k], energy_grid)
+
+
+def test_linear_dos_3d():
+    k = np.linspace(-1.5, 1.5, 31)
+    ks = np.meshgrid(k, k, k, indexing="ij")
+    energies = taa * sum(k**2 for k in ks)[..., None]
+    energy_grid = np.linspace(0.01, 0.08, 8)
+
+    dos = linear_dos(energies, [k, k, k], energy_grid)
+    expected = np.sqrt(energy_grid / taa) / (4 * np.pi**2 * taa)
+    assert np.allclose(dos.dos, expected, rtol=2e-2)
+    expected = (energy_grid / taa) ** 1.5 / (6 * np.pi**2)
+    assert np.allclose(dos.integrated, expected, rtol=3e-2)
+
+
+@pytest.mark.parametrize("method", ["gaussian", "fermi"])
+def test_smearing_dos(method):
+    dos = smearing_dos(
+        energies_2d, energy_grid, 5e-3, measure=k_measure([k, k]), method=method
+    )
+    middle = (energy_grid > 0.03) & (energy_grid < 0.09)
+    assert np.allclose(dos.dos[middle], dos_2d, rtol=2e-2)
+
+    # irreducible points with weights give the same result
+    grid = KGrid([k, k], symmetry_operations(dimensions=2, symmetric_slab=True))
+    energies = taa * np.sum(grid.irreducible**2, axis=1)[:, None] * [1, 1]
+    reduced = smearing_dos(
+        energies,
+        energy_grid,
+        5e-3,
+        weights=grid.weights,
+        measure=k_measure(grid.axes),
+        method=method,
+    )
+    assert np.allclose(reduced.dos, dos.dos)
+    assert np.allclose(reduced.integrated, dos.integrated)
+
+    with pytest.raises(ValueError):
+        smearing_dos(energies, energy_grid, 5e-3, weights=grid.weights[1:])
+    with pytest.raises(ValueError):
+        smearing_dos(energies, energy_grid, 5e-3, method="lorentzian")
+
+
+def test_fermi_level():
+    dos = linear_dos(energies_2d, [k, k], energy_grid)
+    densities = dos_2d * np.array([0.02, 0.05])
+    assert np.allclose(fermi_level(dos, densities), [0.02, 0.05], atol=1e-4)
+    assert np.allclose(carrier_density(dos, fermi_level(dos, 1e-3)), 1e-3)
+
+    # n = D k_B T log(1 + exp(mu / k_B T)) for the ideal 2D electron gas
+    temperature = 30
+    kT = k_B * temperature
+    mu = fermi_level(dos, densities, temperature=temperature)
+    expected = dos_2d * kT * np.log1p(np.exp(mu / kT))
+    assert np.allclose(expected, densities, rtol=3e-3)
+
+    with pytest.raises(ValueError):
+        fermi_level(dos, 1.0)
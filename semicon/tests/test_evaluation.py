@@ -0,0 +1,96 @@
+import concurrent.futures
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from semicon.evaluation import BandEvaluator
+from semicon.models import ZincBlende
+
+model = ZincBlende(default_databank="lawaetz")
+parameters = model.parameters("InAs")
+
+
+def test_evaluation():
+    evaluator = BandEvaluator(model, parameters)
+    assert evaluator.shape == (8, 8)
+    assert not evaluator.coefficients.flags.writeable
+
+    k_x = np.linspace(-0.5, 0.5, 11)
+    k_y = np.linspace(-0.2, 0.2, 3)[:, None]
+    reference = model.lambdify(parameters)(k_x, k_y, 0.1)
+    assert np.allclose(evaluator.hamiltonian(k_x, k_y, 0.1), reference)
+
+    energies = evaluator.bands(k_x, k_y, 0.1)
+    assert np.allclose(energies, np.linalg.eigvalsh(reference))
+    assert np.allclose(evaluator.map(k_x, k_y, 0.1, chunk_size=4), energies)
+    values, vectors = evaluator.map(k_x, k_y, 0.1, return_vectors=True, chunk_size=5)
+    assert vectors.shape == (3, 11, 8, 8)
+    assert np.allclose(values, energies)
+    assert evaluator.map(0.1).shape == (8,)
+
+
+def test_concurrent_use():
+    k = np.linspace(0, 0.5, 64)
+    expected = BandEvaluator(model, parameters).bands(k)
+    shared = ZincBlende()
+
+    def run(i):
+        # evaluators of a new shared model are created and used concurrently
+        evaluator = BandEvaluator(shared, parameters)
+        return evaluator.bands(k, 0.01 * (i % 2))
+
+    with concurrent.futures.ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(run, range(32)))
+    for i, result in enumerate(results):
+        if i % 2 == 0:
+            assert np.array_equal(result, expected)
+
+
+def test_gil_released():
+    # With a long switch interval another thread can only run while the
+    # evaluating thread releases the GIL.
+    evaluator = BandEvaluator(model, parameters)
+    k = np.linspace(0, 1, 100000)
+    state = {"in_call": False}
+    entered = threading.Event()
+
+    def work():
+        entered.set()
+        state["in_call"] = True
+        evaluator.bands(k)
+        state["in_call"] = False
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(10)
+    try:
+        thread = threading.Thread(target=work)
+        thread.start()
+        entered.wait()
+        count, deadline = 0, time.perf_counter() + 0.5
+        while time.perf_counter() < deadline:
+            count += state["in_call"]
+        thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert count > 0
+
+
+@pytest.mark.skipif((os.cpu_count() or 1) < 2, reason="requires multiple CPUs")
+def test_throughput_scaling():
+    threadpoolctl = pytest.importorskip("threadpoolctl")
+    evaluator = BandEvaluator(model, parameters)
+    k = np.linspace(0, 1, 200000)
+
+    def throughput(n_threads):
+        start = time.perf_counter()
+        evaluator.map(k, n_threads=n_threads, chunk_size=len(k) // 8)
+        return len(k) / (time.perf_counter() - start)
+
+    # a multithreaded BLAS would compete with the threads of the pool
+    with threadpoolctl.threadpool_limits(1):
+        throughput(2)
+        assert throughput(2) > 1.3 * throughput(1)
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+import sympy
+
+from semicon.folding import band_edges, fold, fold_numeric
+from semicon.misc import make_commutative
+from semicon.models import ZincBlende
+from semicon.parameters import ZincBlendeParameters
+from semicon.symbols import momentum
+
+model = ZincBlende(default_databank="winkler")
+parameters = model.parameters("InAs")
+
+
+def test_band_edges():
+    E_0, E_v, Delta_0 = sympy.symbols("E_0 E_v Delta_0")
+    edges = band_edges(model)
+    assert sympy.simplify(edges["gamma_6c"] - (E_0 + E_v)) == 0
+    assert sympy.simplify(edges["gamma_8v"] - E_v) == 0
+    assert sympy.simplify(edges["gamma_7v"] - (E_v - Delta_0)) == 0
+
+
+@pytest.mark.parametrize(
+    "bands, index, parameter",
+    [("gamma_6c", 0, "gamma_0"), (("gamma_8v", "gamma_7v"), 2, "gamma_1")],
+)
+def test_fold_against_renormalization_rules(bands, index, parameter):
+    folded = fold(model, bands)
+    assert folded.hamiltonian.shape == (len(folded.spin_matrices[0]),) * 2
+
+    def k_x_squared(expr):
+        expr = make_commutative(expr, *momentum)
+        return sympy.expand(expr).coeff(sympy.Symbol("k_x"), 2)
+
+    element = k_x_squared(folded.hamiltonian[0, 0])
+    bare = k_x_squared(model.hamiltonian[index, index])
+
+    # correction of k_x^2 coefficient, expressed as a shift of the
+    # Luttinger parameter, must agree with renormalization rules
+    T = sympy.Symbol("hbar") ** 2 / (2 * sympy.Symbol("m_0"))
+    rules = ZincBlendeParameters._renormalization_rules[parameter]
+    expected = sum(
+        sympy.sympify(rule, locals={"T": T})
+        for band, rule in rules.items()
+        if band not in np.atleast_1d(bands)
+    )
+    if parameter == "gamma_1":
+        # heavy holes: k_x^2 coefficient is -T (gamma_1 + gamma_2)
+        expected = -expected - sympy.sympify(
+            ZincBlendeParameters._renormalization_rules["gamma_2"]["gamma_6c"],
+            locals={"T": T},
+        )
+    assert sympy.simplify(element - bare - T * expected) == 0
+
+
+def test_fold_numeric():
+    folded = fold_numeric(model, ("gamma_8v", "gamma_7v"), parameters)
+    symbolic = fold(model, ("gamma_8v", "gamma_7v")).lambdify(parameters)
+
+    k = np.random.uniform(-0.05, 0.05, size=(3, 10))
+    assert np.allclose(folded(*k), symbolic(*k))
+
+
+def test_fold_numeric_dispersion():
+    # effective conduction band follows full model near k = 0
+    folded = fold_numeric(model, "gamma_6c", parameters)
+    full = model.lambdify(parameters)
+    k_x = np.linspace(0, 0.02, 5)
+    energies = np.linalg.eigvalsh(folded(k_x))[:, 0]
+    reference = np.linalg.eigvalsh(full(k_x))[:, -1]
+    assert np.allclose(energies, reference, atol=1e-3)
+
+
+def test_invalid_bands():
+    with pytest.raises(ValueError):
+        fold(model, model.bands)
+    with pytest.raises(ValueError):
+        fold(ZincBlende(bands="gamma_6c"), "gamma_8v")
@@ -0,0 +1,71 @@
+import os
+
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from semicon import templates
+from semicon.heterostructure import Heterostructure
+from semicon.models import Model, ZincBlende
+from semicon.parameters import constants
+
+model = ZincBlende(parameter_coords="z", default_databank="lawaetz")
+AlSb = model.parameters("AlSb", valence_band_offset=0.18).renormalize(new_gamma_0=1)
+InAs = model.parameters("InAs").renormalize(new_gamma_0=1)
+heterostructure = Heterostructure(
+    model, [AlSb, InAs, AlSb], [2, 5, 2], 0.5, extra_constants=constants
+)
+
+
+def direct(k_x, k_y, potential=0):
+    params = dict(heterostructure.params, k_x=k_x, k_y=k_y)
+    H = heterostructure.syst.hamiltonian_submatrix(params=params, sparse=True)
+    onsite = np.repeat(np.broadcast_to(potential, heterostructure.z.shape), 8)
+    return H + sp.diags(onsite)
+
+
+def test_hamiltonian():
+    assert heterostructure.norbs == 8
+    assert len(heterostructure.z) == 18
+    for k in [(0, 0), (0.1, 0.2), (-0.3, 0.05)]:
+        H = heterostructure.hamiltonian(*k)
+        assert sp.isspmatrix_csr(H)
+        assert abs(H - direct(*k)).max() < 1e-10
+    # cached matrices are returned for the same momenta
+    assert heterostructure.hamiltonian(0.1, 0.2) is heterostructure.hamiltonian(
+        0.1, 0.2
+    )
+
+
+def test_with_potential():
+    H = heterostructure.hamiltonian(0.1, 0.2)
+    potential = 0.01 * heterostructure.z
+    assert heterostructure.with_potential(potential) is heterostructure
+    # cached matrix is updated in place
+    assert abs(H - direct(0.1, 0.2, potential)).max() < 1e-10
+    # matrices created later include the potential
+    H = heterostructure.hamiltonian(0.2, 0.0)
+    assert abs(H - direct(0.2, 0.0, potential)).max() < 1e-10
+
+    heterostructure.with_potential(lambda z: np.zeros_like(z))
+    assert abs(H - direct(0.2, 0.0)).max() < 1e-10
+
+
+def test_second_order():
+    quartic = Model("k_x**4 + k_z**2 + E_v(z)")
+    with pytest.raises(ValueError, match="second order"):
+        Heterostructure(quartic, [AlSb, InAs, AlSb], [2, 5, 2], 0.5)
+
+
+def test_disk_cache(tmp_path):
+    templates.clear_cache()
+    Heterostructure(
+        model, [AlSb, InAs, AlSb], [2, 5, 2], 0.5, extra_constants=constants
+    )
+    assert not os.path.exists(os.path.join(templates.cache_directory(), "templates"))
+
+    templates.clear_cache()
+    Heterostructure(
+        model, [AlSb, InAs, AlSb], [2, 5, 2], 0.5, constants, cache_dir=str(tmp_path)
+    )
+    assert len(os.listdir(tmp_path / "templates")) == 1
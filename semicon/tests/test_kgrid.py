@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from semicon.kgrid import KGrid, point_group, symmetry_operations
+from semicon.models import ZincBlende
+
+model = ZincBlende(bands=("gamma_6c", "gamma_8v"), default_databank="winkler")
+hamiltonian = model.lambdify(model.parameters("InAs"))
+
+
+def test_point_group():
+    assert len(point_group("Td")) == 24
+    assert len(point_group("Oh")) == 48
+    assert len(symmetry_operations()) == 48
+    assert len(symmetry_operations(time_reversal=False)) == 24
+    with pytest.raises(ValueError):
+        point_group("C4v")
+
+    # C2v for [001], Cs for [110] and C3v for [111] slabs, plus time reversal
+    # (in the plane C2 around z coincides with k -> -k)
+    R_110 = np.array([[1, 0, 1], [-1, 0, 1], [0, -np.sqrt(2), 0]]) / np.sqrt(2)
+    R_111 = np.array(
+        [
+            [1 / np.sqrt(2), 1 / np.sqrt(6), 1 / np.sqrt(3)],
+            [-1 / np.sqrt(2), 1 / np.sqrt(6), 1 / np.sqrt(3)],
+            [0, -2 / np.sqrt(6), 1 / np.sqrt(3)],
+        ]
+    )
+    sizes = []
+    for R in (np.eye(3), R_110, R_111):
+        rotated = model.rotate(R, act_on_spin=False)
+        assert np.allclose(rotated.orientation, R)
+        sizes.append(len(symmetry_operations(rotated, dimensions=2)))
+    assert sizes == [4, 4, 12]
+
+
+def test_rotation_invariance():
+    # H'(k) = H(R k), so operations in the frame of the model are R^T g R
+    R = np.array([[1, 0, 1], [-1, 0, 1], [0, -np.sqrt(2), 0]]) / np.sqrt(2)
+    rotated = model.rotate(R).lambdify(model.parameters("InAs"))
+    k = np.array([0.11, -0.04, 0.07])
+    reference = np.linalg.eigvalsh(rotated(*k))
+    for g in symmetry_operations(model.rotate(R)):
+        assert np.allclose(np.linalg.eigvalsh(rotated(*(g @ k))), reference)
+
+
+def test_bulk_grid():
+    k = np.linspace(-0.5, 0.5, 11)
+    grid = KGrid.from_model([k, k, k], model)
+    assert len(grid.operations) == 48
+    assert grid.weights.sum() == len(grid) == 11**3
+    # wedge 0 <= k_z <= k_y <= k_x of the cube
+    assert len(grid.irreducible) == 56
+
+    energies = np.linalg.eigvalsh(hamiltonian(*grid.irreducible.T))
+    expanded = grid.expand(energies)
+    full = np.linalg.eigvalsh(hamiltonian(*np.meshgrid(k, k, k, indexing="ij")))
+    assert expanded.shape == (11, 11, 11, 6)
+    assert np.allclose(expanded, full)
+
+    with pytest.raises(ValueError):
+        grid.expand(energies[:-1])
+
+
+def test_slab_grid():
+    # operations that do not map the grid onto itself are dropped
+    k_x, k_y = np.linspace(-0.5, 0.5, 11), np.linspace(-0.3, 0.3, 7)
+    grid = KGrid.from_model([k_x, k_y], model, symmetric_slab=True)
+    assert len(grid.operations) == 4
+    assert grid.weights.sum() == 77
+    assert len(grid.irreducible) == 6 * 4
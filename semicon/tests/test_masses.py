@@ -0,0 +1,90 @@
+import kwant
+import numpy as np
+import pytest
+
+from semicon.masses import (
+    _normalize,
+    databank_masses,
+    fit_bands,
+    inverse_mass_tensors,
+    luttinger_parameters,
+    system_hamiltonian,
+)
+from semicon.models import Model, ZincBlende
+from semicon.parameters import DataBank, taa
+from semicon.renormalization import lattice_hamiltonian
+
+model = ZincBlende(default_databank="winkler")
+parameters = model.parameters("InAs")
+
+
+def test_fit_bands():
+    # E = T k^2 / m - alpha T^2 k^4 / m^2, i.e. E (1 + alpha E) = T k^2 / m
+    mass, alpha = 0.1, 0.5
+    hamiltonian = Model(
+        "A * (k_x**2 + k_y**2 + k_z**2) - B * (k_x**2 + k_y**2 + k_z**2)**2"
+    )
+    hamiltonian = hamiltonian.lambdify(
+        {"A": taa / mass, "B": alpha * (taa / mass) ** 2}
+    )
+
+    fit = fit_bands(hamiltonian, [[1, 0, 0], [1, 1, 0], [1, 2, 3]])
+    assert fit.inverse_masses.shape == (3, 1)
+    assert np.allclose(fit.inverse_masses, 1 / mass)
+    assert np.allclose(fit.nonparabolicity, alpha)
+
+    with pytest.raises(ValueError):
+        fit_bands(hamiltonian, [1, 0])
+
+
+def test_inverse_mass_tensors():
+    tensors = inverse_mass_tensors(model.lambdify(parameters))
+    conduction = tensors[-1]
+    assert np.allclose(conduction, np.eye(3) / 0.0229, rtol=1e-3)
+
+    # heavy and light holes are resolved along a direction
+    hamiltonian = model.lambdify(parameters)
+    gamma_8v = np.isclose(np.linalg.eigvalsh(hamiltonian()), parameters["E_v"])
+    assert gamma_8v.sum() == 4
+    for direction in _normalize([[0, 0, 1], [1, 1, 1], [1, 2, 0]]):
+        tensors = inverse_mass_tensors(hamiltonian, direction=direction)
+        along = np.einsum("i,nij,j->n", direction, tensors, direction)
+        fit = fit_bands(hamiltonian, [direction], k_max=1e-3)
+        assert np.allclose(along, fit.inverse_masses[0], rtol=1e-3)
+        # two heavy and two light holes
+        assert len(set(np.round(along[gamma_8v], 6))) == 2
+
+
+def test_system_hamiltonian():
+    a = 0.5
+    template = kwant.continuum.discretize(model.hamiltonian, grid=a)
+    syst = kwant.wraparound.wraparound(template).finalized()
+    direction = [[1, 1, 0]]
+
+    fit = fit_bands(system_hamiltonian(syst, parameters, grid_spacing=a), direction)
+    lattice = lattice_hamiltonian(model.lambdify(parameters), a)
+    reference = fit_bands(lattice, direction)
+    assert np.allclose(fit.inverse_masses, reference.inverse_masses)
+
+
+def test_luttinger_parameters():
+    gamma_1, gamma_2, gamma_3 = 20.4, 8.3, 9.1
+    output = luttinger_parameters(
+        -(gamma_1 - 2 * gamma_2), -(gamma_1 + 2 * gamma_2), -(gamma_1 - 2 * gamma_3)
+    )
+    assert np.allclose(list(output.values()), [gamma_1, gamma_2, gamma_3])
+
+
+@pytest.mark.parametrize("grid_spacing", [None, 0.5])
+def test_databank_masses(grid_spacing):
+    databank = DataBank("winkler")
+    masses = databank_masses(model, databank, grid_spacing=grid_spacing)
+    assert list(masses.index) == ["InAs", "AlSb", "InSb"]
+
+    reference = databank.to_dataframe().loc[masses.index]
+    for column in ["m_c", "gamma_1", "gamma_2", "gamma_3"]:
+        assert np.allclose(masses[column], reference[column].astype(float), rtol=1e-2)
+
+    holes = databank_masses(ZincBlende(bands="gamma_8v"), databank, ["InAs"])
+    assert "m_c" not in holes
+    assert np.isclose(holes.loc["InAs", "m_hh_001"], 1 / (20.4 - 2 * 8.3))
@@ -1,7 +1,13 @@
+import os
+import subprocess
+import sys
+
 import numpy as np
+import sympy
 
 from semicon.kp_models.symbols import Jx, Jy, Jz, sigma_x, sigma_y, sigma_z
-from semicon.misc import spin_matrices
+from semicon.misc import fingerprint, spin_matrices
+from semicon.models import ZincBlende
 
 sigma_x = np.array(sigma_x.tolist(), dtype=complex)
 sigma_y = np.array(sigma_y.tolist(), dtype=complex)
@@ -28,3 +34,49 @@ def test_spin_matrices_commutation():
         np.allclose((Sx @ Sy - Sy @ Sx), 1j * Sz)
         np.allclose((Sy @ Sz - Sz @ Sy), 1j * Sx)
         np.allclose((Sz @ Sx - Sx @ Sz), 1j * Sy)
+
+
+def test_fingerprint():
+    assert fingerprint("k_x * A(z) * k_x + B / 2") == fingerprint(
+        "B / 2 + k_x * A(z) * k_x"
+    )
+    assert fingerprint("(k_x + 1)**2") == fingerprint("k_x**2 + 2 * k_x + 1")
+    assert fingerprint("0.25 * k_x + 0.25 * k_x") == fingerprint("0.5 * k_x")
+    # order of non-commuting factors matters
+    assert fingerprint("A(z) * k_z**2") != fingerprint("k_z * A(z) * k_z")
+    assert fingerprint("k_x + B") != fingerprint("k_x - B")
+
+    # numerical factors are exact, small terms are kept
+    assert fingerprint("1e-34 * k_x**2") != fingerprint("3e-34 * k_x**2")
+    assert fingerprint("1e-34 * k_x**2") != fingerprint("0 * k_x")
+    assert fingerprint("1e-13 * A * k_x**2 + B") != fingerprint("B")
+    assert fingerprint("0.5 * B") != fingerprint("B / 2")
+    assert fingerprint("A * k_x - A * k_x + B") == fingerprint("B")
+
+    # symbols with different assumptions are different
+    A, A_positive = sympy.Symbol("A"), sympy.Symbol("A", positive=True)
+    assert fingerprint(A * sympy.Symbol("k_x")) != fingerprint(
+        A_positive * sympy.Symbol("k_x")
+    )
+
+    # rotations back and forth only change numerical rounding
+    model = ZincBlende(bands=("gamma_6c", "gamma_8v"))
+    c, s = np.cos(0.3), np.sin(0.3)
+    R = np.array([[c, -s, 0], [s, c, 0], [0, 0, 1]])
+    rotated = model.rotate(R)
+    assert rotated.fingerprint() != model.fingerprint()
+    assert rotated.fingerprint() == model.rotate(R).fingerprint()
+
+    # stable across processes
+    code = (
+        "from semicon.models import ZincBlende;"
+        "print(ZincBlende(bands=('gamma_6c', 'gamma_8v')).fingerprint())"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        env=dict(os.environ, PYTHONHASHSEED="123"),
+        check=True,
+    )
+    assert output.stdout.strip() == model.fingerprint()
@@ -5,8 +5,13 @@ import scipy.linalg as la
 import sympy
 
 from semicon.kp_models import symbols
-from semicon.misc import prettify, rotation_functionality_available
-from semicon.models import Model
+from semicon.misc import (
+    expectation_values,
+    prettify,
+    rotation_functionality_available,
+    two_deg,
+)
+from semicon.models import Model, ZincBlende
 
 sigma_x = np.array(symbols.sigma_x.tolist(), dtype=complex)
 sigma_y = np.array(symbols.sigma_y.tolist(), dtype=complex)
@@ -99,7 +104,9 @@ def test_prettify_zero_nsimplify(str_input, str_output, nsimplify):
 def test_spin_operators():
     model = Model("A_x * sigma_x * k_x**2 + A_y * sigma_y * k_y**2", spins=1 / 2)
     S = 0.5 * np.array([sigma_x, sigma_y, sigma_z])
-    assert np.allclose(model.spin_operators, S)
+    assert np.allclose(model.spin_matrices, S)
+    # the static method is not shadowed by the instance
+    assert np.allclose(model.spin_operators(1 / 2), S)
 
 
 R = np.array([[0, -1, 0], [1, 0, 0], [0, 0, 1]])
@@ -137,7 +144,8 @@ def test_rotation():
         **get_subs(R, sympy.Matrix([sx, sy, sz])),
     }
 
-    n = Rotation.from_dcm(R).as_rotvec()
+    from_matrix = getattr(Rotation, "from_matrix", None) or Rotation.from_dcm
+    n = from_matrix(R).as_rotvec()
     ns = np.sum([ni * si for (ni, si) in zip(n, S)], axis=0)
     U = la.expm(1j * ns)
 
@@ -151,3 +159,76 @@ def test_rotation():
 
     assert isclose(a, b)
     assert isclose(a, Model(ham_str, spins=1 / 2).rotate(R).hamiltonian)
+
+
+# Test cached operators
+
+
+def test_spin_operators_cache():
+    first = Model.spin_operators([1 / 2, 3 / 2])
+    second = Model.spin_operators((0.5, 1.5))
+    assert first is second
+    assert not first.flags.writeable
+    assert first.shape == (3, 6, 6)
+
+
+@pytest.mark.parametrize(
+    "bands, indices",
+    [
+        (("gamma_6c", "gamma_7v"), {"gamma_6c": [0, 1], "gamma_7v": [2, 3]}),
+        (("gamma_8v", "gamma_6c"), {"gamma_8v": [0, 1, 2, 3], "gamma_6c": [4, 5]}),
+    ],
+)
+def test_band_projectors(bands, indices):
+    model = ZincBlende(bands=bands)
+    assert {k: list(v) for k, v in model.band_indices.items()} == indices
+    assert model.band_projectors is ZincBlende(bands=bands).band_projectors
+
+    projectors = np.array(list(model.band_projectors.values()))
+    assert np.allclose(projectors.sum(axis=0), np.eye(model.hamiltonian.shape[0]))
+    for p in projectors:
+        assert np.allclose(p @ p, p)
+
+
+def test_expectation_values():
+    model = ZincBlende()
+    J2 = model.total_angular_momentum
+    assert np.allclose(np.diag(J2), [3 / 4] * 2 + [15 / 4] * 4 + [3 / 4] * 2)
+
+    vectors = la.qr(np.random.randn(8, 8) + 1j * np.random.randn(8, 8))[0]
+    vectors = np.array([vectors, np.eye(8)])
+
+    projectors = np.array(list(model.band_projectors.values()))
+    weights = expectation_values(projectors, vectors)
+    assert weights.shape == (2, 3, 8)
+    assert np.allclose(weights.sum(axis=1), 1)
+    assert np.allclose(weights[1, 1], [0, 0, 1, 1, 1, 1, 0, 0])
+
+    spins = expectation_values(model.spin_matrices, vectors)
+    assert np.allclose(spins[1, 2], np.diag(model.spin_matrices[2]).real)
+    assert np.allclose(expectation_values(J2, vectors)[1], np.diag(J2))
+
+
+def test_parameters_batch():
+    model = ZincBlende(default_databank="lawaetz")
+    materials = ["InAs", "AlSb", "GaSb"]
+    offsets = np.array([[0, 0.18, 0.56], [0.1, 0.2, 0.3]])
+    batch = model.parameters_batch(materials, offsets)
+    assert batch.shape == (2, 3)
+    assert batch.dtype.names == tuple(model._varied_parameters)
+
+    for (i, j), record in np.ndenumerate(batch):
+        reference = model.parameters(materials[j], valence_band_offset=offsets[i, j])
+        for name in model._varied_parameters:
+            assert np.isclose(record[name], reference.get(name, np.nan), equal_nan=True)
+
+    # records are accepted by profile builders
+    profiles, _ = two_deg(batch[0], [2, 3, 2], 0.5)
+    assert np.isclose(profiles["E_v"](3.0), batch[0, 1]["E_v"])
+
+    # changes of databank entries are not hidden by the cache
+    model.default_databank["InAs"] = dict(model.default_databank["InAs"], E_0=0.5)
+    assert model.parameters_batch("InAs")["E_0"] == 0.5
+
+    with pytest.raises(ValueError):
+        ZincBlende().parameters_batch(materials)
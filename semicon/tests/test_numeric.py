@@ -0,0 +1,116 @@
+import kwant.continuum
+import numpy as np
+import pytest
+
+from semicon.models import Model, ZincBlende
+from semicon.numeric import PolynomialHamiltonian, band_derivatives
+
+model = ZincBlende(default_databank="winkler")
+parameters = model.parameters("InAs")
+
+momenta = [(0, 0, 0), (0.1, 0, 0), (0.1, -0.2, 0.3), (0.01, 0.02, 0.03)]
+
+
+@pytest.mark.parametrize("k", momenta)
+def test_evaluation_against_kwant(k):
+    reference = kwant.continuum.lambdify(str(model.hamiltonian), locals=parameters)
+    ham = model.lambdify(parameters)
+    assert np.allclose(ham(*k), reference(*k))
+
+
+def test_batched_evaluation():
+    ham = model.lambdify(parameters)
+    k_x = np.linspace(-0.5, 0.5, 11)
+    k_y = np.linspace(-0.2, 0.2, 3)[:, None]
+    batched = ham(k_x, k_y, 0.1)
+    assert batched.shape == (3, 11, 8, 8)
+    assert np.allclose(batched[2, 4], ham(k_x[4], k_y[2, 0], 0.1))
+
+
+def test_symbolic_derivatives():
+    ham = model.lambdify(parameters)
+    k = (0.1, -0.2, 0.3)
+    for i, v in enumerate(model.velocity_operators()):
+        v = PolynomialHamiltonian.from_sympy(v, parameters)
+        assert np.allclose(v(*k), ham.derivative(i)(*k))
+
+    curvatures = model.curvature_operators()
+    numerical = ham.curvature_operators(*k)
+    for i in range(3):
+        for j in range(3):
+            c = PolynomialHamiltonian.from_sympy(curvatures[i][j], parameters)
+            assert np.allclose(c(*k), numerical[i, j])
+
+
+def test_parabolic_band_derivatives():
+    ham = Model("A * k_x**2 + B * k_y + C").lambdify({"A": 2, "B": 3, "C": 1})
+    k_x = np.linspace(-1, 1, 5)
+    energies, velocities, curvatures = band_derivatives(ham, k_x=k_x)
+    assert np.allclose(energies[:, 0], 2 * k_x**2 + 1)
+    assert np.allclose(velocities[:, 0], np.array([4 * k_x, 3 + 0 * k_x, 0 * k_x]).T)
+    assert np.allclose(curvatures[:, 0, 0, 0], 4)
+
+
+def test_degenerate_band_derivatives():
+    # bands k_y**2 +- k_x**2 are degenerate at k = 0
+    ham = Model("k_x**2 * sigma_x + k_y**2 * sigma_0").lambdify()
+    _, _, averaged = band_derivatives(ham)
+    assert np.allclose(averaged[:, 0, 0], 0)
+
+    _, _, curvatures = band_derivatives(ham, direction=[1, 0, 0])
+    assert np.allclose(curvatures[:, 0, 0], [-2, 2])
+    _, _, curvatures = band_derivatives(ham, direction=[1, 1, 0])
+    along = np.einsum("i,nij,j->n", [1, 1, 0], curvatures, [1, 1, 0]) / 2
+    assert np.allclose(along, [0, 2])
+
+
+def test_band_derivatives_finite_differences():
+    ham = model.lambdify(parameters)
+    k = np.linspace(0.01, 0.3, 7)
+    direction = np.array([1, 0.3, 0.1])
+    direction = direction / np.linalg.norm(direction)
+    kx, ky, kz = (k[:, None] * direction).T
+
+    energies, velocities, curvatures = band_derivatives(ham, kx, ky, kz)
+
+    d = 1e-4
+    Ep = np.linalg.eigvalsh(
+        ham(kx + d * direction[0], ky + d * direction[1], kz + d * direction[2])
+    )
+    Em = np.linalg.eigvalsh(
+        ham(kx - d * direction[0], ky - d * direction[1], kz - d * direction[2])
+    )
+
+    v = velocities @ direction
+    c = np.einsum("...ij,i,j->...", curvatures, direction, direction)
+    assert np.allclose((Ep - Em) / (2 * d), v, atol=1e-6)
+    assert np.allclose((Ep + Em - 2 * energies) / d**2, c, atol=1e-4)
+
+
+def test_position_dependent_parameters():
+    with pytest.raises(ValueError):
+        ZincBlende(parameter_coords="z").lambdify({})
+
+
+def test_model_from_coefficients():
+    coefficients = model.lambdify(parameters).coefficients
+    numeric_model = Model(coefficients, spins=[1 / 2, 3 / 2, 1 / 2])
+    assert numeric_model._hamiltonian is None
+    k = (0.1, -0.2, 0.3)
+    assert np.allclose(numeric_model.lambdify()(*k), model.lambdify(parameters)(*k))
+    # the sympy form is created only on request
+    assert numeric_model._hamiltonian is None
+    symbolic = PolynomialHamiltonian.from_sympy(numeric_model.hamiltonian)
+    assert np.allclose(symbolic(*k), model.lambdify(parameters)(*k))
+
+    # monomials as sympy expressions, strings or tuples of powers
+    sigma_z = np.diag([1, -1])
+    scalar = Model({1: sigma_z, "k_x**2": np.eye(2), (0, 1, 1): 2 * sigma_z})
+    assert scalar.hamiltonian.shape == (2, 2)
+    assert np.allclose(scalar.lambdify()(1, 2, 3), np.diag([14, -12]))
+    assert scalar.rotate(np.eye(3)).hamiltonian == scalar.hamiltonian
+
+    with pytest.raises(ValueError):
+        Model({"k_x + k_y": np.eye(2)})
+    with pytest.raises(ValueError):
+        Model({(1, 0, 0): np.eye(2), (0, 0, 0): np.eye(3)})
@@ -1,9 +1,12 @@
 import collections
+import pickle
 
+import numpy as np
 import pandas as pd
 import pytest
 
-from semicon.parameters import DataBank
+from semicon.models import ZincBlende
+from semicon.parameters import DataBank, ZincBlendeParameters, ZincBlendeRecord
 
 
 @pytest.mark.parametrize("databank_name", ["winkler", "lawaetz"])
@@ -19,3 +22,56 @@ def test_databank_dataframe_conversion(databank_name):
 
     assert sorted(list(db)) == sorted(list(df.index))
     assert isinstance(df, pd.DataFrame)
+
+
+def test_parameter_record():
+    model = ZincBlende(default_databank="lawaetz")
+    parameters = model.parameters("InAs")
+    record = parameters.to_record()
+    assert isinstance(record, ZincBlendeRecord)
+    assert record.name == "InAs" and record.bands == tuple(model.bands)
+
+    # read-only dictionary view
+    assert dict(record) == dict(parameters)
+    assert record == dict(parameters)
+    assert record["E_0"] == record.E_0 == parameters["E_0"]
+    assert len(record) == len(parameters)
+    with pytest.raises(KeyError):
+        record["unknown"]
+    with pytest.raises(AttributeError):
+        record.E_0 = 1
+    with pytest.raises(TypeError):
+        record["E_0"] = 1
+
+    # hashing and copies
+    same = ZincBlendeRecord.from_mapping(parameters)
+    changed = record.replace(E_v=0.1, extra=2)
+    assert same == record and hash(same) == hash(record)
+    assert changed != record and changed["extra"] == 2
+    assert len({record, same, changed}) == 2
+    assert pickle.loads(pickle.dumps(changed)) == changed
+
+    # NaN values do not make records unequal to their copies
+    missing = record.replace(E_0=float("nan"))
+    assert missing == missing.replace() and hash(missing) == hash(missing.replace())
+    assert missing != record
+
+    # records round trip and are used as cache keys
+    bare = ZincBlendeParameters("InAs", model.bands, record, already_bare=True)
+    assert bare == parameters
+    assert model.lambdify(record) is model.lambdify(same)
+    assert model.lambdify(missing) is model.lambdify(missing.replace())
+    assert np.allclose(
+        model.lambdify(record)(0, 0, 0.1), model.lambdify(parameters)(0, 0, 0.1)
+    )
+
+
+def test_lambdified_cache_size(monkeypatch):
+    model = ZincBlende(default_databank="lawaetz")
+    monkeypatch.setattr(model, "_lambdified_cache_size", 2)
+    records = [model.parameters("InAs").to_record().replace(E_v=v) for v in range(3)]
+    first = model.lambdify(records[0])
+    model.lambdify(records[1])
+    assert model.lambdify(records[0]) is first
+    model.lambdify(records[2])
+    assert list(model._derived["lambdified"]) == [records[0], records[2]]
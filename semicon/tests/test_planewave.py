@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+import scipy.sparse.linalg as sla
+
+from semicon.heterostructure import Heterostructure
+from semicon.misc import two_deg
+from semicon.models import Model, ZincBlende
+from semicon.parameters import constants
+from semicon.planewave import PlaneWaveHamiltonian, operator_terms
+
+
+def test_operator_terms():
+    model = Model("k_z * A(z) * k_z + B(z) * k_z + k_x**2 * A(z) + C")
+    terms = operator_terms(model.hamiltonian, "z")
+    assert set(terms) == {
+        ((1,), (1,), (0, 0)),
+        ((0,), (1,), (0, 0)),
+        ((0,), (0,), (2, 0)),
+        ((0,), (0,), (0, 0)),
+    }
+    assert str(terms[((0,), (0,), (2, 0))][0, 0]) == "A(z)"
+    assert str(terms[((0,), (1,), (0, 0))][0, 0]) == "B(z)"
+
+    with pytest.raises(ValueError):
+        operator_terms(Model("A(z) * k_z * B(z)").hamiltonian, "z")
+
+
+def test_harmonic_oscillator():
+    # H = A k^2 + c (r - L/2)^2 has levels 2 sqrt(A c) (n + 1/2)
+    L, A, c = 20, 1.0, 0.25
+    params = dict(A=A, V=lambda z: c * (z - L / 2) ** 2)
+    model = Model("k_z * A(z) * k_z + V(z)")
+    H = PlaneWaveHamiltonian(model, params, L, 31, coords="z")
+    assert H.size == 31
+    energies = H.bands()
+    assert np.allclose(energies[:4], (np.arange(4) + 0.5), atol=1e-8)
+
+    # in-plane momenta
+    model = Model("k_x * A(z) * k_x + k_z * A(z) * k_z + V(z)")
+    H = PlaneWaveHamiltonian(model, params, L, 31, coords="z")
+    energies = H.bands(k_x=np.array([0, 0.5]))
+    assert np.allclose(energies[:, 0], [0.5, 0.75])
+
+    # two confined directions with different frequencies
+    params = dict(
+        A=A,
+        V=lambda y, z: c * (y - L / 2) ** 2 + 4 * c * (z - L / 2) ** 2,
+    )
+    model = Model("k_y * A(y, z) * k_y + k_z * A(y, z) * k_z + V(y, z)")
+    H = PlaneWaveHamiltonian(model, params, L, 25, coords="yz")
+    expected = np.sort([(n + 0.5) + 2 * (m + 0.5) for n in range(5) for m in range(5)])
+    assert np.allclose(H.bands()[:5], expected[:5], atol=1e-6)
+
+    values, vectors = H.bands(return_vectors=True)
+    positions = np.array([[L / 2, L / 2], [L / 2 + 1, L / 2]])
+    psi = H.wavefunctions(vectors[:, :1], positions)
+    assert psi.shape == (2, 1, 1)
+    # Gaussian ground state exp(-sqrt(c / A) y^2 / 2)
+    assert np.isclose(abs(psi[1, 0, 0] / psi[0, 0, 0]), np.exp(-1 / 4))
+
+
+def test_bulk():
+    # a single material has bulk bands at momenta k_z + G
+    model = ZincBlende(parameter_coords="z", default_databank="lawaetz")
+    InAs = model.parameters("InAs").renormalize(new_gamma_0=1)
+    params = dict(InAs, **constants)
+
+    H = PlaneWaveHamiltonian(model, params, 5, 5)
+    assert H.norbs == 8
+    k_x, k_y, k_z = 0.1, -0.2, 0.3
+    hamiltonian = H.hamiltonian(k_x, k_y, k_z)
+    assert np.allclose(hamiltonian, np.conj(hamiltonian.T))
+
+    bulk = ZincBlende(default_databank="lawaetz").lambdify(InAs)
+    expected = [
+        np.linalg.eigvalsh(bulk(k_x, k_y, k_z + G))
+        for G in 2 * np.pi * np.arange(-2, 3) / 5
+    ]
+    assert np.allclose(H.bands(k_x, k_y, k_z), np.sort(np.ravel(expected)))
+
+    with pytest.raises(ValueError):
+        PlaneWaveHamiltonian(model, {}, 5, 5)
+
+
+def test_heterostructure():
+    # InAs/AlSb quantum well against finite differences, extrapolated to
+    # zero grid spacing from errors proportional to its square
+    model = ZincBlende(parameter_coords="z", default_databank="lawaetz")
+    AlSb = model.parameters("AlSb", valence_band_offset=0.18).renormalize(new_gamma_0=1)
+    InAs = model.parameters("InAs").renormalize(new_gamma_0=1)
+    stack, widths = [AlSb, InAs, AlSb], [10, 10, 10]
+    E_c = InAs["E_v"] + InAs["E_0"]
+
+    def subbands(energies):
+        # first three Kramers degenerate electron subbands
+        return np.sort(energies[energies > E_c])[::2][:3]
+
+    finite_differences = []
+    for grid_spacing in [0.1, 0.05]:
+        H = Heterostructure(
+            model, stack, widths, grid_spacing, extra_constants=constants
+        ).hamiltonian(0, 0)
+        energies = sla.eigsh(H, k=6, sigma=0.7, return_eigenvectors=False)
+        finite_differences.append(subbands(energies))
+    reference = (4 * finite_differences[1] - finite_differences[0]) / 3
+
+    profiles, _ = two_deg(stack, widths, 0.01, extra_constants=constants)
+    errors = []
+    for n_waves in [61, 121]:
+        H = PlaneWaveHamiltonian(model, profiles, 30, n_waves, origin=-0.005)
+        errors.append(abs(subbands(H.bands()) - reference))
+    assert np.all(errors[1] < errors[0])
+    assert np.all(errors[1] < [1e-4, 3e-4, 6e-4])
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from semicon.kgrid import KGrid, symmetry_operations
+from semicon.parameters import taa
+from semicon.poisson import (
+    AndersonMixer,
+    e_over_eps_0,
+    schrodinger_poisson,
+    solve_poisson,
+)
+
+
+def test_solve_poisson():
+    a, n = 0.5, 41
+    z = a * np.arange(n)
+    charge, eps = 1e-3, 12.0
+
+    # quadratic potential vanishing one grid spacing outside of the grid
+    potential = solve_poisson(np.full(n, charge), eps, a, boundary=(0, 0))
+    expected = e_over_eps_0 * charge / (2 * eps) * (z + a) * (z - z[-1] - a)
+    assert np.allclose(potential, expected)
+
+    # zero field on the left
+    potential = solve_poisson(np.full(n, charge), eps, a, boundary=(None, 0.1))
+    assert np.isclose(potential[1], potential[0] + e_over_eps_0 * charge * a**2 / eps)
+
+    with pytest.raises(ValueError):
+        solve_poisson(np.full(n, charge), eps, a, boundary=(None, None))
+
+
+def test_anderson_mixer():
+    # slowly converging linear fixed point problem
+    rng = np.random.default_rng(0)
+    Q, _ = np.linalg.qr(rng.normal(size=(20, 20)))
+    A = Q @ np.diag(np.linspace(-0.9, 0.95, 20)) @ Q.T
+    b = rng.normal(size=20)
+    solution = np.linalg.solve(np.eye(20) - A, b)
+
+    def iterations(history):
+        mixer = AndersonMixer(beta=0.5, history=history)
+        x = np.zeros(20)
+        for i in range(1000):
+            if np.linalg.norm(A @ x + b - x) < 1e-10:
+                return i, x
+            x = mixer(x, A @ x + b)
+
+    simple, x = iterations(0)
+    assert np.allclose(x, solution)
+    anderson, x = iterations(5)
+    assert np.allclose(x, solution)
+    assert anderson < simple / 5
+
+
+def test_schrodinger_poisson():
+    # 20 nm hard wall quantum well with electrons of mass 0.067 m_0,
+    # compensated by uniform doping
+    a, mass, sheet_density = 0.5, 0.067, 5e-3
+    z = a * np.arange(40)
+    t = taa / mass / a**2
+    kinetic = sp.diags([-t, 2 * t, -t], [-1, 0, 1], shape=(len(z), len(z)))
+
+    def hamiltonian(k):
+        return kinetic + taa / mass * (k[0] ** 2 + k[1] ** 2) * sp.identity(len(z))
+
+    k = np.linspace(-0.5, 0.5, 25)
+    kgrid = KGrid([k, k], symmetry_operations(dimensions=2))
+    doping = sheet_density / (len(z) * a)
+
+    def solve(history):
+        return schrodinger_poisson(
+            hamiltonian,
+            z,
+            1,
+            kgrid,
+            permittivity=12.9,
+            doping=doping,
+            density=sheet_density,
+            temperature=10,
+            n_states=4,
+            sigma=-0.01,
+            history=history,
+        )
+
+    result = solve(history=5)
+    assert result.residuals[-1] < 1e-5
+    assert np.isclose(np.sum(result.density) * a, sheet_density, rtol=1e-3)
+    # Fermi level of the lowest subband of the ideal 2D gas
+    E_1 = np.min(result.energies)
+    expected = E_1 + 4 * np.pi * taa * sheet_density / mass
+    assert np.isclose(result.fermi_level, expected, atol=2e-3)
+
+    poisson = solve_poisson(doping - result.density, 12.9, a, boundary=(None, 0))
+    assert np.allclose(poisson, result.potential, atol=1e-4)
+
+    simple = solve(history=0)
+    assert len(result.residuals) < len(simple.residuals)
+    assert np.allclose(simple.potential, result.potential, atol=1e-4)
+
+    with pytest.raises(ValueError):
+        schrodinger_poisson(hamiltonian, z, 1, kgrid, 12.9, fermi_level=0.1, density=1)
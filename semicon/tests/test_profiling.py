@@ -0,0 +1,78 @@
+import json
+import sys
+
+import numpy as np
+import pytest
+import scipy.sparse as sp
+import scipy.sparse.linalg as sla
+
+from semicon import profiling
+from semicon.misc import two_deg
+from semicon.models import ZincBlende
+
+
+def test_no_hook_when_disabled():
+    assert profiling._active is None
+    assert sys.getprofile() is None
+
+
+def test_profile_stages():
+    with profiling.profile() as report:
+        model = ZincBlende(bands="gamma_6c", default_databank="winkler")
+        params = model.parameters("InAs")
+        two_deg([params, params], [5, 5], grid_spacing=1)
+        with profiling.stage("eigensolver"):
+            sla.eigsh(sp.diags(np.arange(20.0)), k=2, sigma=0.5)
+
+    assert sys.getprofile() is None
+    summary = report.summary()
+    for name in [
+        "models.build_hamiltonian",
+        "kwant.sympify",
+        "models.parameters",
+        "parameters.calculate_bare",
+        "misc.two_deg",
+        "scipy.interp1d.init",
+        "eigensolver",
+        "scipy.eigsh",
+    ]:
+        assert summary[name]["calls"] >= 1
+        assert summary[name]["total_time"] >= 0
+        assert summary[name]["peak_memory"] is not None
+
+    assert summary["scipy.interp1d.init"]["calls"] == 11
+    assert "misc.two_deg" in str(report)
+
+
+def test_nested_stages():
+    with profiling.profile(memory=False) as report:
+        with profiling.stage("outer"):
+            with profiling.stage("inner"):
+                pass
+
+    inner, outer = report.events
+    assert (inner["name"], outer["name"]) == ("inner", "outer")
+    assert outer["start"] <= inner["start"]
+    assert outer["duration"] >= inner["duration"]
+    assert inner["peak_memory"] is None
+
+
+def test_exports(tmpdir):
+    with profiling.profile(memory=False) as report:
+        ZincBlende(bands="gamma_6c")
+
+    fname = str(tmpdir.join("report.json"))
+    report.to_json(fname)
+    with open(fname) as f:
+        data = json.load(f)
+    assert data["stages"]["models.build_hamiltonian"]["calls"] == 1
+
+    trace = json.loads(report.to_chrome_trace())
+    assert all(event["ph"] == "X" for event in trace["traceEvents"])
+
+
+def test_single_session():
+    with profiling.profile(memory=False):
+        with pytest.raises(RuntimeError):
+            with profiling.profile():
+                pass
@@ -0,0 +1,77 @@
+import kwant
+import numpy as np
+import pytest
+
+from semicon import renormalization
+from semicon.models import ZincBlende
+from semicon.renormalization import (
+    auto_renormalize,
+    count_in_gap,
+    lattice_hamiltonian,
+    scan,
+)
+
+model = ZincBlende(default_databank="winkler")
+grid_spacing = 0.5
+
+
+def test_lattice_hamiltonian_against_kwant():
+    parameters = model.parameters("InAs").renormalize(new_gamma_0=1)
+    template = kwant.continuum.discretize(model.hamiltonian, grid=grid_spacing)
+    syst = kwant.wraparound.wraparound(template).finalized()
+    lattice = lattice_hamiltonian(model.lambdify(parameters), grid_spacing)
+
+    for k in [(0.3, 0, 0), (0.5, 1.2, -2.0), (6, 1, 3)]:
+        momenta = dict(zip(["k_x", "k_y", "k_z"], grid_spacing * np.array(k)))
+        reference = syst.hamiltonian_submatrix(params={**parameters, **momenta})
+        assert np.allclose(lattice(*k), reference)
+
+
+def test_count_in_gap():
+    original = model.parameters("InAs")
+    renormalized = original.renormalize(new_gamma_0=1)
+    in_gap = count_in_gap([original, renormalized], grid_spacing)
+    assert in_gap[0] > 0
+    assert in_gap[1] == 0
+
+
+def test_scan():
+    parameters = model.parameters("InAs")
+    result = scan(parameters, grid_spacing, candidates=[-0.5, 0, 1])
+    assert list(result.in_gap > 0) == [True, False, False]
+    assert result.best == 1
+    assert np.isclose(result.optimal["gamma_0"], 0)
+
+    result = scan(parameters, grid_spacing, parameter="P", candidates=[0.5, 0.9])
+    assert result.best is not None
+
+    with pytest.raises(ValueError):
+        scan(parameters, grid_spacing, parameter="E_0")
+
+
+def test_auto_renormalize_cache():
+    renormalization._cache.clear()
+    first = auto_renormalize(model, "InAs", grid_spacing, candidates=[0, 1])
+    assert len(renormalization._cache) == 1
+    first["P"] = 0
+    second = auto_renormalize(model, "InAs", grid_spacing, candidates=[0, 1])
+    assert second["P"] != 0
+    assert len(renormalization._cache) == 1
+
+    # changes of databank entries are not hidden by the cache
+    other = ZincBlende(default_databank="winkler")
+    other.default_databank["InAs"] = dict(other.default_databank["InAs"], E_0=0.5)
+    third = auto_renormalize(other, "InAs", grid_spacing, candidates=[0, 1])
+    assert third["E_0"] == 0.5
+    assert len(renormalization._cache) == 2
+
+    with pytest.raises(ValueError):
+        auto_renormalize(model, "InAs", grid_spacing, candidates=[-0.5])
+
+
+def test_auto_renormalize_cache_size(monkeypatch):
+    renormalization._cache.clear()
+    monkeypatch.setattr(renormalization, "_cache_size", 2)
+    for spacing in [0.5, 0.6, 0.7]:
+        auto_renormalize(model, "InAs", spacing, candidates=[0, 1])
+    assert [key[3] for key in renormalization._cache] == [0.6, 0.7]
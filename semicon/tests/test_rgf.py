@@ -0,0 +1,81 @@
+import kwant
+import numpy as np
+import pytest
+
+from semicon.heterostructure import Heterostructure
+from semicon.models import ZincBlende
+from semicon.parameters import constants
+from semicon.rgf import BlockTridiagonal, surface_green_function
+
+model = ZincBlende(parameter_coords="z", default_databank="lawaetz")
+AlSb = model.parameters("AlSb", valence_band_offset=0.18).renormalize(new_gamma_0=1)
+InAs = model.parameters("InAs").renormalize(new_gamma_0=1)
+heterostructure = Heterostructure(
+    model, [AlSb, InAs, AlSb], [3, 6, 3], 0.5, extra_constants=constants
+)
+
+
+def test_eigenvalues():
+    H = heterostructure.hamiltonian(0.1, 0.05).toarray()
+    reference = np.linalg.eigvalsh(H)
+    blocks = BlockTridiagonal.from_heterostructure(heterostructure, 0.1, 0.05)
+    assert len(blocks) == len(heterostructure.z)
+
+    energies = np.linspace(-0.5, 1.0, 7)
+    assert np.all(blocks.inertia(energies) == np.searchsorted(reference, energies))
+
+    window = reference[(reference >= 0.3) & (reference < 0.8)]
+    assert len(window)
+    assert np.allclose(blocks.eigenvalues(0.3, 0.8), window, atol=1e-9)
+
+    with pytest.raises(ValueError):
+        BlockTridiagonal.from_sparse(np.ones((4, 4)), np.arange(4), 1)
+
+
+def test_local_dos():
+    blocks = BlockTridiagonal.from_heterostructure(heterostructure, 0.1)
+    H = heterostructure.hamiltonian(0.1).toarray()
+    order = np.argsort(heterostructure.z)
+    values, vectors = np.linalg.eigh(H)
+
+    energies, eta = np.linspace(0.3, 0.8, 11), 5e-3
+    weights = np.abs(vectors.reshape(-1, 8, len(values))) ** 2
+    weights = weights.sum(axis=1)[order]
+    lorentzian = eta / np.pi / ((energies[:, None] - values) ** 2 + eta**2)
+    assert np.allclose(blocks.local_dos(energies, eta), lorentzian @ weights.T)
+
+
+def chain(onsite, hopping):
+    lat = kwant.lattice.chain(norbs=len(hopping))
+    syst = kwant.Builder()
+    syst[(lat(i) for i in range(len(onsite)))] = lambda site: onsite[site.tag[0]]
+    syst[lat.neighbors()] = hopping
+    for symmetry, value in ((-1, onsite[0]), (1, onsite[-1])):
+        lead = kwant.Builder(kwant.TranslationalSymmetry((symmetry,)))
+        lead[lat(0)] = value
+        lead[lat.neighbors()] = hopping
+        syst.attach_lead(lead)
+    return syst.finalized()
+
+
+def test_transmission():
+    # two orbital chain with a random barrier
+    rng = np.random.default_rng(1)
+    hopping = np.array([[-1, 0.2], [0.3, -0.8]])
+    onsite = np.array([[[0.1, 0.2], [0.2, -0.3]]] * 12)
+    barrier = rng.normal(size=(4, 2, 2))
+    onsite[4:8] += barrier + barrier.transpose(0, 2, 1)
+
+    # kwant.Builder sets H[i + 1, i] to the hopping
+    blocks = BlockTridiagonal(onsite, np.array([hopping.conj().T] * 11))
+    syst = chain(onsite, hopping)
+
+    energies = np.linspace(-2, 2, 9)
+    reference = [kwant.smatrix(syst, energy=E).transmission(1, 0) for E in energies]
+    assert np.allclose(blocks.transmission(energies), reference, atol=1e-6)
+
+    # surface Green's function of a single band chain
+    energies = np.array([0.5, 2.5]) + 1e-9j
+    g = surface_green_function(energies, np.zeros((1, 1)), np.eye(1))
+    expected = (energies.real - np.emath.sqrt(energies.real**2 - 4)) / 2
+    assert np.allclose(g[:, 0, 0], expected, atol=1e-6)
@@ -0,0 +1,96 @@
+import json
+
+import numpy as np
+import pytest
+
+from semicon.models import ZincBlende
+from semicon.store import ResultStore, model_metadata
+
+fields = {"energies": 4, "vectors": ((6, 4), complex)}
+
+
+def result(index):
+    energies = np.arange(4) + sum(index)
+    vectors = np.full((6, 4), sum(index) * 1j)
+    return {"energies": energies, "vectors": vectors}
+
+
+def fill(store, n=None):
+    for i, index in enumerate(store.missing()[:n]):
+        store.write(index, **result(index))
+
+
+@pytest.mark.parametrize("fname", ["sweep", "sweep.h5"])
+def test_resume_and_read(tmp_path, fname):
+    if fname.endswith(".h5"):
+        pytest.importorskip("h5py")
+    path = str(tmp_path / fname)
+
+    with ResultStore(path, (3, 5), fields, flush_every=2) as store:
+        fill(store, 7)
+        assert len(store.missing()) == 8
+
+    # interrupted sweep: only points flushed to disk are completed
+    store = ResultStore(path, (3, 5), fields, flush_every=2)
+    fill(store, 3)
+    store._backend.close()
+
+    with ResultStore(path, (3, 5), fields) as store:
+        assert store.completed.sum() == 7 + 2
+        fill(store)
+        assert not store.missing()
+
+    with ResultStore(path, mode="r") as store:
+        energies = store.read("energies")
+        assert energies.shape == (3, 5, 4)
+        assert np.allclose(energies[2, 3], result((2, 3))["energies"])
+        assert np.allclose(store.read("vectors")[1, 1], 2j)
+        with pytest.raises(ValueError):
+            store.write((0, 0), **result((0, 0)))
+
+
+def test_memory_mapped(tmp_path):
+    path = str(tmp_path / "sweep")
+    with ResultStore(path, 2, fields) as store:
+        fill(store)
+        energies = store.read("energies")
+        assert isinstance(energies, np.memmap)
+        assert not energies.flags.writeable
+
+
+def test_validation(tmp_path):
+    path = str(tmp_path / "sweep")
+    with pytest.raises(ValueError):
+        ResultStore(path, mode="r")
+    with pytest.raises(ValueError):
+        ResultStore(path)
+
+    with ResultStore(path, (2, 2), fields) as store:
+        with pytest.raises(ValueError):
+            store.write((0, 0), energies=np.zeros(4))
+        with pytest.raises(ValueError):
+            store.write((0, 0), energies=np.zeros(3), vectors=np.zeros((6, 4)))
+        with pytest.raises(ValueError):
+            store.write(0, **result((0, 0)))
+
+    with pytest.raises(ValueError):
+        ResultStore(path, (2, 3), fields)
+    with pytest.raises(ValueError):
+        ResultStore(path, (2, 2), {"energies": 5})
+
+
+def test_metadata(tmp_path):
+    model = ZincBlende(bands=("gamma_6c",), default_databank="winkler")
+    parameters = model.parameters("InAs")
+    parameters["E_0"] = lambda x: x
+    metadata = model_metadata(model, parameters, gate=np.linspace(0, 1, 3))
+
+    assert metadata["bands"] == ["gamma_6c"]
+    assert metadata["components"] == ["foreman"]
+    assert metadata["parameters"]["gamma_0"] == parameters["gamma_0"]
+    assert metadata["gate"] == [0, 0.5, 1]
+    json.dumps(metadata)
+
+    path = str(tmp_path / "sweep")
+    ResultStore(path, 1, fields, metadata=metadata).close()
+    assert ResultStore(path).metadata == metadata
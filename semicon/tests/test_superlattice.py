@@ -0,0 +1,65 @@
+import kwant
+import numpy as np
+import pytest
+
+from semicon.models import ZincBlende
+from semicon.parameters import constants
+from semicon.renormalization import lattice_hamiltonian
+from semicon.superlattice import Superlattice, periodic_profiles
+
+model = ZincBlende(parameter_coords="z", default_databank="lawaetz")
+InAs = model.parameters("InAs").renormalize(new_gamma_0=1)
+GaSb = model.parameters("GaSb", valence_band_offset=0.56).renormalize(new_gamma_0=1)
+
+
+def test_periodic_profiles():
+    profiles = periodic_profiles([InAs, GaSb], [2, 3], 0.5, ["E_v"])
+    E_v = profiles["E_v"]
+    assert np.isclose(E_v(0.5), InAs["E_v"])
+    assert np.isclose(E_v(3.0), GaSb["E_v"])
+    # interfaces, including the one between periods
+    assert np.isclose(E_v(1.75), (InAs["E_v"] + GaSb["E_v"]) / 2)
+    assert np.isclose(E_v(4.75), (InAs["E_v"] + GaSb["E_v"]) / 2)
+    assert np.isclose(E_v(-0.25), E_v(4.75))
+    assert np.isclose(E_v(12.0), E_v(2.0))
+
+
+def test_folded_bulk_bands():
+    # superlattice of a single material has folded bulk bands
+    a = 0.5
+    superlattice = Superlattice(model, [InAs, InAs], [1, 1], a, constants)
+    assert superlattice.norbs == 8
+    assert len(superlattice.z) == 4
+
+    bulk = ZincBlende(default_databank="lawaetz")
+    bulk = lattice_hamiltonian(bulk.lambdify(InAs), a)
+
+    # in-plane momenta are not discretized, so only k_z is compared
+    k_z = 0.3
+    shifts = 2 * np.pi * np.arange(4) / superlattice.period
+    expected = np.sort(np.linalg.eigvalsh(bulk(0, 0, k_z + shifts)).ravel())
+    assert np.allclose(superlattice.bands(0, 0, k_z), expected)
+
+
+def test_superlattice():
+    superlattice = Superlattice(model, [InAs, GaSb], [2.5, 2.5], 0.5, constants)
+    k_z = np.linspace(-1, 1, 5) * np.pi / superlattice.period
+    k_x = np.array([0, 0.1])[:, None]
+
+    H = superlattice.hamiltonian(k_x, 0, k_z)
+    assert H.shape == (2, 5, 80, 80)
+    assert np.allclose(H, np.conj(np.swapaxes(H, -1, -2)))
+
+    energies = superlattice.bands(k_x, 0, k_z)
+    bands = kwant.physics.Bands(
+        superlattice.syst, params=dict(superlattice.params, k_x=0.1, k_y=0)
+    )
+    expected = [bands(k * superlattice.period) for k in k_z]
+    assert np.allclose(energies[1], expected)
+    assert energies.shape == (2, 5, 80)
+    # periodic in k_z and symmetric
+    assert np.allclose(energies[:, 0], energies[:, -1])
+    assert np.allclose(energies, energies[:, ::-1])
+
+    with pytest.raises(ValueError):
+        Superlattice(model, [InAs, GaSb], [2.5, 2.6], 0.5, constants)
@@ -0,0 +1,90 @@
+import kwant
+import numpy as np
+import scipy.sparse as sp
+
+from semicon.models import ZincBlende
+from semicon.sweep import _SearchSpace, reorder_by_overlap, track_bands
+
+model = ZincBlende(default_databank="winkler")
+parameters = model.parameters("InAs").renormalize(new_gamma_0=1)
+
+template = kwant.continuum.discretize(model.hamiltonian, coords="z", grid=0.5)
+syst = kwant.Builder()
+syst.fill(template, lambda site: 0 <= site.pos[0] < 20, (0,))
+syst = syst.finalized()
+
+
+def hamiltonian(k):
+    params = {**parameters, "k_x": k, "k_y": 0}
+    return syst.hamiltonian_submatrix(params=params, sparse=True)
+
+
+momenta = np.linspace(0, 0.3, 16)
+sigma = parameters["E_v"] + parameters["E_0"] + 0.05
+
+
+def test_reorder_by_overlap():
+    vectors = np.linalg.qr(np.random.randn(10, 4))[0]
+    permutation = reorder_by_overlap(vectors, vectors[:, [2, 0, 3, 1]])
+    assert list(permutation) == [1, 3, 0, 2]
+
+
+def test_search_space():
+    # projections updated by new columns equal the directly computed ones
+    H = hamiltonian(0.1)
+    rng = np.random.default_rng(0)
+    space = _SearchSpace(H, sigma, rng.standard_normal((H.shape[0], 6)))
+    space.extend(rng.standard_normal((H.shape[0], 4)))
+    _, Y = space.harmonic_ritz(5)
+    space.restart(Y)
+    space.extend(rng.standard_normal((H.shape[0], 3)))
+
+    Q = space.Q
+    assert Q.shape[1] == 8
+    assert np.allclose(Q.conj().T @ Q, np.eye(8))
+    W = H @ Q - sigma * Q
+    assert np.allclose(space.W, W)
+    assert np.allclose(space.A, Q.conj().T @ W)
+    assert np.allclose(space.B, W.conj().T @ W)
+
+
+def test_track_bands():
+    n_bands = 6
+    result = track_bands(hamiltonian, momenta, n_bands, sigma, adapt_sigma=False)
+    assert result.energies.shape == (len(momenta), n_bands)
+    assert result.vectors.shape == (len(momenta), syst.graph.num_nodes * 8, n_bands)
+    assert result.factorizations < len(momenta)
+    assert np.all(result.iterations[1:] > 0)
+
+    for k, energies, vectors in zip(momenta, result.energies, result.vectors):
+        H = hamiltonian(k).toarray()
+        reference = np.linalg.eigvalsh(H)
+        nearest = reference[np.argsort(np.abs(reference - sigma))[:n_bands]]
+        assert np.allclose(np.sort(energies), np.sort(nearest))
+        assert np.allclose(H @ vectors, vectors * energies, atol=1e-6)
+
+
+def test_adapt_sigma():
+    result = track_bands(hamiltonian, momenta, 4, sigma, return_vectors=False)
+    assert result.vectors is None
+    for k, energies in zip(momenta, result.energies):
+        reference = np.linalg.eigvalsh(hamiltonian(k).toarray())
+        assert np.allclose(np.min(np.abs(reference - energies[:, None]), axis=1), 0)
+
+
+def test_band_crossing():
+    # two bands with fixed eigenvectors cross, columns of output must follow
+    # them instead of being sorted by energy
+    size = 50
+    diagonal = np.linspace(-1, 1, size) ** 2 + 1
+
+    def crossing(t):
+        d = diagonal.copy()
+        d[:2] = [t, 0.5 - t]
+        return sp.diags(d)
+
+    ts = np.linspace(0, 0.5, 11) + 0.01
+    result = track_bands(crossing, ts, 2, 0.25, n_guard=2, adapt_sigma=False)
+    assert np.allclose(result.energies[:, 0], ts) or np.allclose(
+        result.energies[:, 1], ts
+    )
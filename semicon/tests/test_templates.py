@@ -0,0 +1,109 @@
+import json
+import os
+
+import kwant
+import numpy as np
+import pytest
+
+from semicon import templates
+from semicon.models import ZincBlende
+
+model = ZincBlende(bands=("gamma_6c",), parameter_coords="z")
+
+
+def hamiltonian(template):
+    lat = next(iter(template.sites())).family
+    syst = kwant.Builder()
+    syst.fill(template, lambda site: 0 <= site.tag[0] < 5, lat(0))
+    params = dict(
+        {p: (lambda z: 1 + z**2) for p in model._varied_parameters},
+        hbar=1,
+        m_0=1,
+        k_x=0.2,
+        k_y=0.1,
+    )
+    return syst.finalized().hamiltonian_submatrix(params=params)
+
+
+def test_discretize(tmp_path, monkeypatch):
+    templates.clear_cache()
+    template = model.discretize("z", 0.5, cache_dir=str(tmp_path))
+    assert model.discretize("z", 0.5, cache_dir=str(tmp_path)) is template
+    assert len(os.listdir(tmp_path / "templates")) == 1
+
+    reference = kwant.continuum.discretize(model.hamiltonian, "z", grid=0.5)
+    assert np.allclose(hamiltonian(template), hamiltonian(reference))
+
+    # a new process only reads the symbolic discretization from disk
+    templates.clear_cache()
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("Symbolic discretization is not cached.")
+
+    monkeypatch.setattr(kwant.continuum, "discretize_symbolic", fail)
+    template = templates.discretize(model.hamiltonian, "z", 0.25, str(tmp_path))
+    reference = kwant.continuum.discretize(model.hamiltonian, "z", grid=0.25)
+    assert np.allclose(hamiltonian(template), hamiltonian(reference))
+
+    # corrupt entries are recomputed, disk cache can be disabled
+    templates.clear_cache()
+    (fname,) = (tmp_path / "templates").iterdir()
+    fname.write_text("{")
+    with pytest.raises(RuntimeError):
+        templates.discretize_symbolic(model.hamiltonian, "z", str(tmp_path))
+    with pytest.raises(RuntimeError):
+        templates.discretize_symbolic(model.hamiltonian, "z", cache_dir=False)
+
+    templates.clear_cache(disk=True, cache_dir=str(tmp_path))
+    assert not os.listdir(tmp_path / "templates")
+
+
+def test_scalar_hamiltonian(tmp_path):
+    templates.clear_cache()
+    expected = kwant.continuum.discretize_symbolic("k_z * A(z) * k_z", "z")
+    templates.discretize_symbolic("k_z * A(z) * k_z", "z", str(tmp_path))
+    templates.clear_cache()
+    assert templates.discretize_symbolic("k_z * A(z) * k_z", "z", str(tmp_path)) == (
+        expected
+    )
+
+
+def test_cache_entries(tmp_path, monkeypatch):
+    templates.clear_cache()
+    # small terms are not dropped from the keys
+    first = templates.discretize_symbolic("1e-13 * A * k_z**2 + B", "z", str(tmp_path))
+    second = templates.discretize_symbolic("B", "z", str(tmp_path))
+    assert first != second
+    assert len(os.listdir(tmp_path / "templates")) == 2
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("Symbolic discretization is not cached.")
+
+    monkeypatch.setattr(kwant.continuum, "discretize_symbolic", fail)
+    templates.clear_cache()
+    fname = tmp_path / "templates" / (templates._key("B", ["z"]) + ".json")
+    data = json.loads(fname.read_text())
+
+    # entries of other Hamiltonians are not used, even under the same key
+    fname.write_text(json.dumps(dict(data, source="'C'")))
+    with pytest.raises(RuntimeError):
+        templates.discretize_symbolic("B", "z", str(tmp_path))
+
+    # entries are parsed, not evaluated
+    code = "__import__('os').remove({!r})".format(str(fname))
+    hoppings = [[[0], None, [code]]]
+    fname.write_text(json.dumps(dict(data, hoppings=hoppings)))
+    with pytest.raises(RuntimeError):
+        templates.discretize_symbolic("B", "z", str(tmp_path))
+    assert fname.exists()
+
+
+def test_memory_cache_size(monkeypatch):
+    templates.clear_cache()
+    monkeypatch.setattr(templates, "_cache_size", 2)
+    first = templates.discretize("k_z * A(z) * k_z", "z", 0.5, cache_dir=False)
+    for grid_spacing in [0.25, 0.5, 1]:
+        templates.discretize("k_z * A(z) * k_z", "z", grid_spacing, cache_dir=False)
+    assert len(templates._templates) == 2
+    assert [key[1] for key in templates._templates] == [0.5, 1.0]
+    assert templates.discretize("k_z * A(z) * k_z", "z", 0.5, False) is first
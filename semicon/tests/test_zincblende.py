@@ -2,7 +2,7 @@ import kwant.continuum
 import pytest
 import sympy
 
-from semicon.kp_models import symbols
+from semicon.kp_models import explicit_foreman, explicit_zeeman, serialization, symbols
 from semicon.kp_models.explicit_foreman import foreman as reference_foreman
 from semicon.kp_models.explicit_zeeman import zeeman as reference_zeeman
 from semicon.misc import prettify
@@ -55,6 +55,14 @@ def test_serialized_foremanzeeman():
     assert isclose(smp.hamiltonian, reference_foreman + reference_zeeman)
 
 
+@pytest.mark.parametrize("module", [explicit_foreman, explicit_zeeman])
+def test_structured_serialization(module):
+    reference = getattr(module, module.__name__.split("_")[-1])
+    terms = serialization.Terms.from_arrays(**serialization.encode(reference))
+    symbols = {s.name: s for s in reference.free_symbols}
+    assert isclose(terms.to_sympy(symbols), sympy.ImmutableMatrix(reference))
+
+
 # Sanity check of content: type, shape, included symbols...
 # (if something is failing really badly, it should fail here)
 
@@ -75,6 +83,18 @@ def test_hamiltonian_shape(bands, shape):
     assert model.hamiltonian.shape == shape
 
 
+@pytest.mark.parametrize("bands", ["gamma_6c", ("gamma_7v", "gamma_6c")])
+def test_band_subset(bands):
+    components = ("foreman", "zeeman")
+    full = ZincBlende(components=components, parameter_coords="xyz")
+    model = ZincBlende(bands=bands, components=components, parameter_coords="xyz")
+
+    indices = []
+    for band in model.bands:
+        indices += ZincBlende._band_indices[band]
+    assert isclose(model.hamiltonian, full.hamiltonian[:, indices][indices, :])
+
+
 @pytest.mark.parametrize(
     "coords, components, must_have_symbols",
     [
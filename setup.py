@@ -37,7 +37,7 @@ def import_submodule(path, name):
 def build_cache(dir):
     print("building model cache")
     sys.path.append("semicon")
-    from kp_models import explicit_foreman, explicit_zeeman
+    from kp_models import explicit_foreman, explicit_zeeman, serialization
 
     sys.path.pop()
     data = {
@@ -49,6 +49,13 @@ def build_cache(dir):
     with open(cache_file, "w") as f:
         json.dump(data, f)
 
+    # Structured representation that is loaded without parsing strings
+    cache_file = os.path.join(dir, "semicon", "model_cache.npz")
+    serialization.save(
+        cache_file,
+        {"foreman": explicit_foreman.foreman, "zeeman": explicit_zeeman.zeeman},
+    )
+
 
 # Build model cache from 'kp_models' package
 class build_py(cmdclass["build_py"]):
@@ -90,7 +97,7 @@ setup(
     url="https://gitlab.kwant-project.org/semicon/semicon",
     packages=find_packages("."),
     package_data={"semicon": ["databank/*.yml"]},
-    setup_requires=["sympy >= 1.2"],
+    setup_requires=["sympy >= 1.2", "numpy >= 1.14.5"],
     install_requires=[
         "sympy >= 1.2",
         "scipy >= 1.1.0",
@@ -99,6 +106,7 @@ setup(
         "kwant >= 1.4",
         "pyyaml",
     ],
+    extras_require={"hdf5": ["h5py"]},
     classifiers=[c.strip() for c in classifiers.split("\n")],
     cmdclass=cmdclass,
 )